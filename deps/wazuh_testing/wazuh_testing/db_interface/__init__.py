@@ -1,8 +1,14 @@
+import inspect
 import json
 import socket
 import os
 import sys
 import sqlite3
+import threading
+from collections import deque
+from itertools import groupby
+from numbers import Number
+from pathlib import Path
 from time import sleep
 
 from wazuh_testing import WAZUH_DB_SOCKET_PATH
@@ -10,14 +16,19 @@ from wazuh_testing.tools.monitoring import wazuh_pack, wazuh_unpack
 from wazuh_testing.tools.services import control_service
 
 
-def query_wdb(command):
-    """Make queries to wazuh-db using the wdb socket.
+WDB_PIPELINE_DEPTH = 64
+WDB_POOL_SIZE = 4
+# Limits of the multi-row INSERT statements sent to wazuh-db. The size keeps every command below the wazuh-db
+# maximum message size (OS_MAXSTR)
+WDB_INSERT_BATCH_ROWS = 500
+WDB_INSERT_MAX_SIZE = 60000
 
-    Args:
-        command (str): wazuh-db command alias. For example `global get-agent-info 000`.
 
-    Returns:
-        list: Query response data.
+def wait_for_wdb_socket():
+    """Wait for the wdb socket to be up, restarting wazuh-db if it does not appear.
+
+    Raises:
+        Exception: If the socket is not up in the expected time, even restarting wazuh-db.
     """
     # If the wdb socket is not yet up, then wait or restart wazuh-db
     if not os.path.exists(WAZUH_DB_SOCKET_PATH):
@@ -37,38 +48,454 @@ def query_wdb(command):
         if not os.path.exists(WAZUH_DB_SOCKET_PATH):
             raise Exception('The wdb socket is not up. wazuh-db was restarted but the socket was not found')
 
-    # Create and open the socket connection with wazuh-db socket
-    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
-    sock.connect(WAZUH_DB_SOCKET_PATH)
-    data = []
 
-    try:
-        # Send the query request
-        sock.send(wazuh_pack(len(command)) + command.encode())
+class WazuhDBConnectionError(ConnectionError):
+    """wazuh-db closed the connection before sending the whole response."""
+
 
-        rcv = sock.recv(4)
+class WazuhDBClient:
+    """Client of the wazuh-db socket that reuses its connections.
 
-        if len(rcv) == 4:
-            data_len = wazuh_unpack(rcv)
+    The connections are kept in a pool and shared by the threads that use the client. If a pooled connection was
+    closed while it was idle (for example, because wazuh-db was restarted), the request can't be sent through it, so
+    it is sent through a new one. A request that was sent is never sent again, as wazuh-db may have executed it.
 
-            data = sock.recv(data_len).decode()
+    Responses with the `due` status are chunks of a larger result: the command is sent again until the final chunk
+    arrives, and the JSON lists of all the chunks are concatenated.
 
-            # Remove response header and cast str to list of dictionaries
-            # From --> 'ok [ {data1}, {data2}...]' To--> [ {data1}, data2}...]
-            if len(data.split()) > 1 and data.split()[0] == 'ok':
-                data = json.loads(' '.join(data.split(' ')[1:]))
-    finally:
+    Args:
+        socket_path (str): Path of the wdb socket. Default `WAZUH_DB_SOCKET_PATH`
+        pool_size (int): Maximum number of idle connections kept open. Default `WDB_POOL_SIZE`
+        timeout (float): Timeout in seconds of the socket operations. Default `None` (no timeout).
+        wait_socket (bool): Wait for the default wdb socket before connecting, restarting wazuh-db if it does not
+            appear (see `wait_for_wdb_socket`). Default `True`
+    """
+    def __init__(self, socket_path=WAZUH_DB_SOCKET_PATH, pool_size=WDB_POOL_SIZE, timeout=None, wait_socket=True):
+        self.socket_path = socket_path
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.wait_socket = wait_socket
+        self._pool = []
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self.wait_socket and self.socket_path == WAZUH_DB_SOCKET_PATH:
+            wait_for_wdb_socket()
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def _acquire(self):
+        """Get a connection and whether it was reused from the pool."""
+        with self._lock:
+            if self._pool:
+                return self._pool.pop(), True
+        return self._connect(), False
+
+    def _release(self, sock):
+        with self._lock:
+            if len(self._pool) < self.pool_size:
+                self._pool.append(sock)
+                return
         sock.close()
 
-    return data
+    def close(self):
+        """Close all the idle connections."""
+        with self._lock:
+            pool, self._pool = self._pool, []
+        for sock in pool:
+            sock.close()
+
+    @staticmethod
+    def _recv_exact(sock, size):
+        """Receive exactly `size` bytes.
+
+        Raises:
+            WazuhDBConnectionError: If the connection is closed before receiving all the data.
+        """
+        buffer = bytearray()
+        while len(buffer) < size:
+            data = sock.recv(size - len(buffer))
+            if not data:
+                raise WazuhDBConnectionError('Connection closed by wazuh-db')
+            buffer.extend(data)
+        return bytes(buffer)
+
+    def _recv_response(self, sock):
+        return self._recv_exact(sock, wazuh_unpack(self._recv_exact(sock, 4))).decode()
+
+    @staticmethod
+    def _frame(command):
+        command = command.encode()
+        return wazuh_pack(len(command)) + command
+
+    @staticmethod
+    def parse_response(response):
+        """Cast a wazuh-db response to its data.
+
+        Args:
+            response (str): Raw response. For example `ok [{"id":1}]`.
+
+        Returns:
+            any: JSON data of `ok` responses (from `'ok [{data1}, {data2}...]'` to `[{data1}, {data2}...]`) or the raw
+                response otherwise.
+        """
+        # Remove response header and cast str to list of dictionaries
+        # From --> 'ok [ {data1}, {data2}...]' To--> [ {data1}, data2}...]
+        if len(response.split()) > 1 and response.split()[0] == 'ok':
+            return json.loads(' '.join(response.split(' ')[1:]))
+        return response
+
+    @staticmethod
+    def _merge_chunks(chunks, response):
+        """Merge the `due` chunks of a result with its final response."""
+        data = []
+        for chunk in chunks + [response]:
+            status, _, payload = chunk.partition(' ')
+            if payload:
+                payload = json.loads(payload)
+                if isinstance(payload, list):
+                    data.extend(payload)
+                else:
+                    data.append(payload)
+            if status != 'due' and status != 'ok':
+                return response
+
+        return data
+
+    def _run(self, request, function):
+        """Send a request through a connection of the pool and get its result with a function.
+
+        Only the first send of a pooled connection is retried with a new connection: if it fails, wazuh-db closed the
+        connection while it was idle and did not receive anything. Any later failure is raised.
+
+        Args:
+            request (bytes): Framed commands to send.
+            function (callable): Function that receives the connection and returns the result of the request.
+
+        Returns:
+            any: Result of the function.
+        """
+        while True:
+            sock, reused = self._acquire()
+            try:
+                sock.sendall(request)
+            except OSError:
+                sock.close()
+                if reused:
+                    continue
+                raise
+            try:
+                result = function(sock)
+            except Exception:
+                sock.close()
+                raise
+            self._release(sock)
+            return result
+
+    def query(self, command):
+        """Make a query to wazuh-db.
+
+        Args:
+            command (str): wazuh-db command alias. For example `global get-agent-info 000`.
+
+        Returns:
+            any: Query response data (see `parse_response`).
+        """
+        def get_response(sock):
+            chunks = []
+            response = self._recv_response(sock)
+            while response.startswith('due '):
+                # Ask for the next chunk
+                chunks.append(response)
+                sock.sendall(self._frame(command))
+                response = self._recv_response(sock)
+            return self._merge_chunks(chunks, response) if chunks else self.parse_response(response)
+
+        return self._run(self._frame(command), get_response)
+
+    def query_many(self, commands, pipeline_depth=WDB_PIPELINE_DEPTH):
+        """Make several queries to wazuh-db, pipelining them in the same connection.
+
+        Up to `pipeline_depth` requests are in flight at the same time, so wazuh-db does not wait for the client to
+        read every response before processing the next request.
+
+        Args:
+            commands (iterable(str)): wazuh-db commands.
+            pipeline_depth (int): Maximum number of requests sent without having received their response.
+
+        Returns:
+            list: Response data of every command, in the same order (see `parse_response`).
+        """
+        commands = list(commands)
+        if not commands:
+            return []
+        first_commands = min(len(commands), pipeline_depth)
+
+        def get_responses(sock):
+            responses = [None] * len(commands)
+            chunks = {}
+            in_flight = deque(range(first_commands))
+            next_command = first_commands
+
+            while next_command < len(commands) or in_flight:
+                # Fill the pipeline
+                frames = []
+                while next_command < len(commands) and len(in_flight) < pipeline_depth:
+                    frames.append(self._frame(commands[next_command]))
+                    in_flight.append(next_command)
+                    next_command += 1
+                if frames:
+                    sock.sendall(b''.join(frames))
+
+                index = in_flight.popleft()
+                response = self._recv_response(sock)
+                if response.startswith('due '):
+                    # Ask for the next chunk
+                    chunks.setdefault(index, []).append(response)
+                    sock.sendall(self._frame(commands[index]))
+                    in_flight.append(index)
+                elif index in chunks:
+                    responses[index] = self._merge_chunks(chunks.pop(index), response)
+                else:
+                    responses[index] = self.parse_response(response)
+
+            return responses
+
+        return self._run(b''.join(self._frame(command) for command in commands[:first_commands]), get_responses)
+
+
+_wdb_clients = {}
+_wdb_clients_lock = threading.Lock()
+
+
+def _reset_wdb_clients():
+    """Discard the clients inherited by a forked process, so it does not share their connections with its parent."""
+    global _wdb_clients_lock
+    _wdb_clients_lock = threading.Lock()
+    for client in _wdb_clients.values():
+        # Their locks may have been held by other threads of the parent, so they can't be used
+        for sock in client._pool:
+            sock.close()
+    _wdb_clients.clear()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_wdb_clients)
+
+
+def get_wdb_client(wait_socket=True):
+    """Get the wazuh-db client shared by the helpers of this package.
+
+    Every process has its own clients, so the forked processes don't use the connections of their parent.
+
+    Args:
+        wait_socket (bool): Wait for the wdb socket, restarting wazuh-db if it does not appear. Default `True`
+
+    Returns:
+        WazuhDBClient: Client of the wdb socket.
+    """
+    with _wdb_clients_lock:
+        if wait_socket not in _wdb_clients:
+            _wdb_clients[wait_socket] = WazuhDBClient(wait_socket=wait_socket)
+        return _wdb_clients[wait_socket]
+
+
+def query_wdb(command):
+    """Make queries to wazuh-db using the wdb socket.
+
+    Args:
+        command (str): wazuh-db command alias. For example `global get-agent-info 000`.
+
+    Returns:
+        list: Query response data. An empty list if wazuh-db closed the connection without answering.
+    """
+    try:
+        return get_wdb_client().query(command)
+    except WazuhDBConnectionError:
+        return []
+
+
+def query_wdb_many(commands):
+    """Make several queries to wazuh-db, pipelining them in the same connection.
+
+    Args:
+        commands (iterable(str)): wazuh-db command aliases.
+
+    Returns:
+        list: Response data of every query, in the same order.
+    """
+    return get_wdb_client().query_many(commands)
+
+
+def sql_literal(value):
+    """Convert a value to a SQL literal, escaping the quotes of the strings.
+
+    wazuh-db `sql` commands are plain text, so the values of the rows sent to it can't be passed as parameters.
+
+    Args:
+        value (str, int, float, bool or None): Value to convert. `None` and NaN values are converted to `NULL`.
+
+    Returns:
+        str: SQL literal.
+    """
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    if value is None or (isinstance(value, float) and value != value):
+        return 'NULL'
+    if isinstance(value, bool):
+        return str(int(value))
+    if isinstance(value, Number):
+        return str(value)
+
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def iter_rows(rows):
+    """Iterate the rows of a sequence of dictionaries or a pandas DataFrame as dictionaries.
+
+    Args:
+        rows (iterable(dict) or pandas.DataFrame): Rows to iterate.
+
+    Yields:
+        dict: Values of every row by column name.
+    """
+    if hasattr(rows, 'itertuples') and hasattr(rows, 'columns'):
+        columns = list(rows.columns)
+        for values in rows.itertuples(index=False, name=None):
+            yield dict(zip(columns, values))
+    else:
+        yield from rows
+
+
+def get_default_values(function):
+    """Get the default values of the parameters of a function.
+
+    Args:
+        function (callable): Function to inspect.
+
+    Returns:
+        dict: Default value of every parameter that has one.
+    """
+    return {name: parameter.default for name, parameter in inspect.signature(function).parameters.items()
+            if parameter.default is not inspect.Parameter.empty}
+
+
+def fill_rows(rows, defaults, **common):
+    """Complete the rows to insert with the values shared by all of them and the default values.
+
+    Args:
+        rows (iterable(dict) or pandas.DataFrame): Rows to insert.
+        defaults (dict): Default value of every column.
+        common (dict): Values of the columns missing in the rows. They have priority over `defaults`.
+
+    Yields:
+        dict: Value of every column of `defaults` plus the extra keys of the row.
+
+    Raises:
+        ValueError: If a row or `common` contain an unknown column.
+    """
+    base = dict(defaults, **common)
+    unknown_columns = set(common) - set(defaults)
+
+    for row in iter_rows(rows):
+        unknown_columns = unknown_columns or row.keys() - base.keys()
+        if unknown_columns:
+            raise ValueError(f"Unknown columns: {', '.join(sorted(unknown_columns))}")
+        yield dict(base, **row)
+
+
+def build_insert_queries(prefix, table, columns, rows, or_replace=False, batch_rows=WDB_INSERT_BATCH_ROWS,
+                         max_size=WDB_INSERT_MAX_SIZE):
+    """Build multi-row INSERT queries for wazuh-db.
+
+    Args:
+        prefix (str): Command prefix of the queries. For example `agent 001 sql`.
+        table (str): Table name.
+        columns (list(str) or dict): Columns to insert, or row key of every column to insert.
+        rows (iterable(dict)): Rows to insert, with a value for every column.
+        or_replace (bool): Use `INSERT OR REPLACE`.
+        batch_rows (int): Maximum number of rows of every query.
+        max_size (int): Maximum size of every query, unless a single row exceeds it.
+
+    Yields:
+        str: Query inserting up to `batch_rows` rows.
+    """
+    keys = list(columns.values()) if isinstance(columns, dict) else columns
+    header = f"{prefix} INSERT {'OR REPLACE ' if or_replace else ''}INTO {table} " \
+             f"({', '.join(columns)}) VALUES "
+    values = []
+    size = len(header)
+
+    for row in rows:
+        row_values = f"({', '.join([sql_literal(row[key]) for key in keys])})"
+        if values and (len(values) == batch_rows or size + len(row_values) + 1 > max_size):
+            yield header + ','.join(values)
+            values = []
+            size = len(header)
+        values.append(row_values)
+        size += len(row_values) + 1
+
+    if values:
+        yield header + ','.join(values)
+
+
+def insert_wdb_rows(prefix, table, columns, rows, or_replace=False, key=None):
+    """Insert rows with multi-row INSERT queries, pipelined through the wazuh-db client.
+
+    wazuh-db runs the queries of every database in its own transaction, which it commits periodically, so the
+    queries are not wrapped in an explicit transaction; every multi-row INSERT is atomic.
+
+    Args:
+        prefix (str or callable): Command prefix of the queries (see `build_insert_queries`), or function that gets
+            it from the value of `key` of every row.
+        table (str): Table name.
+        columns (list(str) or dict): Columns to insert, or row key of every column to insert.
+        rows (iterable(dict)): Rows to insert, with a value for every column.
+        or_replace (bool): Use `INSERT OR REPLACE`.
+        key (str): Row key used to choose the database of the consecutive rows with the same value.
+
+    Returns:
+        int: Number of inserted rows.
+    """
+    inserted_rows = 0
+
+    def count(rows_group):
+        nonlocal inserted_rows
+        for row in rows_group:
+            inserted_rows += 1
+            yield row
 
+    if key is None:
+        queries = build_insert_queries(prefix, table, columns, count(rows), or_replace)
+    else:
+        queries = (query for value, rows_group in groupby(rows, key=lambda row: row[key])
+                   for query in build_insert_queries(prefix(value), table, columns, count(rows_group), or_replace))
 
-def execute_sqlite_query(cursor, query):
+    query_wdb_many(queries)
+
+    return inserted_rows
+
+
+SQLITE_CACHED_STATEMENTS = 256
+
+# Writable sessions in progress, by database path
+_active_sessions = {}
+
+
+def execute_sqlite_query(cursor, query, parameters=(), many=False):
     """Execute a sqlite query, retrying in case the database is locked.
 
     Args:
         cursor (sqlite3.Cursor): Sqlite cursor object.
         query (str): Query to execute.
+        parameters (tuple or dict or iterable): Query parameters, or sequence of parameters if `many` is set.
+        many (bool): Execute the query once for every item of `parameters` (see `sqlite3.Cursor.executemany`).
 
     Raises:
         sqlite3.OperationalError if database is locked after max retries
@@ -77,22 +504,165 @@ def execute_sqlite_query(cursor, query):
     max_retries = 10
     make_query = True
 
+    if many:
+        # The parameters may be a generator, which cannot be consumed again after a retry
+        parameters = list(parameters)
+
     # Execute the query, retrying it if necessary up to a maximum number of times.
     while make_query and retries < max_retries:
         try:
-            cursor.execute(query)
+            if many:
+                cursor.executemany(query, parameters)
+            else:
+                cursor.execute(query, parameters)
             make_query = False
         except sqlite3.OperationalError:
             _, exception_message, _ = sys.exc_info()
-            if str(exception_message) == 'database is locked':
-                sleep(0.5)
-                retries += 1
+            if str(exception_message) != 'database is locked':
+                raise
+            sleep(0.5)
+            retries += 1
 
     # If the database is locked after the maximum number of retries, then raise the exception
     if retries == max_retries:
         raise sqlite3.OperationalError('database is locked')
 
 
+class SQLiteSession:
+    """Context manager to run any number of queries on a Wazuh database in a single transaction.
+
+    A writable session stops wazuh-db once when it starts, runs every query in one transaction (committed when the
+    session ends, or rolled back if it ends with an exception) and starts wazuh-db again at exit. While it is active,
+    `make_sqlite_query` and `get_sqlite_query_result` run their queries for the same database inside it instead of
+    restarting wazuh-db themselves.
+
+    A read-only session opens the database with a `file:...?mode=ro` URI without stopping wazuh-db. Its reads run in
+    one read transaction, so they see the same snapshot of the database (with WAL journaling, without blocking
+    the writers).
+
+    Args:
+        db_path (str): Path where is located the DB.
+        read_only (bool): Open the database in read-only mode without stopping wazuh-db. Default `False`
+        stop_daemon (bool): Stop wazuh-db during the session. Default `True` for writable sessions.
+
+    Example:
+        with SQLiteSession(CVE_DB_PATH) as session:
+            session.executemany('INSERT INTO NVD_CVE (id, cve_id) VALUES (?, ?)', rows)
+            session.fetch_all('SELECT count(*) FROM NVD_CVE')
+    """
+    def __init__(self, db_path, read_only=False, stop_daemon=None):
+        self.db_path = db_path
+        self.read_only = read_only
+        self.stop_daemon = not read_only if stop_daemon is None else stop_daemon
+        self.connection = None
+        self._parent = None
+
+    def __enter__(self):
+        if not self.read_only and self.db_path in _active_sessions:
+            # Nested session: reuse the transaction of the outer one
+            self._parent = _active_sessions[self.db_path]
+            self.connection = self._parent.connection
+            return self
+
+        if self.stop_daemon:
+            control_service('stop', daemon='wazuh-db')
+
+        try:
+            if self.read_only:
+                # The path is quoted in the URI, so the names with `?`, `#` or `%` are not taken as URI syntax
+                uri = f"{Path(self.db_path).resolve().as_uri()}?mode=ro"
+                self.connection = sqlite3.connect(uri, uri=True, isolation_level=None,
+                                                  cached_statements=SQLITE_CACHED_STATEMENTS)
+                self.execute('BEGIN')
+            else:
+                self.connection = sqlite3.connect(self.db_path, isolation_level=None,
+                                                  cached_statements=SQLITE_CACHED_STATEMENTS)
+                self.execute('BEGIN IMMEDIATE')
+                _active_sessions[self.db_path] = self
+        except Exception:
+            self._close()
+            raise
+
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self._parent is not None:
+            self.connection = None
+            return
+
+        try:
+            if self.connection is not None and self.connection.in_transaction:
+                self.connection.execute('ROLLBACK' if exc_type is not None or self.read_only else 'COMMIT')
+        finally:
+            self._close()
+
+    def _close(self):
+        if _active_sessions.get(self.db_path) is self:
+            del _active_sessions[self.db_path]
+        try:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
+        finally:
+            if self.stop_daemon:
+                control_service('start', daemon='wazuh-db')
+
+    def execute(self, query, parameters=()):
+        """Execute a query, retrying in case the database is locked.
+
+        Args:
+            query (str): SQL query. The values should be passed as `?` or `:name` placeholders.
+            parameters (tuple or dict): Values of the placeholders.
+
+        Returns:
+            sqlite3.Cursor: Cursor with the results of the query.
+        """
+        cursor = self.connection.cursor()
+        execute_sqlite_query(cursor, query, parameters)
+        return cursor
+
+    def executemany(self, query, rows):
+        """Execute a query once for every row of parameters, reusing the same prepared statement.
+
+        Args:
+            query (str): SQL query with placeholders.
+            rows (iterable): Values of the placeholders for every execution.
+
+        Returns:
+            int: Number of modified rows.
+        """
+        cursor = self.connection.cursor()
+        try:
+            execute_sqlite_query(cursor, query, rows, many=True)
+            return cursor.rowcount
+        finally:
+            cursor.close()
+
+    def fetch_all(self, query, parameters=()):
+        """Get the rows of a query.
+
+        Args:
+            query (str): SQL query. e.g(SELECT * ..).
+            parameters (tuple or dict): Values of the placeholders.
+
+        Returns:
+            list(tuple): Rows of the result.
+        """
+        cursor = self.execute(query, parameters)
+        try:
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+    def get_query_result(self, query, parameters=()):
+        """Get the result of a query in the format of `get_sqlite_query_result`.
+
+        Returns:
+            result (List[str]): Each row is the query result row with its field values joined by commas.
+        """
+        return [', '.join([f"{item}" for item in row]) for row in self.fetch_all(query, parameters)]
+
+
 def make_sqlite_query(db_path, query_list):
     """Make a query to the database for each passed query.
 
@@ -100,49 +670,21 @@ def make_sqlite_query(db_path, query_list):
         db_path (string): Path where is located the DB.
         query_list (list): List with queries to run.
     """
-    control_service('stop', daemon='wazuh-db')
-
-    try:
-        db_connection = sqlite3.connect(db_path)
-
+    with SQLiteSession(db_path) as session:
         for item in query_list:
-            cursor = db_connection.cursor()
-            execute_sqlite_query(cursor, item)
-            cursor.close()
+            session.execute(item).close()
 
-        db_connection.commit()
-    finally:
-        db_connection.close()
-        control_service('start', daemon='wazuh-db')
 
-
-def get_sqlite_query_result(db_path, query):
+def get_sqlite_query_result(db_path, query, read_only=False):
     """Get a query result.
 
     Args:
         db_path (str): Path where is located the DB.
         query (str): SQL query. e.g(SELECT * ..).
+        read_only (bool): Read the database without stopping wazuh-db (see `SQLiteSession`). Default `False`
 
     Returns:
         result (List[list]): Each row is the query result row and each column is the query field value.
     """
-    control_service('stop', daemon='wazuh-db')
-
-    try:
-        db_connection = sqlite3.connect(db_path)
-        try:
-            cursor = db_connection.cursor()
-
-            execute_sqlite_query(cursor, query)
-            records = cursor.fetchall()
-            result = []
-
-            for row in records:
-                result.append(', '.join([f"{item}" for item in row]))
-
-            return result
-        finally:
-            cursor.close()
-    finally:
-        db_connection.close()
-        control_service('start', daemon='wazuh-db')
+    with SQLiteSession(db_path, read_only=read_only and db_path not in _active_sessions) as session:
+        return session.get_query_result(query)
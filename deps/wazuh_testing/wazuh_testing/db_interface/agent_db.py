@@ -1,7 +1,18 @@
 import datetime
 from time import time
 
-from wazuh_testing.db_interface import query_wdb
+from wazuh_testing.db_interface import query_wdb, fill_rows, get_default_values, insert_wdb_rows
+
+
+PACKAGE_COLUMNS = ['scan_id', 'scan_time', 'format', 'name', 'priority', 'section', 'size', 'vendor', 'install_time',
+                   'version', 'architecture', 'multiarch', 'source', 'description', 'location', 'triaged', 'checksum',
+                   'item_id']
+VULNERABILITY_COLUMNS = ['name', 'version', 'architecture', 'cve', 'detection_time', 'severity', 'cvss2_score',
+                         'cvss3_score', 'reference', 'type', 'status', 'external_references', 'condition', 'title',
+                         'published', 'updated']
+OS_INFO_COLUMNS = ['scan_id', 'scan_time', 'hostname', 'architecture', 'os_name', 'os_version', 'os_codename',
+                   'os_major', 'os_minor', 'os_patch', 'os_build', 'os_platform', 'sysname', 'release', 'version',
+                   'os_release', 'os_display_version', 'checksum', 'reference', 'triaged']
 
 
 def clean_table(agent_id, table):
@@ -94,6 +105,24 @@ def insert_os_info(agent_id='000', scan_id=int(time()), scan_time=datetime.datet
     query_wdb(query_string)
 
 
+def insert_os_infos(os_infos, **common):
+    """Insert the OS information of several agents, pipelining the queries to wazuh-db.
+
+    Every row can set any parameter of `insert_os_info`, including `agent_id`.
+
+    Args:
+        os_infos (iterable(dict) or pandas.DataFrame): OS information to insert.
+        common (dict): Values of the `insert_os_info` parameters missing in the rows.
+
+    Returns:
+        int: Number of inserted rows.
+    """
+    rows = fill_rows(os_infos, get_default_values(insert_os_info), **common)
+
+    return insert_wdb_rows(lambda agent_id: f"agent {agent_id} sql", 'sys_osinfo', OS_INFO_COLUMNS, rows,
+                           or_replace=True, key='agent_id')
+
+
 def insert_package(agent_id='000', scan_id=int(time()), format='rpm', name='custom-package-0',
                    priority='', section='Unspecified', size=99, vendor='wazuh-mocking', version='1.0.0-1.el7',
                    architecture='x64', multiarch='', description='Wazuh mocking packages', source='Wazuh QA tests',
@@ -139,6 +168,44 @@ def insert_package(agent_id='000', scan_id=int(time()), format='rpm', name='cust
               f"{arguments['item_id']})")
 
 
+def get_package_rows(packages, **common):
+    """Complete the rows of several packages with the default values of `insert_package`.
+
+    As in `insert_package`, the `'NULL'` strings are inserted as NULL values.
+
+    Args:
+        packages (iterable(dict) or pandas.DataFrame): Packages to insert.
+        common (dict): Values of the `insert_package` parameters missing in the rows.
+
+    Yields:
+        dict: Value of every parameter of `insert_package`.
+    """
+    for row in fill_rows(packages, get_default_values(insert_package), **common):
+        yield {key: None if value == 'NULL' else value for key, value in row.items()}
+
+
+def insert_packages(packages, **common):
+    """Insert several packages in the agents DB, with multi-row INSERT queries pipelined to wazuh-db.
+
+    Every row can set any parameter of `insert_package`, including `agent_id`. The rows of the same agent should be
+    consecutive, so they are inserted with the fewest queries.
+
+    Args:
+        packages (iterable(dict) or pandas.DataFrame): Packages to insert.
+        common (dict): Values of the `insert_package` parameters missing in the rows. For example `agent_id='001'`.
+
+    Returns:
+        int: Number of inserted packages.
+
+    Example:
+        insert_packages([{'name': f"package_{number}"} for number in range(2000)], agent_id='001')
+    """
+    rows = get_package_rows(packages, **common)
+
+    return insert_wdb_rows(lambda agent_id: f"agent {agent_id} sql", 'sys_programs', PACKAGE_COLUMNS, rows,
+                           key='agent_id')
+
+
 def update_sync_info(agent_id='000', component='syscollector-packages', last_attempt=1, last_completion=1,
                      n_attempts=0, n_completions=0, last_agent_checksum=''):
     """Update the sync_info table of the specified agent for the selected component.
@@ -360,3 +427,21 @@ def insert_vulnerability_in_agent_inventory(agent_id='000', name='', version='',
               f" condition, title, published, updated) VALUES ('{name}', '{version}', '{architecture}', '{cve}', " \
               f"'{detection_time}', '{severity}', {cvss2_score}, {cvss3_score},'{reference}', '{type}', '{status}',  " \
               f"'{external_references}', '{condition}', '{title}', '{published}', '{updated}')")
+
+
+def insert_vulnerabilities_in_agent_inventory(vulnerabilities, **common):
+    """Insert several vulnerabilities in the agents vulnerabilities inventory, with multi-row INSERT queries.
+
+    Every row can set any parameter of `insert_vulnerability_in_agent_inventory`, including `agent_id`.
+
+    Args:
+        vulnerabilities (iterable(dict) or pandas.DataFrame): Vulnerabilities to insert.
+        common (dict): Values of the parameters missing in the rows. For example `agent_id='001'`.
+
+    Returns:
+        int: Number of inserted vulnerabilities.
+    """
+    rows = fill_rows(vulnerabilities, get_default_values(insert_vulnerability_in_agent_inventory), **common)
+
+    return insert_wdb_rows(lambda agent_id: f"agent {agent_id} sql", 'vuln_cves', VULNERABILITY_COLUMNS, rows,
+                           or_replace=True, key='agent_id')
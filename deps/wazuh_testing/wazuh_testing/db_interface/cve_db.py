@@ -2,7 +2,8 @@ from datetime import datetime
 from time import sleep
 
 from wazuh_testing import CVE_DB_PATH
-from wazuh_testing.db_interface import make_sqlite_query, get_sqlite_query_result
+from wazuh_testing.db_interface import make_sqlite_query, get_sqlite_query_result, fill_rows, \
+    get_default_values, SQLiteSession
 from wazuh_testing.modules import vulnerability_detector as vd
 
 
@@ -16,7 +17,7 @@ def _get_rows_number(cve_table):
         int: Number of rows.
     """
     query_string = f"SELECT count(*) from {cve_table}"
-    query_result = get_sqlite_query_result(CVE_DB_PATH, query_string)
+    query_result = get_sqlite_query_result(CVE_DB_PATH, query_string, read_only=True)
     rows_number = int(query_result[0])
 
     return rows_number
@@ -28,7 +29,7 @@ def get_tables():
     Returns:
         list(str): Table names.
     """
-    return get_sqlite_query_result(CVE_DB_PATH, "SELECT name FROM sqlite_master WHERE type='table';")
+    return get_sqlite_query_result(CVE_DB_PATH, "SELECT name FROM sqlite_master WHERE type='table';", read_only=True)
 
 
 def clean_table(table):
@@ -109,6 +110,43 @@ def insert_vulnerability(cveid='CVE-000', target='RHEL7', target_minor='',
     make_sqlite_query(CVE_DB_PATH, queries)
 
 
+def insert_vulnerabilities(vulnerabilities, **common):
+    """Insert several vulnerabilities in CVE database, in a single transaction.
+
+    Every row can set any parameter of `insert_vulnerability`. The values are passed to SQLite as parameters of
+    prepared statements, executed once per table for all the rows.
+
+    Args:
+        vulnerabilities (iterable(dict) or pandas.DataFrame): Vulnerabilities to insert.
+        common (dict): Values of the `insert_vulnerability` parameters missing in the rows.
+
+    Returns:
+        int: Number of inserted vulnerabilities.
+    """
+    rows = list(fill_rows(vulnerabilities, get_default_values(insert_vulnerability), **common))
+    queries = [
+        'INSERT INTO VULNERABILITIES (cveid, target, target_minor, package, operation, operation_value, deps_id) '
+        'VALUES (:cveid, :target, :target_minor, :package, :operation, :operation_value, :deps_id)',
+
+        'INSERT INTO VULNERABILITIES_INFO (ID, title, severity, published, updated, target, rationale, cvss, '
+        'cvss_vector, CVSS3, cwe) VALUES (:cveid, :title, :severity, :published, :updated, :target_v, :rationale, '
+        ':cvss, :cvss_vector, :cvss3, :cwe)',
+
+        'INSERT INTO REFERENCES_INFO (id, target, reference) VALUES (:cveid, :ref_target, :bugzilla_reference)',
+
+        'INSERT INTO BUGZILLA_REFERENCES_INFO (id, target, bugzilla_reference) VALUES (:cveid, :ref_target, '
+        ':bugzilla_reference)',
+
+        'INSERT INTO ADVISORIES_INFO (id, target, advisory) VALUES (:cveid, :ref_target, :advisory)'
+    ]
+
+    with SQLiteSession(CVE_DB_PATH) as session:
+        for query in queries:
+            session.executemany(query, rows)
+
+    return len(rows)
+
+
 def delete_vulnerability(cveid):
     """Remove a vulnerability from the DB.
 
@@ -188,7 +226,7 @@ def check_inserted_value_exists(table, column, value):
     """
     custom_value = f"'{value}'" if type(value) == str else value
     query_string = f"SELECT count(*) FROM {table} WHERE {column}={custom_value}"
-    result = get_sqlite_query_result(CVE_DB_PATH, query_string)
+    result = get_sqlite_query_result(CVE_DB_PATH, query_string, read_only=True)
     rows_number = int(result[0])
 
     return rows_number > 0
@@ -204,7 +242,7 @@ def get_metadata_timestamp(provider_os):
         str: Timestamp data. (example: 2022-03-03T03:00:01-05:00)
     """
     query_string = f"SELECT timestamp FROM metadata WHERE target='{provider_os}'"
-    result = get_sqlite_query_result(CVE_DB_PATH, query_string)
+    result = get_sqlite_query_result(CVE_DB_PATH, query_string, read_only=True)
 
     if len(result) == 0:
         return None
@@ -222,7 +260,7 @@ def get_nvd_metadata_timestamp(year):
         str: Timestamp data. (example: 2022-03-03T03:00:01-05:00)
     """
     query_string = f"SELECT timestamp FROM nvd_metadata WHERE year={year}"
-    result = get_sqlite_query_result(CVE_DB_PATH, query_string)
+    result = get_sqlite_query_result(CVE_DB_PATH, query_string, read_only=True)
 
     if len(result) == 0:
         return None
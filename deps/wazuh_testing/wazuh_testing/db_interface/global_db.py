@@ -1,4 +1,14 @@
-from wazuh_testing.db_interface import query_wdb
+from wazuh_testing.db_interface import query_wdb, fill_rows, get_default_values, insert_wdb_rows
+
+
+AGENT_COLUMNS = {'id': 'agent_id', 'name': 'name', 'ip': 'ip', 'register_ip': 'register_ip',
+                 'internal_key': 'internal_key', 'os_name': 'os_name', 'os_version': 'os_version',
+                 'os_major': 'os_major', 'os_minor': 'os_minor', 'os_codename': 'os_codename', 'os_build': 'os_build',
+                 'os_platform': 'os_platform', 'os_uname': 'os_uname', 'os_arch': 'os_arch', 'version': 'version',
+                 'config_sum': 'config_sum', 'merged_sum': 'merged_sum', 'manager_host': 'manager_host',
+                 'node_name': 'node_name', 'date_add': 'date_add', 'last_keepalive': 'last_keepalive',
+                 '"group"': 'group', 'sync_status': 'sync_status', 'connection_status': 'connection_status',
+                 'disconnection_time': 'disconnection_time'}
 
 
 def modify_system(os_name='CentOS Linux', os_major='7', name='centos7', agent_id='000', os_minor='1', os_arch='x86_64',
@@ -82,6 +92,23 @@ def create_or_update_agent(agent_id='001', name='centos8-agent', ip='127.0.0.1',
     query_wdb(query)
 
 
+def create_or_update_agents(agents, **common):
+    """Create several agents or update their info, with multi-row INSERT queries pipelined to wazuh-db.
+
+    Every row can set any parameter of `create_or_update_agent`.
+
+    Args:
+        agents (iterable(dict) or pandas.DataFrame): Agents to create or update.
+        common (dict): Values of the `create_or_update_agent` parameters missing in the rows.
+
+    Returns:
+        int: Number of created or updated agents.
+    """
+    rows = fill_rows(agents, get_default_values(create_or_update_agent), **common)
+
+    return insert_wdb_rows('global sql', 'agent', AGENT_COLUMNS, rows, or_replace=True)
+
+
 def get_last_agent_id():
     """Get the last agent ID registered in the global DB.
 
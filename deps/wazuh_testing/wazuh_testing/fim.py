@@ -26,6 +26,7 @@ from jsonschema import validate
 from wazuh_testing import global_parameters, logger
 from wazuh_testing.tools import LOG_FILE_PATH, WAZUH_PATH
 from wazuh_testing.tools.monitoring import FileMonitor
+from wazuh_testing.tools.pattern_matcher import callback_pattern
 from wazuh_testing.tools.time import TimeMachine
 from wazuh_testing.tools.file import generate_string
 
@@ -94,6 +95,8 @@ REQUIRED_REG_VALUE_ATTRIBUTES = {
     CHECK_SUM: {CHECK_SHA1SUM, CHECK_SHA256SUM, CHECK_MD5SUM}
 }
 
+FIM_EVENT_PATTERN = r'.*Sending FIM event: (.+)$'
+
 _last_log_line = 0
 _os_excluded_from_rt_wd = ['darwin', 'sunos5']
 registry_ignore_path = None
@@ -980,12 +983,8 @@ def change_conf_param(param, value):
                 re.sub(f'<{param}>.*</{param}>', f'<{param}>{value}</{param}>', line))
 
 
-def callback_detect_end_scan(line):
-    msg = r'.*Sending FIM event: (.+)$'
-    match = re.match(msg, line)
-    if not match:
-        return None
-
+@callback_pattern(FIM_EVENT_PATTERN)
+def callback_detect_end_scan(match):
     try:
         if json.loads(match.group(1))['type'] == 'scan_end':
             return True
@@ -993,15 +992,11 @@ def callback_detect_end_scan(line):
         logger.warning(f"Couldn't load a log line into json object. Reason {e}")
 
 
-def callback_detect_scan_start(line):
+@callback_pattern(FIM_EVENT_PATTERN)
+def callback_detect_scan_start(match):
     """
     Detect the start of a scheduled scan or initial scan.
     """
-    msg = r'.*Sending FIM event: (.+)$'
-    match = re.match(msg, line)
-    if not match:
-        return None
-
     try:
         if json.loads(match.group(1))['type'] == 'scan_start':
             return True
@@ -1009,14 +1004,11 @@ def callback_detect_scan_start(line):
         logger.warning(f"Couldn't load a log line into json object. Reason {e}")
 
 
-def callback_get_scan_timestap(line):
+@callback_pattern(FIM_EVENT_PATTERN)
+def callback_get_scan_timestap(match):
     """
     Get the timestamp for the end of the initial scan or a scheduled scan
     """
-    msg = r'.*Sending FIM event: (.+)$'
-    match = re.match(msg, line)
-    if not match:
-        return None
     try:
         if json.loads(match.group(1))['type'] == 'scan_end':
             return json.loads(match.group(1))['data']['timestamp']
@@ -1024,15 +1016,11 @@ def callback_get_scan_timestap(line):
         logger.warning(f"Couldn't load a log line into json object. Reason {e}")
 
 
-def callback_detect_event(line):
+@callback_pattern(FIM_EVENT_PATTERN)
+def callback_detect_event(match):
     """
     Detect an 'event' type FIM log.
     """
-    msg = r'.*Sending FIM event: (.+)$'
-    match = re.match(msg, line)
-    if not match:
-        return None
-
     try:
         json_event = json.loads(match.group(1))
         if json_event['type'] == 'event':
@@ -1041,12 +1029,8 @@ def callback_detect_event(line):
         logger.warning(f"Couldn't load a log line into json object. Reason {e}")
 
 
-def callback_detect_modified_event(line):
-    msg = r'.*Sending FIM event: (.+)$'
-    match = re.match(msg, line)
-    if not match:
-        return None
-
+@callback_pattern(FIM_EVENT_PATTERN)
+def callback_detect_modified_event(match):
     try:
         json_event = json.loads(match.group(1))
         if json_event['type'] == 'event' and json_event['data']['type'] == 'modified':
@@ -1055,12 +1039,8 @@ def callback_detect_modified_event(line):
         logger.warning(f"Couldn't load a log line into json object. Reason {e}")
 
 
-def callback_detect_delete_event(line):
-    msg = r'.*Sending FIM event: (.+)$'
-    match = re.match(msg, line)
-    if not match:
-        return None
-
+@callback_pattern(FIM_EVENT_PATTERN)
+def callback_detect_delete_event(match):
     try:
         json_event = json.loads(match.group(1))
         if json_event['type'] == 'event' and json_event['data']['type'] == 'deleted':
@@ -1069,12 +1049,8 @@ def callback_detect_delete_event(line):
         logger.warning(f"Couldn't load a log line into json object. Reason {e}")
 
 
-def callback_detect_modified_event_with_inode_mtime(line):
-    msg = r'.*Sending FIM event: (.+)$'
-    match = re.match(msg, line)
-    if not match:
-        return None
-
+@callback_pattern(FIM_EVENT_PATTERN)
+def callback_detect_modified_event_with_inode_mtime(match):
     try:
         json_event = json.loads(match.group(1))
         if json_event['type'] == 'event' and json_event['data']['type'] == 'modified':
@@ -1086,11 +1062,9 @@ def callback_detect_modified_event_with_inode_mtime(line):
         logger.warning(f"Couldn't load a log line into json object. Reason {e}")
 
 
-def callback_detect_integrity_event(line):
-    match = re.match(r'.*Sending integrity control message: (.+)$', line)
-    if match:
-        return json.loads(match.group(1))
-    return None
+@callback_pattern(r'.*Sending integrity control message: (.+)$')
+def callback_detect_integrity_event(match):
+    return json.loads(match.group(1))
 
 
 def callback_detect_registry_integrity_state_event(line):
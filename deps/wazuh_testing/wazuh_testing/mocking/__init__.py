@@ -4,6 +4,7 @@ from time import sleep
 import wazuh_testing
 from wazuh_testing.db_interface import global_db
 from wazuh_testing.db_interface import agent_db
+from wazuh_testing.db_interface import fill_rows, get_default_values
 from wazuh_testing.tools.services import control_service
 from wazuh_testing.tools import client_keys
 from wazuh_testing.tools.file import remove_file
@@ -237,6 +238,59 @@ def create_mocked_agent(name='centos8-agent', ip='127.0.0.1', register_ip='127.0
     return agent_id_str
 
 
+def create_mocked_agents(agents, **common):
+    """Mock several agents at once, restarting wazuh-db only one time for all of them.
+
+    The client keys file is rewritten once, and the agents and their OS information are inserted with multi-row
+    INSERT queries pipelined to wazuh-db.
+
+    Args:
+        agents (iterable(dict) or pandas.DataFrame): Parameters of `create_mocked_agent` of every agent.
+        common (dict): Values of the `create_mocked_agent` parameters missing in the rows.
+
+    Returns:
+        list(str): Agent IDs, in the same order as `agents`.
+
+    Example:
+        create_mocked_agents([{'name': f"mocked_agent_{number}"} for number in range(500)], os_name='Ubuntu')
+    """
+    agents = list(fill_rows(agents, get_default_values(create_mocked_agent), **common))
+    if not agents:
+        return []
+
+    # Get new agent_ids
+    first_id = int(global_db.get_last_agent_id()) + 1
+    for agent_id, agent in enumerate(agents, first_id):
+        agent['agent_id'] = str(agent_id).zfill(3)  # Convert from x to 00x
+
+    client_keys.add_client_keys_entries((agent['agent_id'], agent['name'], agent['ip'], agent['client_key_secret'])
+                                        for agent in agents)
+
+    # Create the new agents
+    agent_fields = get_default_values(global_db.create_or_update_agent)
+    global_db.create_or_update_agents({field: agent[field] for field in agent_fields} for agent in agents)
+
+    # Restart Wazuh-DB before creating new DBs
+    control_service('restart', daemon='wazuh-db')
+
+    # sleep is needed since, without it, the agent database creation may fail
+    sleep(3)
+
+    # Add os_info related to the new created agents
+    agent_db.insert_os_infos({'agent_id': agent['agent_id'], 'hostname': agent['hostname'],
+                              'architecture': agent['os_arch'], 'os_name': agent['os_name'],
+                              'os_version': agent['os_version'], 'os_codename': agent['os_codename'],
+                              'os_major': agent['os_major'], 'os_minor': agent['os_minor'],
+                              'os_patch': agent['os_patch'], 'os_build': agent['os_build'],
+                              'os_platform': agent['os_platform'], 'sysname': agent['sysname'],
+                              'release': agent['release'], 'version': agent['version'],
+                              'os_release': agent['os_release'], 'checksum': agent['checksum'],
+                              'os_display_version': agent['os_display_version'], 'triaged': agent['triaged'],
+                              'reference': agent['reference']} for agent in agents)
+
+    return [agent['agent_id'] for agent in agents]
+
+
 def delete_mocked_agent(agent_id):
     """Delete a mocked agent removing it from the global db, client keys and db file.
 
@@ -265,8 +319,8 @@ def insert_mocked_packages(agent_id='000', num_packages=10):
     """
     package_names = [f"package_{number}" for number in range(1, num_packages + 1)]
 
-    for package_name in package_names:
-        agent_db.insert_package(agent_id=agent_id, name=package_name, version='1.0.0')
+    agent_db.insert_packages([{'name': package_name} for package_name in package_names], agent_id=agent_id,
+                             version='1.0.0')
 
     return package_names
 
@@ -35,7 +35,7 @@ class DocGenerator:
     """
     LOGGER = Logging.get_logger(QADOCS_LOGGER)
 
-    def __init__(self, config, file_format='json'):
+    def __init__(self, config, file_format='json', cache_path=None):
         """Class constructor
 
         Initialize every attribute.
@@ -43,9 +43,10 @@ class DocGenerator:
         Args:
             config (Config): A `Config` instance with the loaded configuration.
             file_format (str): Generated documentation format.
+            cache_path (str): Path of the cache file of the parsed modules. None to disable the cache.
         """
         self.conf = config
-        self.parser = CodeParser(self.conf)
+        self.parser = CodeParser(self.conf, cache_path)
         self.__id_counter = 0
         self.ignore_regex = []
         for ignore_regex in self.conf.ignore_paths:
@@ -229,6 +230,25 @@ class DocGenerator:
             DocGenerator.LOGGER.error(f"Content for {path} is empty, ignoring it")
             raise QAValueError(f"Content for {path} is empty, ignoring it", DocGenerator.LOGGER.error)
 
+    def get_module_paths(self, path):
+        """Get the module files that `parse_folder` would parse within a folder.
+
+        Args:
+            path (str): A string with the path of the folder.
+
+        Returns:
+            list: A list with the paths of the module files.
+        """
+        if not os.path.exists(path) or not self.is_valid_folder(path):
+            return []
+
+        (root, folders, files) = next(os.walk(path))
+        module_paths = [os.path.join(root, file) for file in files if self.is_valid_file(file)]
+        for folder in folders:
+            module_paths.extend(self.get_module_paths(os.path.join(root, folder)))
+
+        return module_paths
+
     def parse_folder(self, path, group_id):
         """Search in a specific folder to parse possible group files and each module file.
 
@@ -260,6 +280,10 @@ class DocGenerator:
 
     def parse_module_list(self):
         """Parse the modules that the user has specified."""
+        self.parser.collect_test_cases([self.conf.include_paths[module_index]
+                                        for module_index in range(len(self.conf.include_paths))
+                                        if self.is_valid_file(f"{self.conf.test_modules[module_index]}.py")])
+
         for module_index in range(len(self.conf.include_paths)):
             if self.is_valid_file(f"{self.conf.test_modules[module_index]}.py"):
                 self.scan_path = self.conf.include_paths[module_index]
@@ -300,8 +324,10 @@ class DocGenerator:
                 print(f'{module} does not exist in {path}')
 
     def check_documentation(self):
-        for module in self.conf.test_modules:
-            module_path = self.locate_module(module)
+        module_paths = {module: self.locate_module(module) for module in self.conf.test_modules}
+        self.parser.collect_test_cases([path for path in module_paths.values() if path])
+
+        for module, module_path in module_paths.items():
             try:
                 test = self.parser.parse_module(module_path, self.__id_counter, 0)
             except Exception as qaerror:
@@ -311,6 +337,8 @@ class DocGenerator:
             if test:
                 print(f"{module} is documented using qa-docs current schema")
 
+        self.parser.save_cache()
+
     def print_module_info(self, module):
         """Print the module info to standard output.
 
@@ -328,6 +356,8 @@ class DocGenerator:
         Default mode: parse the files within the included paths.
         Single module mode: found the module required and parse it.
 
+        The test cases of all the modules are collected before parsing them, with a single pytest execution.
+
             For example:
             qa-docs -I ../../tests/ -> It would be running as `default mode`.
 
@@ -342,6 +372,10 @@ class DocGenerator:
             clean_folder(self.conf.documentation_path)
 
         if self.conf.mode == Mode.DEFAULT:
+            # Collect the test cases of every module with a single pytest execution
+            self.parser.collect_test_cases([module_path for path in self.conf.include_paths
+                                            for module_path in self.get_module_paths(path)])
+
             for path in self.conf.include_paths:
                 self.scan_path = path
                 DocGenerator.LOGGER.debug(f"Going to parse files on '{path}'")
@@ -350,5 +384,7 @@ class DocGenerator:
         elif self.conf.mode == Mode.PARSE_MODULES:
             self.parse_module_list()
 
+        self.parser.save_cache()
+
         if not self.conf.check_doc:
             DocGenerator.LOGGER.info(f"Run completed, documentation location: {self.conf.documentation_path}")
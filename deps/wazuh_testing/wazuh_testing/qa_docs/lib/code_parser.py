@@ -3,43 +3,225 @@
 # This program is free software; you can redistribute it and/or modify it under the terms of GPLv2
 
 import ast
+import copy
+import hashlib
+import json
 import os
 import re
 import yaml
+from tempfile import gettempdir
 
 from wazuh_testing.qa_docs.lib.pytest_wrap import PytestWrap
 from wazuh_testing.qa_docs.lib.utils import remove_inexistent
 from wazuh_testing.qa_docs import QADOCS_LOGGER
 from wazuh_testing.tools.logging import Logging
 from wazuh_testing.tools.exceptions import QAValueError
+from wazuh_testing.tools.file import create_private_directory
 
 INTERNAL_FIELDS = ['id', 'group_id', 'name']
 STOP_FIELDS = ['tests', 'test_cases']
+CACHE_PATH = os.path.join(gettempdir(), f'qa_docs_cache_{os.getuid()}', 'cache.json')
+DATA_FOLDER = 'data'
+PYTEST_CONFIG_FILES = ['pytest.ini', 'pyproject.toml', 'tox.ini', 'setup.cfg']
 
 
 class CodeParser:
     """Class that parses the content of the module files.
 
+    If a cache file is given, like `CACHE_PATH`, the test cases and the parsed documentation of every module are cached
+    using the hash of its content. The hash includes the `conftest.py` files of the module folder and its parents, up
+    to the pytest rootdir of the tests, and the files of its `data` folder, because the test cases are usually
+    generated from them. The modules whose hash does not change are neither collected with pytest nor parsed again.
+    The modules that could not be collected are not written in the cache file. The folder of the cache file must
+    belong to the user and not be writable by others.
+
     Attributes:
         conf (Config): A `Config` instance with the loaded configuration.
         pytest (PytestWrap): A `PytestWrap` instance to wrap the pytest execution.
         function_regexes (list): A list of regular expressions used to find test functions.
+        cache_path (str): A string with the path of the cache file. None if the cache is disabled.
+        cache (dict): A dictionary with the cached test cases and documentation of every module.
     """
     LOGGER = Logging.get_logger(QADOCS_LOGGER)
 
-    def __init__(self, config):
+    def __init__(self, config, cache_path=None):
         """Class constructor
 
         Initialize every attribute.
 
         Args:
             config (Config): A `Config` instance with the loaded configuration.
+            cache_path (str): A string with the path of the cache file. None to disable the cache, which is the default.
         """
         self.conf = config
         self.pytest = PytestWrap()
         self.function_regexes = []
         for regex in self.conf.function_regex:
             self.function_regexes.append(re.compile(regex))
+        self.cache_path = cache_path
+        if cache_path:
+            try:
+                create_private_directory(os.path.dirname(os.path.abspath(cache_path)))
+            except (OSError, ValueError) as error:
+                CodeParser.LOGGER.warning(f"Cannot use the cache file {cache_path}: {error}. Disabling the cache")
+                self.cache_path = None
+        self.__root_folder = self.__get_root_folder()
+        self.__folder_hashes = {}
+        self.__schema_hash = hashlib.sha256(json.dumps([self.conf._schema_data, self.conf.function_regex],
+                                                       sort_keys=True, default=str).encode()).hexdigest()
+        self.cache = self.load_cache()
+
+    def load_cache(self):
+        """Load the cache file.
+
+        The cache is discarded if it does not exist, it is corrupted or it was generated with another schema.
+
+        Returns:
+            dict: A dictionary with the cached modules.
+        """
+        if self.cache_path and os.path.isfile(self.cache_path):
+            try:
+                with open(self.cache_path) as cache_file:
+                    cache = json.load(cache_file)
+                if cache.get('schema') == self.__schema_hash:
+                    CodeParser.LOGGER.debug(f"Loaded the cache file {self.cache_path}")
+                    return cache
+            except (IOError, ValueError):
+                CodeParser.LOGGER.warning(f"Cannot load the cache file {self.cache_path}, ignoring it")
+
+        return {'schema': self.__schema_hash, 'modules': {}}
+
+    def save_cache(self):
+        """Write the cache file, creating its folder if it does not exist."""
+        if not self.cache_path:
+            return
+
+        try:
+            with open(self.cache_path, 'w') as cache_file:
+                json.dump({'schema': self.cache['schema'],
+                           'modules': {path: module for path, module in self.cache['modules'].items()
+                                       if module['complete']}}, cache_file)
+            CodeParser.LOGGER.debug(f"Cache saved in {self.cache_path}")
+        except IOError:
+            CodeParser.LOGGER.warning(f"Cannot write the cache file {self.cache_path}")
+
+    def __get_root_folder(self):
+        """Get the pytest rootdir of the tests, the last folder whose files can change the test cases.
+
+        Returns:
+            str: A string with the real path of the nearest folder with a pytest configuration file that contains the
+                 tests, or the tests folder itself if there is none.
+        """
+        project_path = os.path.realpath(self.conf.project_path)
+        folder = project_path
+        while not any(os.path.isfile(os.path.join(folder, name)) for name in PYTEST_CONFIG_FILES):
+            parent = os.path.dirname(folder)
+            if parent == folder:
+                return project_path
+            folder = parent
+
+        return folder
+
+    def __get_folder_hash(self, folder):
+        """Get the hash of the files of a module folder that can change its test cases.
+
+        The hash includes the files of the parent folders up to the pytest rootdir.
+
+        Args:
+            folder (str): A string with the real path of the folder.
+
+        Returns:
+            str: A string with the hash of the `conftest.py` files and the files of the `data` folder.
+        """
+        if folder not in self.__folder_hashes:
+            digest = hashlib.sha256()
+            parent = os.path.dirname(folder)
+            if folder.startswith(os.path.join(self.__root_folder, '')):
+                digest.update(self.__get_folder_hash(parent).encode())
+
+            files = [os.path.join(folder, 'conftest.py')]
+            for root, folders, names in os.walk(os.path.join(folder, DATA_FOLDER)):
+                folders.sort()
+                files.extend(os.path.join(root, name) for name in sorted(names))
+
+            for file in files:
+                if os.path.isfile(file):
+                    digest.update(file.encode())
+                    with open(file, 'rb') as fd:
+                        digest.update(hashlib.sha256(fd.read()).digest())
+
+            self.__folder_hashes[folder] = digest.hexdigest()
+
+        return self.__folder_hashes[folder]
+
+    def get_module_hash(self, path):
+        """Get the hash of a module file, including the files of its folder that can change its test cases.
+
+        Args:
+            path (str): A string with the path of the module file.
+
+        Returns:
+            str: A string with the hash of the module.
+        """
+        with open(path, 'rb') as fd:
+            content = fd.read()
+
+        folder_hash = self.__get_folder_hash(os.path.dirname(os.path.realpath(path)))
+
+        return hashlib.sha256(content + folder_hash.encode()).hexdigest()
+
+    def __get_cached_module(self, path):
+        """Get the cache entry of a module, creating a new one if the module has changed.
+
+        Args:
+            path (str): A string with the path of the module file.
+
+        Returns:
+            dict: A dictionary with the hash, the test cases, the documentation of the module and whether it can be
+                  written in the cache file.
+        """
+        key = os.path.realpath(path)
+        module_hash = self.get_module_hash(path)
+        cached_module = self.cache['modules'].get(key)
+
+        if cached_module is None or cached_module['hash'] != module_hash:
+            cached_module = {'hash': module_hash, 'test_cases': None, 'doc': None, 'complete': True}
+            self.cache['modules'][key] = cached_module
+
+        return cached_module
+
+    def collect_test_cases(self, paths):
+        """Collect the test cases of several module files with a single pytest execution.
+
+        Only the modules that have changed since they were cached are collected.
+
+        Args:
+            paths (list): A list with the paths of the module files.
+        """
+        pending = [path for path in paths if self.__get_cached_module(path)['test_cases'] is None]
+        CodeParser.LOGGER.debug(f"{len(paths) - len(pending)} of {len(paths)} module(s) found in the cache")
+
+        if pending:
+            for path, test_cases in self.pytest.collect_modules_test_cases(pending).items():
+                if path in self.cache['modules']:
+                    self.cache['modules'][path]['test_cases'] = test_cases
+                    self.cache['modules'][path]['complete'] = self.pytest.collection_succeeded(path)
+
+    def get_test_cases(self, path):
+        """Get the test cases of a module file, collecting them if they are not cached.
+
+        Args:
+            path (str): A string with the path of the module file.
+
+        Returns:
+            dict: A dictionary with the test function names as keys and the test cases as values.
+        """
+        cached_module = self.__get_cached_module(path)
+        if cached_module['test_cases'] is None:
+            cached_module['test_cases'] = self.pytest.collect_test_cases(path)
+            cached_module['complete'] = self.pytest.collection_succeeded(path)
+
+        return cached_module['test_cases']
 
     def is_documentable_function(self, function):
         """Check if a specific method matches with the regexes to be documented.
@@ -192,6 +374,14 @@ class CodeParser:
         Returns:
             module_doc (dict): A dictionary with the documentation block parsed with module and tests fields.
         """
+        cached_module = self.__get_cached_module(path)
+        if cached_module['doc'] is not None:
+            CodeParser.LOGGER.debug(f"Using the cached documentation of '{path}'")
+            module_doc = copy.deepcopy(cached_module['doc'])
+            module_doc['id'] = id
+            module_doc['group_id'] = group_id
+            return module_doc
+
         CodeParser.LOGGER.debug(f"Parsing module file '{path}'")
         self.scan_file = path
         with open(path) as fd:
@@ -220,8 +410,8 @@ class CodeParser:
 
                     if function_doc:
                         if 'inputs' not in function_doc:
-                            test_cases = self.pytest.collect_test_cases(path)
-                            if test_cases and test_cases[function.name]:
+                            test_cases = self.get_test_cases(path)
+                            if test_cases.get(function.name):
                                 function_doc['inputs'] = test_cases[function.name]
                         # ES throwing errors because of the expected_output format in some cases
                         # -> Inserting the raw string and its comment between double quotes fixes it
@@ -246,6 +436,7 @@ class CodeParser:
                 module_doc['tests'] = functions_doc
 
             self.remove_ignored_fields(module_doc)
+            cached_module['doc'] = copy.deepcopy(module_doc)
 
         return module_doc
 
@@ -14,10 +14,31 @@ class PytestPlugin:
     """Plugin to extract information from a pytest execution.
 
     Attributes:
-        collected (list): A list with the collected data from pytest execution
+        collected (list): A list with the path of the module file and the node ID of each collected test case.
+        failed (set): A set with the real path of each module file or folder that could not be collected.
+        rootpath (str): A string with the root directory of the execution, which the node IDs are relative to.
     """
     def __init__(self):
         self.collected = []
+        self.failed = set()
+        self.rootpath = os.getcwd()
+
+    def pytest_configure(self, config):
+        """Callback to receive the configuration of a pytest execution.
+
+        Args:
+            config (pytest.Config): The configuration of the execution.
+        """
+        self.rootpath = str(config.rootpath)
+
+    def pytest_collectreport(self, report):
+        """Callback to receive the result of the collection of each module file and folder.
+
+        Args:
+            report (pytest.CollectReport): The result of the collection.
+        """
+        if report.failed:
+            self.failed.add(os.path.realpath(os.path.join(self.rootpath, report.nodeid.split("::")[0])))
 
     def pytest_collection_modifyitems(self, items):
         """Callback to receive the output of a pytest execution.
@@ -26,50 +47,93 @@ class PytestPlugin:
             items (list): A list with the metadata from each test case.
         """
         for item in items:
-            self.collected.append(item.nodeid)
+            self.collected.append((os.path.realpath(str(item.fspath)), item.nodeid))
 
 
 class PytestWrap:
     """Class that wraps the execution of pytest.
 
     Attributes:
-        plugin (PytestPlugin): A `PytestPlugin` instance.
+        plugin (PytestPlugin): The `PytestPlugin` instance of the last execution.
+        exit_code (int): The exit code of the last execution.
     """
     LOGGER = Logging.get_logger(QADOCS_LOGGER)
 
     def __init__(self):
         self.plugin = PytestPlugin()
+        self.exit_code = None
 
-    def collect_test_cases(self, path):
-        """Execute pytest in 'collect-only' mode to extract all the test cases found for a module file.
+    def collection_succeeded(self, path):
+        """Check if the last execution collected a module file without errors.
 
         Args:
-            path (str): A string with the path of the module file to extract the test cases.
+            path (str): A string with the path of the module file.
 
         Returns:
-            outpout (dict): A dictionary that contains the pytest parsed output.
+            bool: False if the module, one of its folders or the whole execution failed. True otherwise.
+        """
+        if self.exit_code in (pytest.ExitCode.INTERNAL_ERROR, pytest.ExitCode.USAGE_ERROR):
+            return False
+
+        path = os.path.realpath(path)
+        return not any(path == failed or path.startswith(os.path.join(failed, '')) for failed in self.plugin.failed)
+
+    @staticmethod
+    def parse_node_id(node_id):
+        """Get the test function and the test case from a pytest node ID.
+
+        Args:
+            node_id (str): A string with the node ID, like `path/test_module.py::test_function[test_case]`.
+
+        Returns:
+            tuple: A tuple with the test function name and the test case, None if the test is not parametrized.
         """
-        PytestWrap.LOGGER.debug(f"Running pytest to collect test cases for '{path}'")
+        tmp = node_id.split("::")
+        tmp = tmp[1].split("[")
+        test = tmp[0]
+        test_case = tmp[1].split("]")[0] if len(tmp) >= 2 else None
+
+        return test, test_case
+
+    def collect_modules_test_cases(self, paths):
+        """Execute pytest in 'collect-only' mode once to extract the test cases of several module files.
+
+        Args:
+            paths (list): A list with the paths of the module files to extract the test cases.
+
+        Returns:
+            output (dict): A dictionary with the real path of every module file as key and its test cases, as
+                           returned by `collect_test_cases`, as value.
+        """
+        PytestWrap.LOGGER.debug(f"Running pytest to collect test cases for {len(paths)} module(s)")
+        self.plugin = PytestPlugin()
 
         # Redirect the stdout to 'null' so --collect-only does not log anything
         default_stdout = sys.stdout
-        no_stdout = open(os.devnull, 'w')
-        sys.stdout = no_stdout
-        pytest.main(['--collect-only', "-qq", path], plugins=[self.plugin])
-        sys.stdout = default_stdout
-        output = {}
+        with open(os.devnull, 'w') as no_stdout:
+            sys.stdout = no_stdout
+            try:
+                self.exit_code = pytest.main(['--collect-only', "-qq", *paths], plugins=[self.plugin])
+            finally:
+                sys.stdout = default_stdout
 
-        for item in self.plugin.collected:
-            tmp = item.split("::")
-            tmp = tmp[1].split("[")
-            test = tmp[0]
+        output = {os.path.realpath(path): {} for path in paths}
+        for path, node_id in self.plugin.collected:
+            test, test_case = self.parse_node_id(node_id)
+            module_test_cases = output.setdefault(path, {}).setdefault(test, [])
 
-            if test not in output:
-                output[test] = []
-
-            if len(tmp) >= 2:
-                tmp = tmp[1].split("]")
-                test_case = tmp[0]
-                output[test].append(test_case)
+            if test_case is not None:
+                module_test_cases.append(test_case)
 
         return output
+
+    def collect_test_cases(self, path):
+        """Execute pytest in 'collect-only' mode to extract all the test cases found for a module file.
+
+        Args:
+            path (str): A string with the path of the module file to extract the test cases.
+
+        Returns:
+            outpout (dict): A dictionary that contains the pytest parsed output.
+        """
+        return self.collect_modules_test_cases([path])[os.path.realpath(path)]
@@ -0,0 +1,83 @@
+import argparse
+import os
+import random
+import re
+from tempfile import gettempdir
+from time import perf_counter
+
+from wazuh_testing.tools.pattern_matcher import MultiPatternMatcher, PatternCallback
+
+BENCHMARK_PATTERNS = [
+    r'.*wazuh-remoted.*Started \(pid: \d+\)\. Listening on port (\d+)\/(TCP|UDP)',
+    r'.*wazuh-logcollector.*Analyzing file: \'(.+)\'',
+    r'.*wazuh-syscheckd.*Sending FIM event: (.+)$',
+    r'.*wazuh-agentd.*Trying to connect to server \((.+)\)',
+    r'.*wazuh-modulesd:vulnerability-detector.*Finished vulnerability assessment for agent \'(\d+)\'',
+    r'.*wazuh-authd.*Accepting connections on port 1515',
+    r'.*wazuh-db.*Cannot open database \'(.+)\'',
+    r'.*wazuh-analysisd.*Total rules enabled: \'(\d+)\''
+]
+NOISE_LINES = [
+    '{date} wazuh-syscheckd: INFO: (6009): File integrity monitoring scan ended.',
+    '{date} wazuh-logcollector: INFO: (1950): Analyzing file: \'/var/log/syslog\'.',
+    '{date} wazuh-remoted: INFO: Agent \'{number:03}\' connected from 192.168.0.{number}.',
+    '{date} wazuh-modulesd:syscollector: INFO: Evaluation finished.',
+    '{date} wazuh-analysisd: WARNING: Unable to load the rule {number}.',
+    '{date} wazuh-db: DEBUG: Closing database for agent {number}.'
+]
+
+
+def get_script_arguments():
+    parser = argparse.ArgumentParser(usage="%(prog)s [options]",
+                                     description="Benchmark of MultiPatternMatcher against one re.match per callback",
+                                     formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument('-l', '--log', dest='log', default=os.path.join(gettempdir(), 'benchmark_ossec.log'),
+                        help='Log file to scan. It is generated if it does not exist.')
+    parser.add_argument('-n', '--lines', dest='lines', type=int, default=1000000,
+                        help='Number of lines of the generated log. Default 1000000.')
+
+    return parser.parse_args()
+
+
+def generate_log(path, lines):
+    """Generate a synthetic ossec.log with a few lines matching the benchmark patterns."""
+    random.seed(0)
+    with open(path, 'w') as log:
+        for index in range(lines):
+            date = f"2022/10/10 10:{index // 60 % 60:02}:{index % 60:02}"
+            if index % 10000 == 0:
+                log.write(f"{date} wazuh-authd: INFO: Accepting connections on port 1515. No password required.\n")
+            else:
+                log.write(random.choice(NOISE_LINES).format(date=date, number=random.randint(1, 254)) + '\n')
+
+
+def per_callback_scan(lines):
+    """Scan the lines as the monitoring callbacks did: one `re.match` with a pattern string per callback."""
+    callbacks = [lambda line, pattern=pattern: re.match(pattern, line) is not None for pattern in BENCHMARK_PATTERNS]
+    return sum(1 for line in lines for callback in callbacks if callback(line))
+
+
+def multi_pattern_scan(lines):
+    """Scan the lines with a single MultiPatternMatcher."""
+    matcher = MultiPatternMatcher([PatternCallback(pattern) for pattern in BENCHMARK_PATTERNS])
+    return sum(len(matcher(line)) for line in lines)
+
+
+def main():
+    options = get_script_arguments()
+
+    if not os.path.exists(options.log):
+        generate_log(options.log, options.lines)
+
+    with open(options.log, errors='backslashreplace') as log:
+        lines = log.readlines()
+
+    for name, function in (('per-callback re.match', per_callback_scan), ('MultiPatternMatcher', multi_pattern_scan)):
+        tic = perf_counter()
+        matches = function(lines)
+        elapsed = perf_counter() - tic
+        print(f"{name:<24} {len(lines) / elapsed:>14,.0f} lines/s {elapsed:>8.2f}s {matches} matches")
+
+
+if __name__ == '__main__':
+    main()
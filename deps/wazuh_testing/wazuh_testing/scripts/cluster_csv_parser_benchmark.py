@@ -0,0 +1,116 @@
+# Copyright (C) 2015-2022, Wazuh Inc.
+# Created by Wazuh, Inc. <info@wazuh.com>.
+# This program is free software; you can redistribute it and/or modify it under the terms of GPLv2
+import argparse
+import csv
+import os
+import resource
+from datetime import datetime, timedelta
+from multiprocessing import get_context
+from random import Random
+from shutil import rmtree
+from tempfile import gettempdir, mkdtemp
+from time import perf_counter
+
+from wazuh_testing.tools.performance.binary import MultiProcessMonitor
+from wazuh_testing.tools.performance.csv_parser import ClusterCSVResourcesParser, ClusterCSVTasksParser
+from wazuh_testing.tools.performance.storage import read_data_file
+
+TASK_FILES = ['integrity_check', 'integrity_sync', 'agent-info_sync', 'agent-groups_send', 'agent-groups_recv']
+BINARY_FILES = ['wazuh-clusterd', 'wazuh-clusterd_child_1', 'wazuh-clusterd_child_2', 'wazuh-modulesd',
+                'wazuh-analysisd']
+
+
+def get_script_arguments():
+    parser = argparse.ArgumentParser(usage="%(prog)s [options]",
+                                     description="Benchmark of the load of cluster artifacts by the CSV parsers",
+                                     formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument('-p', '--path', dest='path', default=os.path.join(gettempdir(), 'benchmark_artifacts'),
+                        help='Artifacts directory. It is generated if it does not exist.')
+    parser.add_argument('-n', '--workers-nodes', dest='nodes', type=int, default=25,
+                        help='Number of worker nodes of the generated artifacts. Default 25.')
+    parser.add_argument('-r', '--rows', dest='rows', type=int, default=20000,
+                        help='Rows of every generated resources file. Default 20000.')
+    parser.add_argument('-w', '--workers', dest='workers', type=int, default=os.cpu_count(),
+                        help='Number of files loaded at the same time. Default: number of CPUs.')
+
+    return parser.parse_args()
+
+
+def generate_artifacts(path, nodes, rows):
+    """Generate the tasks and resources CSVs of a master and `nodes` workers."""
+    random = Random(0)
+    start = datetime(2022, 1, 1)
+    header = MultiProcessMonitor(value_unit='KB', time_step=1, version='4.4.0', dst_dir=path).get_header()
+
+    for node in ['master'] + [f"worker_{number}" for number in range(1, nodes + 1)]:
+        logs_path = os.path.join(path, node, 'data', 'logs')
+        binaries_path = os.path.join(path, node, 'data', 'binaries')
+        os.makedirs(logs_path)
+        os.makedirs(binaries_path)
+
+        for task in TASK_FILES:
+            with open(os.path.join(logs_path, f"{task}.csv"), 'w', newline='') as task_file:
+                writer = csv.writer(task_file)
+                writer.writerow(['Timestamp', 'node_name', 'activity', 'time_spent(s)'])
+                for row in range(rows // 10):
+                    writer.writerow([(start + timedelta(seconds=row * 10)).strftime('%Y/%m/%d %H:%M:%S'), node, task,
+                                     round(random.uniform(0.01, 2), 3)])
+
+        for daemon in BINARY_FILES:
+            with open(os.path.join(binaries_path, f"{daemon}.csv"), 'w', newline='') as binary_file:
+                writer = csv.writer(binary_file)
+                writer.writerow(header)
+                for row in range(rows):
+                    writer.writerow([daemon, '4.4.0', (start + timedelta(seconds=row)).strftime('%Y/%m/%d %H:%M:%S'),
+                                     1000] + [round(random.uniform(0, 1000), 2) for _ in header[4:]])
+
+
+def run(arguments):
+    """Get the stats of the test_cluster_performance parsers, in a new process to measure its peak memory."""
+    path, mode, workers, cache_path = arguments
+    options = {'workers': 1, 'cache_path': None} if mode == 'eager' else {'workers': workers, 'cache_path': cache_path}
+
+    tic = perf_counter()
+    parsers = [ClusterCSVTasksParser(path, **options), ClusterCSVResourcesParser(path, **options)]
+    eager_load_time = 0.0
+    if mode == 'eager':
+        # Load every file with all its columns, one by one, as the parsers did before loading lazily
+        for parser in parsers:
+            load_tic = perf_counter()
+            for data_type, nodes in parser.files.items():
+                for node, files in nodes.items():
+                    for file_name, data_file in files.items():
+                        parser._dataframes[data_type][node][file_name] = read_data_file(data_file)
+            eager_load_time += perf_counter() - load_tic
+    stats = [parser.get_stats() for parser in parsers]
+    elapsed = perf_counter() - tic
+
+    return {'elapsed': elapsed, 'load_time': eager_load_time + sum(parser.load_time for parser in parsers),
+            'peak_memory': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, 'stats': repr(stats)}
+
+
+def main():
+    options = get_script_arguments()
+    if not os.path.exists(options.path):
+        print(f"Generating artifacts of 1 master and {options.nodes} workers in {options.path}")
+        generate_artifacts(options.path, options.nodes, options.rows)
+
+    cache_path = mkdtemp()
+    # Spawn a new process for every run, so the peak memory of one does not count in the next
+    context = get_context('spawn')
+    results = {}
+    try:
+        for mode in ['eager', 'lazy', 'cached']:
+            with context.Pool(1) as pool:
+                results[mode] = pool.apply(run, ((options.path, mode, options.workers, cache_path),))
+            print(f"{mode:<8} total {results[mode]['elapsed']:>7.2f}s  load {results[mode]['load_time']:>7.2f}s  "
+                  f"peak memory {results[mode]['peak_memory'] / 1024:>8.1f}MB")
+    finally:
+        rmtree(cache_path)
+
+    print(f"Same stats: {len(set(result['stats'] for result in results.values())) == 1}")
+
+
+if __name__ == '__main__':
+    main()
@@ -3,7 +3,7 @@ from os import makedirs
 from os.path import exists
 from tempfile import gettempdir
 
-from wazuh_testing.tools.performance.visualization import DataVisualizer
+from wazuh_testing.tools.performance.visualization import DataVisualizer, DOWNSAMPLING_METHODS, MAX_POINTS
 
 
 def get_script_arguments():
@@ -18,6 +18,14 @@ def get_script_arguments():
                         help=f'Directory to store the images. Default {gettempdir()}')
     parser.add_argument('-n', '--name', dest='name', default=None,
                         help=f'Base name for the images. Default {None}.')
+    parser.add_argument('-p', '--max-points', dest='max_points', type=int, default=MAX_POINTS,
+                        help=f'Maximum number of points of every figure, 0 to draw all of them. Default {MAX_POINTS}.')
+    parser.add_argument('-m', '--downsampling', dest='downsampling', default='lttb', choices=DOWNSAMPLING_METHODS,
+                        help='Algorithm to downsample the lines keeping their shape. Default lttb.')
+    parser.add_argument('-w', '--workers', dest='workers', type=int, default=None,
+                        help='Number of processes rendering the figures. Default: number of CPUs.')
+    parser.add_argument('--html', dest='html', action='store_true', default=False,
+                        help='Also store the figures in an interactive HTML file. Requires the plotly package.')
 
     return parser.parse_args()
 
@@ -29,7 +37,9 @@ def main():
     if not exists(destination):
         makedirs(destination)
     dv = DataVisualizer(dataframes=options.csv_list, target=options.visualization_target,
-                        compare=False, store_path=options.destination, base_name=options.name)
+                        compare=False, store_path=options.destination, base_name=options.name,
+                        max_points=options.max_points, downsampling=options.downsampling, workers=options.workers,
+                        html=options.html)
     dv.plot()
 
 
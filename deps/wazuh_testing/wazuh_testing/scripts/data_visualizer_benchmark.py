@@ -0,0 +1,92 @@
+# Copyright (C) 2015-2022, Wazuh Inc.
+# Created by Wazuh, Inc. <info@wazuh.com>.
+# This program is free software; you can redistribute it and/or modify it under the terms of GPLv2
+import argparse
+import os
+from shutil import rmtree
+from tempfile import gettempdir, mkdtemp
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+
+from wazuh_testing.tools.performance import visualization
+from wazuh_testing.tools.performance.binary import MultiProcessMonitor
+from wazuh_testing.tools.performance.visualization import DataVisualizer, DOWNSAMPLING_METHODS, MAX_POINTS
+
+DAEMONS = ['wazuh-analysisd', 'wazuh-remoted', 'wazuh-db', 'wazuh-modulesd', 'wazuh-clusterd', 'wazuh-authd']
+
+
+def get_script_arguments():
+    parser = argparse.ArgumentParser(usage="%(prog)s [options]",
+                                     description="Benchmark of the DataVisualizer rendering with full resolution "
+                                                 "against downsampled and parallel rendering",
+                                     formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument('-s', '--source', dest='source', default=os.path.join(gettempdir(), 'visualizer_benchmark.csv'),
+                        help='Binary CSV to plot. It is generated if it does not exist.')
+    parser.add_argument('-H', '--hours', dest='hours', type=int, default=48,
+                        help='Duration of the generated data, with one row per second and daemon. Default 48.')
+    parser.add_argument('-d', '--daemons', dest='daemons', type=int, default=3,
+                        help=f'Number of daemons of the generated data, up to {len(DAEMONS)}. Default 3.')
+    parser.add_argument('-c', '--columns', dest='columns', type=int, default=4,
+                        help='Number of metrics of the generated data, every one is a figure. Default 4.')
+    parser.add_argument('-p', '--max-points', dest='max_points', type=int, default=MAX_POINTS,
+                        help=f'Maximum number of points of every downsampled figure. Default {MAX_POINTS}.')
+    parser.add_argument('-m', '--downsampling', dest='downsampling', default='lttb', choices=DOWNSAMPLING_METHODS,
+                        help='Downsampling algorithm. Default lttb.')
+    parser.add_argument('-w', '--workers', dest='workers', type=int, default=os.cpu_count(),
+                        help='Number of processes of the parallel run. Default: number of CPUs.')
+
+    return parser.parse_args()
+
+
+def generate_data(path, hours, daemons, columns):
+    """Generate a binary CSV with a random walk of every metric, one row per second and daemon."""
+    random = np.random.default_rng(0)
+    header = MultiProcessMonitor(value_unit='KB', time_step=1, version='4.4.0', dst_dir=gettempdir()).get_header()
+    rows = hours * 3600
+    timestamps = pd.date_range('2022-01-01', periods=rows, freq='s').strftime('%Y/%m/%d %H:%M:%S')
+    dataframes = []
+    for daemon in DAEMONS[:daemons]:
+        dataframe = pd.DataFrame({'Daemon': daemon, 'Version': '4.4.0', 'Timestamp': timestamps, 'PID': 1000})
+        for column in header[4:4 + columns]:
+            dataframe[column] = np.abs(np.cumsum(random.normal(size=rows))).round(2)
+        dataframes.append(dataframe)
+    pd.concat(dataframes).to_csv(path, index=False)
+
+
+def run(source, name, **kwargs):
+    """Plot the source in a new directory and print the time spent and the size of the images."""
+    store_path = mkdtemp()
+    try:
+        # A tick every 2 hours, as the default of a tick per minute draws thousands of labels in a 48 hours test
+        visualizer = DataVisualizer([source], 'binary', store_path=store_path, x_ticks_interval=120, **kwargs)
+        tic = perf_counter()
+        paths = visualizer.plot()
+        elapsed = perf_counter() - tic
+        points = sum(len(series) for figure in visualizer._figures for _, _, series in figure['lines'])
+        size = sum(os.path.getsize(path) for path in paths)
+        print(f"{name:<20} {elapsed:>8.2f}s  {len(paths):>3} files  {size / 1024 ** 2:>8.2f}MB  {points:>10} points")
+    finally:
+        rmtree(store_path)
+
+
+def main():
+    options = get_script_arguments()
+    if not os.path.exists(options.source):
+        print(f"Generating {options.hours}h of {options.columns} metrics of {options.daemons} daemons in "
+              f"{options.source}")
+        generate_data(options.source, options.hours, options.daemons, options.columns)
+
+    run(options.source, 'full resolution', max_points=None, workers=1)
+    run(options.source, options.downsampling, max_points=options.max_points, downsampling=options.downsampling,
+        workers=1)
+    run(options.source, f"{options.downsampling} parallel", max_points=options.max_points,
+        downsampling=options.downsampling, workers=options.workers)
+    if visualization.go is not None:
+        run(options.source, f"{options.downsampling} + html", max_points=options.max_points,
+            downsampling=options.downsampling, workers=options.workers, html=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+# Copyright (C) 2015-2022, Wazuh Inc.
+# Created by Wazuh, Inc. <info@wazuh.com>.
+# This program is free software; you can redistribute it and/or modify it under the terms of GPLv2
+import argparse
+import os
+import random
+from multiprocessing import cpu_count
+from tempfile import gettempdir, mkdtemp
+from shutil import rmtree
+from time import perf_counter
+
+from wazuh_testing.tools.performance.binary import ClusterLogParser
+
+ACTIVITIES = ['Integrity check', 'Integrity sync', 'Agent-info sync', 'Agent-groups send', 'Agent-groups recv']
+NOISE_LINES = [
+    '{date} DEBUG: [Worker {worker}] [Main] Command received: b\'keepalive\'',
+    '{date} INFO: [Worker {worker}] [Integrity check] Starting.',
+    '{date} DEBUG2: [Worker {worker}] [Agent-info sync] Obtained {number} chunks of data in 0.012s.',
+    '{date} INFO: [Local Server] [Main] Serving on /var/ossec/queue/cluster/c-internal.sock'
+]
+
+
+def get_script_arguments():
+    parser = argparse.ArgumentParser(usage="%(prog)s [options]",
+                                     description="Benchmark of the cluster log parser, in memory and streaming",
+                                     formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument('-l', '--log', dest='log', default=os.path.join(gettempdir(), 'benchmark_cluster.log'),
+                        help='Cluster log to parse. It is generated if it does not exist.')
+    parser.add_argument('-n', '--lines', dest='lines', type=int, default=5000000,
+                        help='Number of lines of the generated log. Default 5000000.')
+    parser.add_argument('-w', '--workers', dest='workers', type=int, default=cpu_count(),
+                        help=f"Number of processes of the parallel parser. Default {cpu_count()}.")
+
+    return parser.parse_args()
+
+
+def generate_log(path, lines):
+    """Generate a synthetic cluster.log where a third of the lines report the duration of a task."""
+    random.seed(0)
+    with open(path, 'w') as log:
+        for index in range(lines):
+            date = f"2022/10/10 10:{index // 60 % 60:02}:{index % 60:02}"
+            worker = f"worker_manager_{random.randint(1, 25)}"
+            if index % 3 == 0:
+                log.write(f"{date} INFO: [Worker {worker}] [{random.choice(ACTIVITIES)}] Finished in "
+                          f"{random.random():.3f}s.\n")
+            else:
+                log.write(random.choice(NOISE_LINES).format(date=date, worker=worker,
+                                                            number=random.randint(1, 100)) + '\n')
+
+
+def in_memory_parse(parser):
+    """Parse the log as the original parser did: read it whole and keep every match before writing."""
+    parser.data = dict()
+    with open(parser.log_file) as log:
+        for match in parser.regex.finditer(log.read()):
+            parser.data.setdefault(match.group(3), []).append(match.groups())
+    parser.write_csv()
+
+
+def main():
+    options = get_script_arguments()
+
+    if not os.path.exists(options.log):
+        generate_log(options.log, options.lines)
+
+    with open(options.log, 'rb') as log:
+        lines = sum(chunk.count(b'\n') for chunk in iter(lambda: log.read(1 << 24), b''))
+
+    for name, workers, function in (('read + finditer', 1, in_memory_parse),
+                                    ('streaming', 1, ClusterLogParser.write_csv),
+                                    (f"streaming, {options.workers} workers", options.workers,
+                                     ClusterLogParser.write_csv)):
+        dst_dir = mkdtemp(prefix='log_parser_benchmark_')
+        try:
+            parser = ClusterLogParser(options.log, dst_dir=dst_dir, workers=workers)
+            tic = perf_counter()
+            function(parser)
+            elapsed = perf_counter() - tic
+            rows = sum(sum(1 for _ in open(os.path.join(dst_dir, file))) - 1 for file in os.listdir(dst_dir))
+        finally:
+            rmtree(dst_dir)
+        print(f"{name:<24} {lines / elapsed:>14,.0f} lines/s {elapsed:>8.2f}s {rows} rows")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+# Copyright (C) 2015-2022, Wazuh Inc.
+# Created by Wazuh, Inc. <info@wazuh.com>.
+# This program is free software; you can redistribute it and/or modify it under the terms of GPLv2
+import argparse
+import os
+import sqlite3
+from tempfile import gettempdir
+from time import perf_counter
+
+from wazuh_testing.db_interface import build_insert_queries
+from wazuh_testing.db_interface import agent_db
+
+
+def get_script_arguments():
+    parser = argparse.ArgumentParser(usage="%(prog)s [options]",
+                                     description="Benchmark of the bulk mocking of agents and packages against one "
+                                                 "query per row",
+                                     formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument('-a', '--agents', dest='agents', type=int, default=500,
+                        help='Number of mocked agents. Default 500.')
+    parser.add_argument('-p', '--packages', dest='packages', type=int, default=2000,
+                        help='Number of packages of every agent. Default 2000.')
+    parser.add_argument('-s', '--sample-agents', dest='sample_agents', type=int, default=5,
+                        help='Number of agents whose packages are inserted one by one to measure the row by row rate.'
+                             ' Default 5.')
+    parser.add_argument('-t', '--target', dest='target', choices=['wazuh-db', 'sqlite'], default='sqlite',
+                        help='Insert the rows through wazuh-db (requires a Wazuh manager) or run the same queries in a '
+                             'local SQLite database.\nDefault sqlite.')
+    parser.add_argument('-d', '--db', dest='db', default=os.path.join(gettempdir(), 'mocking_benchmark.db'),
+                        help='SQLite database used by the sqlite target. It is recreated in every run.')
+
+    return parser.parse_args()
+
+
+def get_packages(agent_ids, packages_number):
+    """Generate the packages of every agent."""
+    return ({'agent_id': agent_id, 'name': f"package_{number}", 'version': '1.0.0'}
+            for agent_id in agent_ids for number in range(1, packages_number + 1))
+
+
+def report(name, rows, elapsed):
+    print(f"{name:<32} {rows / elapsed:>14,.0f} rows/s {elapsed:>8.2f}s {rows} rows")
+
+
+def benchmark_sqlite(options):
+    """Run the per-row and the multi-row queries in a local SQLite database with the sys_programs columns."""
+    if os.path.exists(options.db):
+        os.remove(options.db)
+    connection = sqlite3.connect(options.db, isolation_level=None)
+    connection.execute(f"CREATE TABLE sys_programs ({', '.join(agent_db.PACKAGE_COLUMNS)})")
+
+    def run(queries):
+        rows = 0
+        for query in queries:
+            connection.execute(query.replace('agent 000 sql ', '', 1))
+            rows += 1
+        return rows
+
+    sample_ids = ['000'] * options.sample_agents
+    tic = perf_counter()
+    rows = sum(run(build_insert_queries('agent 000 sql', 'sys_programs', agent_db.PACKAGE_COLUMNS, [row],
+                                        batch_rows=1))
+               for row in agent_db.get_package_rows(get_packages(sample_ids, options.packages)))
+    report('one INSERT per row', rows, perf_counter() - tic)
+
+    tic = perf_counter()
+    connection.execute('BEGIN')
+    rows = agent_db.get_package_rows(get_packages(['000'] * options.agents, options.packages))
+    queries = run(build_insert_queries('agent 000 sql', 'sys_programs', agent_db.PACKAGE_COLUMNS, rows))
+    connection.execute('COMMIT')
+    report(f"multi-row INSERT ({queries} queries)", options.agents * options.packages, perf_counter() - tic)
+
+    connection.close()
+    os.remove(options.db)
+
+
+def benchmark_wazuh_db(options):
+    """Mock the agents and insert their packages through wazuh-db, one by one and in bulk."""
+    from wazuh_testing import mocking
+
+    tic = perf_counter()
+    agent_ids = mocking.create_mocked_agents({'name': f"mocked_agent_{number}"} for number in range(options.agents))
+    report('create_mocked_agents', len(agent_ids), perf_counter() - tic)
+
+    try:
+        sample_ids = agent_ids[:options.sample_agents]
+        tic = perf_counter()
+        for package in get_packages(sample_ids, options.packages):
+            agent_db.insert_package(**package)
+        report('insert_package', len(sample_ids) * options.packages, perf_counter() - tic)
+
+        for agent_id in sample_ids:
+            agent_db.clean_sys_programs(agent_id)
+
+        tic = perf_counter()
+        rows = agent_db.insert_packages(get_packages(agent_ids, options.packages))
+        report('insert_packages', rows, perf_counter() - tic)
+    finally:
+        mocking.delete_all_mocked_agents()
+
+
+def main():
+    options = get_script_arguments()
+
+    if options.target == 'sqlite':
+        benchmark_sqlite(options)
+    else:
+        benchmark_wazuh_db(options)
+
+
+if __name__ == '__main__':
+    main()
@@ -17,6 +17,7 @@ from wazuh_testing.qa_docs.lib.index_data import IndexData
 from wazuh_testing.qa_docs.lib.sanity import Sanity
 from wazuh_testing.qa_docs.lib import utils
 from wazuh_testing.qa_docs.doc_generator import DocGenerator
+from wazuh_testing.qa_docs.lib.code_parser import CACHE_PATH
 from wazuh_testing.qa_docs import QADOCS_LOGGER
 from wazuh_testing.tools.logging import Logging
 from wazuh_testing.tools.exceptions import QAValueError
@@ -140,6 +141,11 @@ def get_parameters():
     parser.add_argument('--logging-level', dest='logging_level',
                         help="Set the logging level.",)
 
+    parser.add_argument('--cache', dest='cache_path', nargs='?', const=CACHE_PATH, default=None,
+                        help="Cache the test cases and documentation of the modules in the specified file, so the "
+                             f"unchanged modules are not parsed again. Default {CACHE_PATH}. Its folder must belong "
+                             "to the user and not be writable by others.")
+
     return parser.parse_args(), parser
 
 
@@ -384,12 +390,13 @@ def parse_data(args):
             # Looking for specified modules
             doc_check = DocGenerator(Config(SCHEMA_PATH, args.tests_path, OUTPUT_PATH, args.test_types,
                                             args.test_components, args.test_suites, args.test_exist),
-                                     OUTPUT_FORMAT)
+                                     OUTPUT_FORMAT, args.cache_path)
         else:
 
             # Parse specified components
             doc_check = DocGenerator(Config(SCHEMA_PATH, args.tests_path, OUTPUT_PATH, args.test_types,
-                                            args.test_components, test_modules=args.test_exist), OUTPUT_FORMAT)
+                                            args.test_components, test_modules=args.test_exist), OUTPUT_FORMAT,
+                                     args.cache_path)
 
         doc_check.check_module_exists(args.tests_path)
 
@@ -410,11 +417,11 @@ def parse_data(args):
                     # Parse specified modules
                     docs = DocGenerator(Config(SCHEMA_PATH, args.tests_path, OUTPUT_PATH, args.test_types,
                                                args.test_components, args.test_suites, args.test_modules),
-                                        OUTPUT_FORMAT)
+                                        OUTPUT_FORMAT, args.cache_path)
                 else:
                     # Parse specified suites
                     docs = DocGenerator(Config(SCHEMA_PATH, args.tests_path, OUTPUT_PATH, args.test_types,
-                                        args.test_components, args.test_suites), OUTPUT_FORMAT)
+                                        args.test_components, args.test_suites), OUTPUT_FORMAT, args.cache_path)
             else:
                 if args.test_modules:
                     qadocs_logger.info(f"Parsing the following modules(s): {args.test_modules}")
@@ -424,17 +431,19 @@ def parse_data(args):
 
                 # Parse specified components
                 docs = DocGenerator(Config(SCHEMA_PATH, args.tests_path, OUTPUT_PATH, args.test_types,
-                                           args.test_components, test_modules=test_modules_values), OUTPUT_FORMAT)
+                                           args.test_components, test_modules=test_modules_values), OUTPUT_FORMAT,
+                                    args.cache_path)
 
         else:
             # Parse all type of tests
-            docs = DocGenerator(Config(SCHEMA_PATH, args.tests_path, OUTPUT_PATH, args.test_types), OUTPUT_FORMAT)
+            docs = DocGenerator(Config(SCHEMA_PATH, args.tests_path, OUTPUT_PATH, args.test_types), OUTPUT_FORMAT,
+                                args.cache_path)
 
     # Parse the whole path
     else:
         if not (args.index_name or args.app_index_name or args.launching_index_name):
             qadocs_logger.info(f"Parsing all tests located in {args.tests_path}")
-            docs = DocGenerator(Config(SCHEMA_PATH, args.tests_path, OUTPUT_PATH), OUTPUT_FORMAT)
+            docs = DocGenerator(Config(SCHEMA_PATH, args.tests_path, OUTPUT_PATH), OUTPUT_FORMAT, args.cache_path)
             docs.run()
 
     if (args.test_types or args.test_components or args.test_modules) and not (args.check_doc or args.test_exist):
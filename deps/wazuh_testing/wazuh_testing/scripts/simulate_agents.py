@@ -1,16 +1,24 @@
 import argparse
 import logging
+import multiprocessing
 import os
+import signal
+import threading
+from collections import defaultdict
 from multiprocessing import Process
+from queue import Empty
 from time import sleep
 
 import wazuh_testing.tools.agent_simulator as ag
 from wazuh_testing import TCP
+from wazuh_testing.tools.async_agent_simulator import AsyncAgentSimulator
 
 logging.basicConfig(level=logging.INFO)
 
 logger = logging.getLogger(f"P{os.getpid()}")
 
+RESULTS_POLL_INTERVAL = 1
+
 
 def parse_custom_labels(labels):
     """Parse the wazuh labels from string list to dict.
@@ -86,16 +94,14 @@ def set_agent_modules_and_eps(agent, active_modules, modules_eps):
     logger.info(agent.modules)
 
 
-def create_agents(args):
-    """Create a list of agents according to script parameters like the mode, EPS...
+def get_agents_modules(args):
+    """Get the active modules and EPS of every agent according to script parameters like the mode, EPS...
     Args:
         args (list): List of script parameters.
     Returns:
-        list: List of agents to run.
+        list: List of tuples, containing in the first position the active modules of the agent and in the second
+              position the EPS of each module.
     """
-    agents = []
-    custom_labels = parse_custom_labels(args.labels)
-
     if args.balance_mode:
         modules_eps_data = []
 
@@ -109,24 +115,57 @@ def create_agents(args):
 
         logger.info(f"Agents-EPS distributon = {distribution_list}")
 
-        for item in distribution_list:  # item[0] = modules - item[1] = eps
-            agent = ag.Agent(manager_address=args.manager_address, os=args.os,
-                             registration_address=args.manager_registration_address,
-                             version=args.version, fixed_message_size=args.fixed_message_size, labels=custom_labels,
-                             logcollector_msg_number=args.enable_logcollector_message_number,
-                             custom_logcollector_message=args.custom_logcollector_message)
-            set_agent_modules_and_eps(agent, item[0].split(' ') + ['keepalive', 'receive_messages'],
-                                      item[1].split(' ') + ['0', '0'])
-            agents.append(agent)
+        # item[0] = modules - item[1] = eps
+        return [(item[0].split(' ') + ['keepalive', 'receive_messages'], item[1].split(' ') + ['0', '0'])
+                for item in distribution_list]
+
+    return [(args.modules, args.modules_eps)] * args.agents_number
+
+
+def create_agents(args, agents_modules=None, first_identity=0):
+    """Create a list of agents according to script parameters like the mode, EPS...
+    Args:
+        args (list): List of script parameters.
+        agents_modules (list, optional): Active modules and EPS of every agent to create. By default, they are
+                                         calculated with `get_agents_modules`.
+        first_identity (int, optional): Index of the first stored identity to use with `args.identities_file`.
+    Returns:
+        list: List of agents to run. With concurrent enrollment, the agents that could not be enrolled are discarded.
+    """
+    agents = []
+    custom_labels = parse_custom_labels(args.labels)
+    agents_modules = agents_modules if agents_modules is not None else get_agents_modules(args)
+    agent_parameters = {'manager_address': args.manager_address, 'os': args.os,
+                        'registration_address': args.manager_registration_address, 'version': args.version,
+                        'fixed_message_size': args.fixed_message_size, 'labels': custom_labels,
+                        'logcollector_msg_number': args.enable_logcollector_message_number,
+                        'custom_logcollector_message': args.custom_logcollector_message,
+                        'retry_enrollment': args.retry_enrollment}
+
+    if args.identities_file:
+        agents, report = ag.get_agents([agent_parameters] * len(agents_modules),
+                                       ag.AgentIdentityStore(args.identities_file),
+                                       args.enrollment_concurrency or ag.DEFAULT_ENROLLMENT_CONCURRENCY,
+                                       args.enrollment_timeout, first_identity)
+        for index, error in report['failed'].items():
+            logger.error(f"Agent {index} could not be enrolled: {error}")
+        agents_modules = [agents_modules[index] for index in report['enrolled']]
+        if args.keys_file:
+            ag.write_agents_keys(agents, args.keys_file)
+    elif args.enrollment_concurrency:
+        agents, report = ag.enroll_agents([agent_parameters] * len(agents_modules), args.enrollment_concurrency,
+                                          args.enrollment_timeout, args.keys_file)
+        for index, error in report['failed'].items():
+            logger.error(f"Agent {index} could not be enrolled: {error}")
+        agents_modules = [agents_modules[index] for index in report['enrolled']]
     else:
-        for _ in range(args.agents_number):
-            agent = ag.Agent(manager_address=args.manager_address, os=args.os,
-                             registration_address=args.manager_registration_address,
-                             version=args.version, fixed_message_size=args.fixed_message_size, labels=custom_labels,
-                             logcollector_msg_number=args.enable_logcollector_message_number,
-                             custom_logcollector_message=args.custom_logcollector_message)
-            set_agent_modules_and_eps(agent, args.modules, args.modules_eps)
-            agents.append(agent)
+        for _ in agents_modules:
+            agents.append(ag.Agent(enrollment_timeout=args.enrollment_timeout, **agent_parameters))
+        if args.keys_file:
+            ag.write_agents_keys(agents, args.keys_file)
+
+    for agent, (modules, modules_eps) in zip(agents, agents_modules):
+        set_agent_modules_and_eps(agent, modules, modules_eps)
 
     return agents
 
@@ -196,6 +235,176 @@ def run(injectors, time_alive, limit_msg_enable=None):
         agent_process.join()
 
 
+def run_async(agents, manager_address, protocol, time_alive, limit_msg=None):
+    """Run all the agents in a single asyncio event loop.
+    Args:
+        agents (list): List of agents to run.
+        manager_address (str): Manager IP address to connect the agents.
+        protocol (str): TCP or UDP protocol to connect the agents to the manager.
+        time_alive (int): Period of time in seconds during the agents will be running.
+        limit_msg (int): Maximum amount of message to be sent.
+    Returns:
+        dict: Sent and failed events by module.
+    """
+    logger.info(f"Starting {len(agents)} agents.")
+
+    simulator = AsyncAgentSimulator(agents, manager_address, protocol=protocol, limit_msg=limit_msg)
+    stats = simulator.start(time_alive=None if limit_msg else time_alive)
+
+    logger.info(f"Events by module = {stats}")
+
+    return stats
+
+
+def split_shards(items_number, shards_number):
+    """Split a range of items in contiguous shards of (almost) the same size.
+    Args:
+        items_number (int): Number of items.
+        shards_number (int): Number of shards.
+    Returns:
+        list: List of (first, last) item indexes of each shard, the last one not included.
+    Example:
+        >>> split_shards(10, 3)
+        [(0, 4), (4, 7), (7, 10)]
+    """
+    size, remainder = divmod(items_number, shards_number)
+    shards = []
+    first = 0
+
+    for shard in range(shards_number):
+        last = first + size + (1 if shard < remainder else 0)
+        shards.append((first, last))
+        first = last
+
+    return shards
+
+
+def run_worker(worker_id, args, agents_modules, first_agent, barrier, results, stop_event):
+    """Enroll and run a shard of the agents in a worker process.
+
+    The worker waits in `barrier` until every worker has enrolled its agents, so all of them start sending events at
+    the same time. The sent and failed events by module are reported to the parent through `results`.
+    Args:
+        worker_id (int): Worker number.
+        args (argparse.Namespace): Script args.
+        agents_modules (list): Active modules and EPS of the agents of the shard.
+        first_agent (int): Index of the first agent of the shard, used to name the agents.
+        barrier (multiprocessing.Barrier): Barrier shared by all the workers.
+        results (multiprocessing.Queue): Queue to report the worker stats.
+        stop_event (multiprocessing.Event): Event set by the parent to stop the simulation.
+    """
+    # The parent handles SIGINT and stops the workers through stop_event
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    worker_logger = logging.getLogger(f"P{os.getpid()}")
+    ag.agent_count = first_agent + 1
+    stats = {}
+    if args.keys_file:
+        # Every worker saves its agents in its own file, merged by the parent at the end
+        args = argparse.Namespace(**{**vars(args), 'keys_file': f"{args.keys_file}.{worker_id}"})
+
+    try:
+        agents = create_agents(args, agents_modules, first_agent)
+        worker_logger.info(f"Worker {worker_id} enrolled {len(agents)} agents. Waiting for the rest of workers.")
+        barrier.wait()
+
+        if not stop_event.is_set():
+            sleep(args.waiting_connection_time)
+            simulator = AsyncAgentSimulator(agents, args.manager_address, protocol=args.agent_protocol,
+                                            limit_msg=args.limit_msg)
+
+            def stop_simulator():
+                stop_event.wait()
+                simulator.stop()
+
+            threading.Thread(target=stop_simulator, daemon=True).start()
+            stats = simulator.start(time_alive=None if args.limit_msg else args.simulation_time)
+    except threading.BrokenBarrierError:
+        worker_logger.error(f"Worker {worker_id} aborted before starting the simulation.")
+    except Exception:
+        barrier.abort()
+        worker_logger.exception(f"Worker {worker_id} failed.")
+    finally:
+        results.put((worker_id, stats))
+
+
+def run_workers(args):
+    """Shard the agents across `args.workers` processes, each one running its agents in an asyncio event loop.
+
+    The EPS distribution of the balance mode is calculated once for all the agents and then split between the
+    workers. A SIGINT stops all the workers gracefully.
+    Args:
+        args (argparse.Namespace): Script args.
+    Returns:
+        dict: Sent and failed events by module, aggregated for all the workers.
+    """
+    agents_modules = get_agents_modules(args)
+    workers_number = min(args.workers, len(agents_modules))
+    barrier = multiprocessing.Barrier(workers_number)
+    results = multiprocessing.Queue()
+    stop_event = multiprocessing.Event()
+    processes = []
+
+    logger.info(f"Starting {len(agents_modules)} agents in {workers_number} workers.")
+
+    for worker_id, (first, last) in enumerate(split_shards(len(agents_modules), workers_number)):
+        processes.append(Process(target=run_worker, args=(worker_id, args, agents_modules[first:last], first, barrier,
+                                                          results, stop_event)))
+
+    for worker_process in processes:
+        worker_process.start()
+
+    stats = defaultdict(lambda: {'sent': 0, 'failed': 0})
+    reported_workers = set()
+    exited_workers = set()
+    lost_workers = set()
+
+    while len(reported_workers) + len(lost_workers) < len(processes):
+        try:
+            worker_id, worker_stats = results.get(timeout=RESULTS_POLL_INTERVAL)
+        except Empty:
+            for worker_id, worker_process in enumerate(processes):
+                if worker_id in reported_workers or worker_id in lost_workers or worker_process.is_alive():
+                    continue
+                # The results of a worker can arrive just after it exits, so it is only lost if they are still
+                # missing in the next poll
+                if worker_id in exited_workers:
+                    logger.error(f"Worker {worker_id} exited with code {worker_process.exitcode} without sending its "
+                                 'results.')
+                    lost_workers.add(worker_id)
+                    # Don't let the rest of workers wait for it to start the simulation
+                    barrier.abort()
+                else:
+                    exited_workers.add(worker_id)
+            continue
+        except KeyboardInterrupt:
+            logger.info('Stopping the workers...')
+            stop_event.set()
+            barrier.abort()
+            continue
+
+        reported_workers.add(worker_id)
+        logger.info(f"Worker {worker_id} events by module = {worker_stats}")
+        for module, counters in worker_stats.items():
+            stats[module]['sent'] += counters['sent']
+            stats[module]['failed'] += counters['failed']
+
+    for worker_process in processes:
+        worker_process.join()
+
+    if args.keys_file:
+        with open(args.keys_file, 'w') as keys_file:
+            for worker_id in range(len(processes)):
+                worker_keys_file = f"{args.keys_file}.{worker_id}"
+                if os.path.exists(worker_keys_file):
+                    with open(worker_keys_file) as worker_keys:
+                        keys_file.write(worker_keys.read())
+                    os.remove(worker_keys_file)
+
+    logger.info(f"Total events by module = {dict(stats)}")
+
+    return dict(stats)
+
+
 def calculate_eps_distribution(data, max_eps_per_agent):
     """Calculate the distribution of agents and EPS according to the input ratio.
     Args:
@@ -344,10 +553,46 @@ def main():
                             help='Custom logcollector message',
                             required=False, default='', dest='custom_logcollector_message')
 
+    arg_parser.add_argument('-x', '--engine', metavar='<engine>', type=str, choices=['thread', 'async'],
+                            help='Simulation engine: a process per agent and a thread per module (thread) or a single '
+                                 'asyncio event loop for all the agents (async)',
+                            required=False, default='thread', dest='engine')
+
+    arg_parser.add_argument('-W', '--workers', metavar='<workers>', type=int,
+                            help='Number of processes to shard the agents across. Each worker runs its agents with '
+                                 'the async engine.',
+                            required=False, default=1, dest='workers')
+
+    arg_parser.add_argument('-C', '--enrollment-concurrency', metavar='<enrollment_concurrency>', type=int,
+                            help='Enroll the agents concurrently, with this maximum number of simultaneous '
+                                 'enrollments.',
+                            required=False, default=None, dest='enrollment_concurrency')
+
+    arg_parser.add_argument('-T', '--enrollment-timeout', metavar='<enrollment_timeout>', type=float,
+                            help='Timeout in seconds of every enrollment attempt.',
+                            required=False, default=None, dest='enrollment_timeout')
+
+    arg_parser.add_argument('-R', '--retry-enrollment', action='store_true',
+                            help='Retry the failed enrollments with exponential backoff.',
+                            required=False, default=False, dest='retry_enrollment')
+
+    arg_parser.add_argument('-K', '--keys-file', metavar='<keys_file>', type=str,
+                            help='File to save the id, name and key of the enrolled agents (client.keys format).',
+                            required=False, default=None, dest='keys_file')
+
+    arg_parser.add_argument('-I', '--identities-file', metavar='<identities_file>', type=str,
+                            help='File (client.keys format) with the identities of agents enrolled in previous runs. '
+                                 'They are reused, only the missing agents are enrolled and added to the file.',
+                            required=False, default=None, dest='identities_file')
+
     args = arg_parser.parse_args()
 
     process_script_parameters(args)
 
+    if args.workers > 1:
+        run_workers(args)
+        return
+
     agents = create_agents(args)
 
     logger.info(f"Waiting {args.waiting_connection_time} seconds before sending EPS and keep-alive events")
@@ -355,9 +600,12 @@ def main():
     # Waiting time to prevent CPU overload when registering many agents (registration + event generation).
     sleep(args.waiting_connection_time)
 
-    injectors = create_injectors(agents, args.manager_address, args.agent_protocol, args.limit_msg)
+    if args.engine == 'async':
+        run_async(agents, args.manager_address, args.agent_protocol, args.simulation_time, args.limit_msg)
+    else:
+        injectors = create_injectors(agents, args.manager_address, args.agent_protocol, args.limit_msg)
 
-    run(injectors, args.simulation_time, args.limit_msg)
+        run(injectors, args.simulation_time, args.limit_msg)
 
 
 if __name__ == "__main__":
@@ -1,17 +1,25 @@
 import argparse
 import os
+import json
 import logging
 import sys
 import warnings
 import datetime
-import pandas as pd
+from multiprocessing import Pool, cpu_count
+
 import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
 from prettytable import PrettyTable
+from scipy.stats import mannwhitneyu
+
+from wazuh_testing.tools.performance.storage import iter_data_file
 
 """
-Version: 1.0
+Version: 2.0
 Tool documentation: https://github.com/wazuh/wazuh-qa/wiki/Stress-results-comparator-tool
-Description: Tool to compare >=2 stress results CSV data files and generate plots for the specified stats.
+Description: Tool to compare >=2 stress results CSV data files, detect regressions of the candidates against the first
+             one (the baseline) and generate plots for the specified stats.
 """
 
 LOGGER = logging.getLogger('stress_comparator')
@@ -83,6 +91,14 @@ STATS_MAPPING = {
 }
 ALLOWED_STATS = list(STATS_MAPPING.keys())
 
+# Stats whose growth over time is checked, to detect memory leaks
+MEMORY_STATS = ['memory', 'virtual_memory', 'uss', 'pss', 'swap']
+# Stats where a decrease is a regression
+HIGHER_IS_BETTER_STATS = [stat for stat in ALLOWED_STATS if stat.endswith('_edps')] + ['analysisd_events_processed']
+TIMESTAMP_COLUMN = 'Timestamp'
+DAEMON_COLUMN = 'Daemon'
+PLOT_SIZE = (12, 6)
+
 
 def set_logging(debug=False):
     """Configure the script logging.
@@ -109,7 +125,8 @@ def get_parameters():
                             choices=DAEMON_LIST, dest='selected_daemon')
 
     arg_parser.add_argument('-f', '--files', metavar='<files>', type=str, nargs='+', action='store',
-                            help='Data files to compare', required=True, dest='data_sources')
+                            help='Data files to compare. The first one is the baseline', required=True,
+                            dest='data_sources')
 
     arg_parser.add_argument('-l', '--labels', metavar='<sources>', type=str, nargs='+', action='store',
                             help='Labels to assign to each data file', required=True, dest='labels')
@@ -122,27 +139,46 @@ def get_parameters():
                             help='Output path to save plot files. Default script path', dest='output_path')
 
     arg_parser.add_argument('--force', action='store_true',
-                            help='Force comparison of data even though they have different numbers of rows. The first '
-                                 'n data will be compared, where n is the total number of rows of the smallest data '
+                            help='Force comparison of data even though they cover different periods of time. Only '
+                                 'the first n seconds will be compared, where n is the duration of the shortest data '
                                  'file.')
 
-    arg_parser.add_argument('-p', '--plots', action='store_true', help='Generate comparing charts')
+    arg_parser.add_argument('-i', '--interval', metavar='<seconds>', type=float, default=5, dest='interval',
+                            help='Seconds of the time bins used to align the data files by elapsed time. Default 5.')
 
-    arg_parser.add_argument('--debug', action='store_true', help='Activate debug logging')
+    arg_parser.add_argument('--median-threshold', metavar='<percentage>', type=float, default=10,
+                            dest='median_threshold',
+                            help='Maximum change of the median, in %%, that is not a regression. Default 10.')
 
-    return arg_parser.parse_args()
+    arg_parser.add_argument('--p95-threshold', metavar='<percentage>', type=float, default=15, dest='p95_threshold',
+                            help='Maximum change of the 95th percentile, in %%, that is not a regression. Default 15.')
 
+    arg_parser.add_argument('--alpha', metavar='<p-value>', type=float, default=0.05, dest='alpha',
+                            help='Significance level of the Mann-Whitney U test. Changes that are not significant '
+                                 'are never regressions. Default 0.05.')
 
-def get_dataframe_from_file(data_source):
-    """Read the CSV and convert it to dataframe
+    arg_parser.add_argument('--slope-threshold', metavar='<units/h>', type=float, default=1024,
+                            dest='slope_threshold',
+                            help='Maximum increase of the memory growth, in units of the stat (KB) per hour, that is '
+                                 'not a regression. Default 1024.')
 
-    Args:
-        data_source (str): Data source file path.
+    arg_parser.add_argument('--verdict', metavar='<file>', type=str, dest='verdict_file',
+                            help='Write the comparison and the verdict in a JSON file.')
 
-    Returns:
-        DataFrame: dataframe object.
-    """
-    return pd.read_csv(data_source)
+    arg_parser.add_argument('--fail-on-regression', action='store_true', dest='fail_on_regression',
+                            help='Exit with code 1 if any regression is detected.')
+
+    arg_parser.add_argument('-p', '--plots', action='store_true', help='Generate comparing charts')
+
+    arg_parser.add_argument('--dpi', metavar='<dpi>', type=int, default=100, dest='dpi',
+                            help='Resolution of the charts. Default 100.')
+
+    arg_parser.add_argument('-w', '--workers', metavar='<workers>', type=int, default=cpu_count(), dest='workers',
+                            help='Number of processes generating the charts. Default: number of CPUs.')
+
+    arg_parser.add_argument('--debug', action='store_true', help='Activate debug logging')
+
+    return arg_parser.parse_args()
 
 
 def raise_error(message):
@@ -158,6 +194,8 @@ def raise_error(message):
 def validate_parameters(parameters):
     """Validate the input parameters
 
+    The content of the data files is validated while reading them, in `get_dataframe_from_file`.
+
     Args:
         parameters (argparse.Namespace): Script parameters.
     """
@@ -165,64 +203,245 @@ def validate_parameters(parameters):
     if len(parameters.data_sources) != len(parameters.labels):
         raise_error('The number of --labels parameter values must be equal to --sources')
 
-    files_length = []
-    # Iterate over each data source file to check that it exists and it has more than 0 rows
+    # Check that the source files exist
     for data_source in parameters.data_sources:
-        # Check that the source file exists
         if not os.path.exists(data_source):
             raise_error(f"The source '{data_source}' does not exist")
-        dataframe = get_dataframe_from_file(data_source)
-        data_length = len(dataframe)
-        # Check that the source file has more than 0 rows
-        if data_length == 0:
-            raise_error(f"The source '{data_source}' has not data rows or it has not CSV format")
-        else:
-            files_length.append(data_length)
-
-        # Check that the selected stats are present in all source files
-        for stat in parameters.stats_to_compare:
-            if STATS_MAPPING[stat] not in dataframe.columns:
-                raise_error(f"Can not obtain the {stat} stat in {data_source} due to {STATS_MAPPING[stat]} does not "
-                            'exist')
-
-    # Check that all source files have the same rows number
-    if not parameters.force and len(list(set(files_length))) > 1:
-        message = '\n'.join([f"    - {parameters.data_sources[index]}: {rows} rows" for index, rows
-                             in enumerate(files_length)])
-        raise_error(f"The source files have different number of rows:\n{message}")
-
-
-def process_dataframes(parameters):
-    """Read and process data sources according to the specified parameters
+
+    if parameters.interval <= 0:
+        raise_error('The --interval parameter must be greater than 0')
+
+    if parameters.workers < 1:
+        raise_error('The --workers parameter must be greater than 0')
+
+
+def get_dataframe_from_file(data_source, parameters):
+    """Read the values of the selected daemon and stats from a CSV or Parquet file.
+
+    The file is read once, in chunks, keeping only the rows of the selected daemon and the columns of the selected
+    stats.
+
+    Args:
+        data_source (str): Data source file path.
+        parameters (argparse.Namespace): Script parameters.
+
+    Returns:
+        DataFrame: values of the selected stats indexed by the seconds elapsed since the first row.
+    """
+    stat_columns = [STATS_MAPPING[stat] for stat in parameters.stats_to_compare]
+    daemon = f"wazuh-{parameters.selected_daemon}"
+    chunks = []
+    read_rows = 0
+
+    for chunk in iter_data_file(data_source, columns=[DAEMON_COLUMN, TIMESTAMP_COLUMN] + stat_columns):
+        if read_rows == 0:
+            # Check that the selected stats are present in the source file
+            for stat, column in zip(parameters.stats_to_compare, stat_columns):
+                if column not in chunk.columns:
+                    raise_error(f"Can not obtain the {stat} stat in {data_source} due to {column} does not exist")
+        read_rows += len(chunk)
+
+        if DAEMON_COLUMN in chunk.columns:
+            chunk = chunk[chunk[DAEMON_COLUMN] == daemon]
+        chunks.append(chunk)
+
+    # Check that the source file has more than 0 rows
+    if read_rows == 0:
+        raise_error(f"The source '{data_source}' has not data rows or it has not CSV format")
+
+    dataframe = pd.concat(chunks, ignore_index=True)
+    # Check that the dataframe has rows after filtering. If not, it means that the dataset has not common data
+    if dataframe.empty:
+        raise_error(f"{data_source} has not {parameters.selected_daemon} values")
+
+    if TIMESTAMP_COLUMN in dataframe.columns:
+        timestamps = pd.to_datetime(dataframe[TIMESTAMP_COLUMN])
+        elapsed = (timestamps - timestamps.min()).dt.total_seconds()
+    else:
+        LOGGER.warning(f"{data_source} has not {TIMESTAMP_COLUMN} column, assuming one row per second")
+        elapsed = pd.Series(np.arange(len(dataframe), dtype=float))
+
+    dataframe = dataframe[stat_columns].apply(pd.to_numeric, errors='coerce')
+    dataframe.index = pd.Index(elapsed.to_numpy(), name='Elapsed(s)')
+    LOGGER.debug(f"Read {len(dataframe)} {parameters.selected_daemon} rows of {read_rows} from {data_source}")
+
+    return dataframe
+
+
+def align_dataframes(dataframes, parameters):
+    """Resample the dataframes in time bins of the same elapsed time, to compare them by time instead of by row.
+
+    Args:
+        dataframes (list(DataFrame)): dataframes indexed by elapsed seconds.
+        parameters (argparse.Namespace): Script parameters.
+
+    Returns:
+        list(DataFrame): mean values of every time bin, indexed by the elapsed seconds at the start of the bin.
+    """
+    binned_dataframes = [dataframe.groupby((dataframe.index // parameters.interval).astype(int)).mean()
+                         for dataframe in dataframes]
+    bins = [int(dataframe.index.max()) + 1 for dataframe in binned_dataframes]
+
+    # Check that all source files cover the same time, with a margin of one bin
+    if not parameters.force and max(bins) - min(bins) > 1:
+        message = '\n'.join([f"    - {parameters.data_sources[index]}: {source_bins * parameters.interval:g}s"
+                             for index, source_bins in enumerate(bins)])
+        raise_error(f"The source files cover different periods of time:\n{message}")
+
+    # Reduce the dataframes to the time of the shortest of them all (to compare them)
+    common_bins = min(bins)
+    aligned_dataframes = []
+    for dataframe, source_bins, source_file in zip(binned_dataframes, bins, parameters.data_sources):
+        if source_bins > common_bins:
+            LOGGER.info(f"Reducing dataframe from {source_file}: before {source_bins * parameters.interval:g}s --> "
+                        f"after {common_bins * parameters.interval:g}s")
+        dataframe = dataframe[dataframe.index < common_bins]
+        dataframe.index = pd.Index(dataframe.index * parameters.interval, name='Elapsed(s)')
+        aligned_dataframes.append(dataframe)
+
+    return aligned_dataframes
+
+
+def get_relative_delta(baseline, candidate):
+    """Get the change of a value in %. It is infinite if the baseline is 0 and the candidate is not."""
+    if baseline == 0:
+        return 0.0 if candidate == 0 else float(np.copysign(np.inf, candidate))
+
+    return float((candidate - baseline) / abs(baseline) * 100)
+
+
+def get_slope(series):
+    """Get the growth per hour of a series indexed by elapsed seconds, fitting it by least squares."""
+    series = series.dropna()
+    if len(series) < 2:
+        return 0.0
+
+    return float(np.polyfit(series.index.to_numpy() / 3600, series.to_numpy(dtype=float), 1)[0])
+
+
+def compare_stat(baseline, candidate, stat, parameters):
+    """Compare a stat of a candidate against the baseline and give a verdict.
+
+    A stat is a regression when the change of its distribution is significant, according to the Mann-Whitney U test,
+    and the median or the 95th percentile get worse than the thresholds. The memory stats are also regressions when
+    their growth per hour increases more than the slope threshold, even if their distribution doesn't change.
+
+    Args:
+        baseline (DataFrame): aligned values of the baseline.
+        candidate (DataFrame): aligned values of the candidate.
+        stat (str): stat to compare.
+        parameters (argparse.Namespace): Script parameters.
+
+    Returns:
+        dict: summary values, deltas, p-value, verdict (`regression`, `improvement` or `pass`) and its reasons.
+    """
+    column = STATS_MAPPING[stat]
+    baseline_values = baseline[column].dropna()
+    candidate_values = candidate[column].dropna()
+    # Positive when the stat gets worse
+    direction = -1 if stat in HIGHER_IS_BETTER_STATS else 1
+
+    comparison = {
+        'baseline_median': float(baseline_values.median()),
+        'candidate_median': float(candidate_values.median()),
+        'baseline_p95': float(baseline_values.quantile(0.95)),
+        'candidate_p95': float(candidate_values.quantile(0.95))
+    }
+    comparison['median_delta(%)'] = get_relative_delta(comparison['baseline_median'], comparison['candidate_median'])
+    comparison['p95_delta(%)'] = get_relative_delta(comparison['baseline_p95'], comparison['candidate_p95'])
+
+    if pd.concat([baseline_values, candidate_values]).nunique() > 1:
+        comparison['p_value'] = float(mannwhitneyu(baseline_values, candidate_values, alternative='two-sided').pvalue)
+    else:
+        comparison['p_value'] = 1.0
+    significant = comparison['p_value'] < parameters.alpha
+
+    reasons = []
+    improved = False
+    for name, threshold in (('median', parameters.median_threshold), ('p95', parameters.p95_threshold)):
+        delta = comparison[f"{name}_delta(%)"]
+        if significant and direction * delta > threshold:
+            reasons.append(f"{name} changed {delta:+.1f}% (threshold {threshold:g}%)")
+        elif significant and direction * delta < -threshold:
+            improved = True
+
+    if stat in MEMORY_STATS:
+        comparison['baseline_slope(/h)'] = get_slope(baseline[column])
+        comparison['candidate_slope(/h)'] = get_slope(candidate[column])
+        growth = comparison['candidate_slope(/h)'] - comparison['baseline_slope(/h)']
+        if growth > parameters.slope_threshold:
+            reasons.append(f"growth increased {growth:+.1f}/h (threshold {parameters.slope_threshold:g}/h)")
+
+    comparison['verdict'] = 'regression' if reasons else 'improvement' if improved else 'pass'
+    comparison['reasons'] = reasons
+
+    return comparison
+
+
+def get_verdict(dataframes, parameters):
+    """Compare every candidate against the baseline, the first data file.
 
     Args:
+        dataframes (list(DataFrame)): aligned dataframes.
         parameters (argparse.Namespace): Script parameters.
 
     Returns:
-        list(DataFrame): dataframe object list.
+        dict: comparison of every stat of every candidate and global verdict.
     """
-    # Read the dataframe and filter it only with selected daemon
-    dataframes = [pd.read_csv(source_file) for source_file in parameters.data_sources]
-    filtered_dataframes = [dataframe[dataframe['Daemon'] == f"wazuh-{parameters.selected_daemon}"] for dataframe
-                           in dataframes]
+    comparisons = {label: {stat: compare_stat(dataframes[0], dataframe, stat, parameters)
+                           for stat in parameters.stats_to_compare}
+                   for label, dataframe in zip(parameters.labels[1:], dataframes[1:])}
+    regression = any(comparison['verdict'] == 'regression' for stats in comparisons.values()
+                     for comparison in stats.values())
+
+    return {
+        'daemon': parameters.selected_daemon,
+        'baseline': parameters.labels[0],
+        'interval(s)': parameters.interval,
+        'compared_time(s)': float(max(dataframe.index.max() for dataframe in dataframes) + parameters.interval),
+        'thresholds': {'median(%)': parameters.median_threshold, 'p95(%)': parameters.p95_threshold,
+                       'alpha': parameters.alpha, 'slope(/h)': parameters.slope_threshold},
+        'comparisons': comparisons,
+        'verdict': 'regression' if regression else 'pass'
+    }
+
+
+def write_verdict(verdict, file_name):
+    """Write the verdict in a JSON file. The infinite deltas are written as null.
 
-    # Check that dataframes have rows after filtering. If not, it means that the dataset has not conmon data
-    for index, dataframe in enumerate(filtered_dataframes):
-        if dataframe.empty:
-            raise_error(f"{parameters.data_sources[index]} has not {parameters.selected_daemon} values")
+    Args:
+        verdict (dict): comparison and verdict.
+        file_name (str): path of the JSON file.
+    """
+    def to_json(value):
+        if isinstance(value, dict):
+            return {key: to_json(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [to_json(item) for item in value]
+        if isinstance(value, float) and not np.isfinite(value):
+            return None
+        return value
 
-    # Reduce the dataframes to the minimum number of rows according to the smallest of them all (to compare them)
-    if parameters.force:
-        min_rows = min([len(dataframe) for dataframe in filtered_dataframes])
+    if os.path.dirname(file_name):
+        os.makedirs(os.path.dirname(file_name), exist_ok=True)
+    with open(file_name, 'w') as verdict_file:
+        json.dump(to_json(verdict), verdict_file, indent=4)
+    LOGGER.info(f"Verdict written in {file_name}")
 
-        for index, (dataframe, source_file) in enumerate(zip(filtered_dataframes, parameters.data_sources)):
-            LOGGER.info(f"Reducing dataframe from {source_file}: before {len(dataframe)} --> after {min_rows} rows")
-            filtered_dataframes[index] = filtered_dataframes[index].head(min_rows)
 
-    return filtered_dataframes
+def print_dataframes_stats(dataframes, parameters, compared_time=None):
+    """Print the mean, maximum and minimum of every stat.
 
+    Args:
+        dataframes (list(DataFrame)): raw samples indexed by elapsed seconds, not the time bins, so the printed
+            extremes are the real ones.
+        parameters (argparse.Namespace): Script parameters.
+        compared_time (float): seconds of the compared period. The samples after it are ignored. None to use all
+            of them.
+    """
+    if compared_time is not None:
+        dataframes = [dataframe[dataframe.index < compared_time] for dataframe in dataframes]
 
-def print_dataframes_stats(dataframes, parameters):
     for stat in parameters.stats_to_compare:
         table = PrettyTable()
         table.title = STATS_MAPPING[stat]
@@ -233,10 +452,64 @@ def print_dataframes_stats(dataframes, parameters):
         print(table)
 
 
+def print_verdict(verdict):
+    """Print the comparison of every candidate against the baseline.
+
+    Args:
+        verdict (dict): comparison and verdict.
+    """
+    for label, comparisons in verdict['comparisons'].items():
+        table = PrettyTable()
+        table.title = f"{label} vs {verdict['baseline']}"
+        table.field_names = ['Stat', 'Median delta(%)', 'P95 delta(%)', 'p-value', 'Slope delta(/h)', 'Verdict']
+        for stat, comparison in comparisons.items():
+            slope_delta = round(comparison['candidate_slope(/h)'] - comparison['baseline_slope(/h)'], 1) \
+                if 'baseline_slope(/h)' in comparison else '-'
+            table.add_row([STATS_MAPPING[stat], round(comparison['median_delta(%)'], 1),
+                           round(comparison['p95_delta(%)'], 1), f"{comparison['p_value']:.3g}", slope_delta,
+                           comparison['verdict']])
+        print(table)
+
+    LOGGER.info(f"Verdict: {verdict['verdict']}")
+
+
+def plot_stat(arguments):
+    """Generate the comparison plot of a stat.
+
+    Args:
+        arguments (tuple): column of the stat, list of (label, series) to plot, path of the figure and its dpi.
+
+    Returns:
+        str: path of the figure.
+    """
+    column, series, file_name, dpi = arguments
+    duration = max(values.index.max() for _, values in series if not values.empty)
+    time_unit, divisor = ('h', 3600) if duration >= 3 * 3600 else ('min', 60)
+
+    figure, axes = plt.subplots(figsize=PLOT_SIZE)
+    for label, values in series:
+        axes.plot(values.index / divisor, values.to_numpy(), label=label, linewidth=1)
+
+    # Configure plot settings
+    axes.margins(0.01, 0.01)
+    axes.set_xlabel(f"Elapsed time ({time_unit})")
+    axes.set_ylabel(column)
+    axes.set_title(column, fontsize=20)
+    axes.legend()
+    figure.tight_layout()
+
+    # Generate the figure
+    figure.savefig(file_name, dpi=dpi, format='png')
+    plt.close(figure)
+
+    return file_name
+
+
 def generate_plots(dataframes, parameters):
-    """Generate the plots and save them in figures/images
+    """Generate the plots and save them in figures/images, in parallel.
 
     Args:
+        dataframes (list(DataFrame)): aligned dataframes.
         parameters (argparse.Namespace): Script parameters.
     """
     date_time = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
@@ -248,43 +521,46 @@ def generate_plots(dataframes, parameters):
         os.makedirs(output_path, exist_ok=True)
 
     # For each selected stat, generate a comparison figure
+    tasks = []
     for stat in parameters.stats_to_compare:
-        for index, dataframe in enumerate(dataframes):
-            # Add a new ID column to the dataframe. It will be used for x axis values
-            dataframe['id'] = dataframe.reset_index().index
-            plt.plot(dataframe['id'], dataframe[STATS_MAPPING[stat]], label=parameters.labels[index],
-                     linewidth=1)
-
-        # Configure plot settings
-        plt.xticks(rotation=90, fontsize=6)
-        plt.margins(0.01, 0.01)
-        plt.xlabel('ID')
-        plt.ylabel(STATS_MAPPING[stat])
-        plt.title(f"{STATS_MAPPING[stat]}", fontsize=20)
-        plt.legend()
-        plt.tight_layout()
+        column = STATS_MAPPING[stat]
+        series = [(label, dataframe[column]) for label, dataframe in zip(parameters.labels, dataframes)]
+        tasks.append((column, series, os.path.join(output_path, f"{date_time}_{stat}_comparison.png"),
+                      parameters.dpi))
 
-        file_name = os.path.join(output_path, f"{date_time}_{stat}_comparison.png")
-        LOGGER.info(f"Generating {file_name} plot ...")
+    workers = min(parameters.workers, len(tasks))
+    if workers > 1:
+        with Pool(workers) as pool:
+            file_names = list(pool.imap_unordered(plot_stat, tasks))
+    else:
+        file_names = [plot_stat(task) for task in tasks]
 
-        # Generate the figure
-        plt.savefig(file_name, dpi=1200, format='png')
-        # Clean plots for the next iteration
-        plt.clf()
+    for file_name in file_names:
+        LOGGER.info(f"Generated {file_name} plot")
 
 
 def main():
-    """Main process for generating plots according to the user input parameters"""
+    """Main process for comparing the data files and generating plots according to the user input parameters"""
     warnings.filterwarnings('ignore')
     parameters = get_parameters()
     set_logging(parameters.debug)
     validate_parameters(parameters)
-    dataframes = process_dataframes(parameters)
-    print_dataframes_stats(dataframes, parameters)
+    raw_dataframes = [get_dataframe_from_file(data_source, parameters) for data_source in parameters.data_sources]
+    dataframes = align_dataframes(raw_dataframes, parameters)
+
+    verdict = get_verdict(dataframes, parameters)
+    print_dataframes_stats(raw_dataframes, parameters, verdict['compared_time(s)'])
+    del raw_dataframes
+    print_verdict(verdict)
+    if parameters.verdict_file:
+        write_verdict(verdict, parameters.verdict_file)
 
     if parameters.plots:
         generate_plots(dataframes, parameters)
 
+    if parameters.fail_on_regression and verdict['verdict'] == 'regression':
+        sys.exit(1)
+
 
 if __name__ == '__main__':
     main()
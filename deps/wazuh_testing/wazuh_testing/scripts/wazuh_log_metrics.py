@@ -20,6 +20,8 @@ def get_script_arguments():
                         choices=target_choices, help='Log type to be parsed. Default cluster.')
     parser.add_argument('-o', '--output', dest='output', action='store', default=None,
                         help='Folder where the extracted data will be dumped (csv).')
+    parser.add_argument('-w', '--workers', dest='workers', action='store', default=1, type=int,
+                        help='Number of processes used to parse the log. Default 1.')
 
     return parser.parse_args()
 
@@ -29,9 +31,9 @@ def main():
 
     if options.log and options.log_type_target:
         if options.log_type_target == 'cluster':
-            ClusterLogParser(log_file=options.log, dst_dir=options.output).write_csv()
+            ClusterLogParser(log_file=options.log, dst_dir=options.output, workers=options.workers).write_csv()
         elif options.log_type_target == 'api':
-            APILogParser(log_file=options.log, dst_dir=options.output).write_csv()
+            APILogParser(log_file=options.log, dst_dir=options.output, workers=options.workers).write_csv()
 
 
 if __name__ == '__main__':
@@ -1,6 +1,5 @@
 import argparse
 import logging
-from collections import defaultdict
 from datetime import datetime
 from os import makedirs
 from os.path import join
@@ -8,23 +7,22 @@ from signal import signal, SIGTERM, SIGINT
 from tempfile import gettempdir
 from time import time, sleep
 
-from wazuh_testing.tools.performance.binary import Monitor, logger
+from wazuh_testing.tools.performance.binary import Monitor, MultiProcessMonitor, logger
+from wazuh_testing.tools.performance.storage import OUTPUT_FORMATS
 
 METRICS_FOLDER = join(gettempdir(), 'process_metrics')
 CURRENT_SESSION = join(METRICS_FOLDER, datetime.now().strftime('%d-%m-%Y'), str(int(time())))
-ACTIVE_MONITORS = defaultdict(list)
+ACTIVE_MONITOR = None
 SESSION_ACTIVE = True
 
 
 def shutdown_threads(signal_number, frame):
-    logger.info('Attempting to shutdown all monitor threads')
+    logger.info('Attempting to shutdown the monitor thread')
 
     global SESSION_ACTIVE
     SESSION_ACTIVE = False
 
-    # Shutdown all possible monitors
-    for monitor in sum(ACTIVE_MONITORS.values(), []):
-        monitor.shutdown()
+    ACTIVE_MONITOR is not None and ACTIVE_MONITOR.shutdown()
 
     logger.info('Process finished gracefully')
 
@@ -47,55 +45,77 @@ def get_script_arguments():
                         help='Number of reconnection retries before aborting the monitoring process.')
     parser.add_argument('--store', dest='store_path', action='store', default=gettempdir(),
                         help=f"Path to store the CSVs with the data. Default {gettempdir()}.")
+    parser.add_argument('-m', '--full-memory-every', dest='full_memory_every', action='store', default=1, type=int,
+                        help='Number of entries between each read of the USS, PSS and SWAP memory, which are '
+                             'expensive to\nobtain. The entries in between repeat the last values. Default 1.')
+    parser.add_argument('-f', '--flush-every', dest='flush_every', action='store', default=10, type=int,
+                        help='Number of entries buffered before writing them in the CSVs. Default 10.')
+    parser.add_argument('--format', dest='output_format', default='csv', choices=OUTPUT_FORMATS,
+                        help='Format of the data files. Parquet files are compressed and written in row groups.\n'
+                             'They can only be read if the monitoring stops gracefully, a killed run leaves '
+                             'them unreadable.\nIf a file exists, the new rows are written in a new part next to it. '
+                             'Default csv.')
 
     return parser.parse_args()
 
 
+def add_process_pids(process):
+    """Add the process and its children to the active monitor, replacing the targets with the same names.
+
+    Args:
+        process (str): name of the process.
+
+    Returns:
+        list(str): names of the added targets.
+
+    Raises:
+        ValueError: if the process is not running.
+    """
+    names = []
+    for i, pid in enumerate(Monitor.get_process_pids(process)):
+        # Add a target for every possible child process
+        p_name = process if i == 0 else f'{process}_child_{i}'
+        ACTIVE_MONITOR.add_process(p_name, pid)
+        names.append(p_name)
+
+    return names
+
+
 def check_monitors_health(options):
-    """Write the collected data in a CSV file.
+    """Look for new PIDs of the processes that are no longer running.
 
     Args:
         options (argparse.Options): object containing the script options.
 
     Returns:
-        bool: True if there were any errors. False otherwise.
+        bool: True if every process is being monitored. False otherwise.
     """
     healthy = True
-    for process, monitors in ACTIVE_MONITORS.items():
-        # Check if there is any unhealthy monitor
-        if any(filter(lambda m: m.event.is_set(), monitors)):
-            logger.warning(f'Monitoring of {process} failed. Attempting to create new monitor instances')
-
-            try:
-                # Try to get new PIDs
-                process_pids = Monitor.get_process_pids(process)
-                # Shutdown all the related monitors to the failed process (necessary for multiprocessing)
-                for monitor in monitors:
-                    monitor.shutdown()
-            except ValueError:
-                healthy = False
-                logger.warning(f'Could not create new monitor instances for {process}')
-                continue
-
-            for i, pid in enumerate(process_pids):
-                # Attempt to create new monitor instances for the process
-                p_name = process if i == 0 else f'{process}_child_{i}'
-                monitor = Monitor(process_name=p_name, pid=pid, value_unit=options.data_unit,
-                                  time_step=options.sleep_time,
-                                  version=options.version, dst_dir=options.store_path)
-                monitor.start()
-
-                try:
-                    # Replace old monitors for new ones
-                    ACTIVE_MONITORS[process][i] = monitor
-                except IndexError:
-                    ACTIVE_MONITORS[process].append(monitor)
+    failed_processes = {process for process in options.process_list
+                        if any(name == process or name.startswith(f'{process}_child_')
+                               for name in ACTIVE_MONITOR.lost_processes)}
+
+    for process in failed_processes:
+        logger.warning(f'Monitoring of {process} failed. Attempting to monitor its new PIDs')
+
+        try:
+            names = add_process_pids(process)
+        except ValueError:
+            # Keep the names in the lost processes, so the process is looked for again in the next check
+            healthy = False
+            logger.warning(f'Could not find new PIDs for {process}')
+            continue
+
+        # Lost children are no longer targets, but must be forgotten too in case the process restarted with fewer
+        for name in set(ACTIVE_MONITOR.targets) | set(ACTIVE_MONITOR.lost_processes):
+            if (name == process or name.startswith(f'{process}_child_')) and name not in names:
+                ACTIVE_MONITOR.remove_process(name)
 
     return healthy
 
 
 def monitors_healthcheck(options):
-    """Check each monitor's health while the session is active.
+    """Check the monitor's health while the session is active.
 
     Args:
         options (argparse.Options): object containing the script options.
@@ -108,12 +128,15 @@ def monitors_healthcheck(options):
             errors += 1
             if errors >= options.health_retries:
                 logger.error('Reached maximum number of retries. Aborting')
+                ACTIVE_MONITOR.shutdown()
                 exit(1)
 
         sleep(options.healthcheck_time)
 
 
 def main():
+    global ACTIVE_MONITOR
+
     signal(SIGTERM, shutdown_threads)
     signal(SIGINT, shutdown_threads)
 
@@ -126,15 +149,14 @@ def main():
     options.debug and logger.setLevel(logging.DEBUG)
     logger.info(f'Started new session: {CURRENT_SESSION}')
 
+    ACTIVE_MONITOR = MultiProcessMonitor(value_unit=options.data_unit, time_step=options.sleep_time,
+                                         version=options.version, dst_dir=options.store_path,
+                                         full_memory_every=options.full_memory_every,
+                                         flush_every=options.flush_every, output_format=options.output_format)
     for process in options.process_list:
-        # Launch a monitor for every possible child process
-        for i, pid in enumerate(Monitor.get_process_pids(process)):
-            p_name = process if i == 0 else f'{process}_child_{i}'
-            monitor = Monitor(process_name=p_name, pid=pid, value_unit=options.data_unit, time_step=options.sleep_time,
-                              version=options.version, dst_dir=options.store_path)
-            monitor.start()
-            ACTIVE_MONITORS[process].append(monitor)
+        add_process_pids(process)
 
+    ACTIVE_MONITOR.start()
     monitors_healthcheck(options)
 
 
@@ -15,12 +15,15 @@ def get_script_arguments():
 
     parser.add_argument('-r', '--report', dest='report_path', default='report.json',
                         help='Report path.', action='store')
+
+    parser.add_argument('-w', '--workers', dest='workers', type=int, default=None,
+                        help='Number of processes scanning the logs. Default: number of CPUs.', action='store')
     return parser.parse_args()
 
 
 def main():
     options = get_script_arguments()
-    parser = ReportGenerator(options.artifact_path)
+    parser = ReportGenerator(options.artifact_path, workers=options.workers)
 
     json_report = parser.make_report()
 
@@ -7,17 +7,17 @@ from signal import signal, SIGTERM, SIGINT
 from tempfile import gettempdir
 from time import time
 
-from wazuh_testing.tools.performance.statistic import StatisticMonitor, logger
+from wazuh_testing.tools.performance.statistic import StatisticWatcher, logger
+from wazuh_testing.tools.performance.storage import OUTPUT_FORMATS
 
 METRICS_FOLDER = join(gettempdir(), 'wazuh_statistics')
 CURRENT_SESSION = join(METRICS_FOLDER, datetime.now().strftime('%d-%m-%Y'), str(int(time())))
-MONITOR_LIST = []
+ACTIVE_WATCHER = None
 
 
 def shutdown_threads(signal_number, frame):
-    logger.info('Attempting to shutdown all monitor threads')
-    for monitor in MONITOR_LIST:
-        monitor.shutdown()
+    logger.info('Attempting to shutdown the monitor thread')
+    ACTIVE_WATCHER is not None and ACTIVE_WATCHER.shutdown()
     logger.info('Process finished')
 
 
@@ -28,16 +28,24 @@ def get_script_arguments():
                         help='Type the statistics target to collect separated by whitespace. '
                              'Targets: agent, logcollector, remote and analysis.')
     parser.add_argument('-s', '--sleep', dest='sleep_time', type=float, default=5, action='store',
-                        help='Type the time in seconds between each entry.')
+                        help='Type the maximum time in seconds between each check of the statistics files. The files '
+                             'are\nparsed as soon as they change where inotify is available.')
     parser.add_argument('-d', '--debug', dest='debug', action='store_true', default=False,
                         help='Enable debug level logging.')
     parser.add_argument('--store', dest='store_path', action='store', default=gettempdir(),
                         help=f"Path to store the CSVs with the data. Default {gettempdir()}.")
+    parser.add_argument('--format', dest='output_format', default='csv', choices=OUTPUT_FORMATS,
+                        help='Format of the data files. Parquet files are compressed and written in row groups.\n'
+                             'They can only be read if the monitoring stops gracefully, a killed run leaves '
+                             'them unreadable.\nIf a file exists, the new rows are written in a new part next to it. '
+                             'Default csv.')
 
     return parser.parse_args()
 
 
 def main():
+    global ACTIVE_WATCHER
+
     signal(SIGTERM, shutdown_threads)
     signal(SIGINT, shutdown_threads)
 
@@ -50,10 +58,9 @@ def main():
     options.debug and logger.setLevel(logging.DEBUG)
     logger.info(f'Started new session: {CURRENT_SESSION}')
 
-    for target in options.target_list:
-        monitor = StatisticMonitor(target=target, time_step=options.sleep_time, dst_dir=options.store_path)
-        monitor.start()
-        MONITOR_LIST.append(monitor)
+    ACTIVE_WATCHER = StatisticWatcher(targets=options.target_list, time_step=options.sleep_time,
+                                      dst_dir=options.store_path, output_format=options.output_format)
+    ACTIVE_WATCHER.start()
 
 
 if __name__ == '__main__':
@@ -19,22 +19,24 @@ import socket
 import ssl
 import threading
 import zlib
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date
 from itertools import cycle
-from random import randint, sample, choice, getrandbits
+from random import randint, sample, choice, getrandbits, uniform
 from stat import S_IFLNK, S_IFREG, S_IRWXU, S_IRWXG, S_IRWXO
 from string import ascii_letters, digits
 from struct import pack
 from sys import getsizeof
-from time import mktime, localtime, sleep, time
+from time import mktime, localtime, sleep, time, monotonic
 
 import wazuh_testing.data.syscollector as syscollector
 import wazuh_testing.data.winevt as winevt
 import wazuh_testing.wazuh_db as wdb
+from lockfile import FileLock
 from wazuh_testing import TCP
 from wazuh_testing import is_udp, is_tcp
 from wazuh_testing.tools.monitoring import wazuh_unpack, Queue
-from wazuh_testing.tools.remoted_sim import Cipher
+from wazuh_testing.tools.remoted_sim import Cipher, CipherContext
 from wazuh_testing.tools.utils import retry, get_random_ip, get_random_string
 
 _data_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'data')
@@ -43,6 +45,16 @@ os_list = ["debian7", "debian8", "debian9", "debian10", "ubuntu12.04",
            "ubuntu14.04", "ubuntu16.04", "ubuntu18.04", "mojave", "solaris11"]
 agent_count = 1
 
+# Enrollment retries (with retry_enrollment) and exponential backoff between them, in seconds
+ENROLLMENT_RETRIES = 20
+ENROLLMENT_BACKOFF = 1
+ENROLLMENT_MAX_BACKOFF = 10
+DEFAULT_ENROLLMENT_CONCURRENCY = 32
+
+# Static part of the composed events: random number, global counter and local counter
+EVENT_PREFIX = b'55555' + b'1234567891' + b':' + b'5555' + b':'
+_EVENT_PREFIX_MD5 = hashlib.md5(EVENT_PREFIX)
+
 
 class Agent:
     """Class that allows us to simulate an agent registered in a manager.
@@ -68,6 +80,7 @@ class Agent:
         retry_enrollment (bool, optional): retry then enrollment in case of error.
         logcollector_msg_number (bool, optional): insert in the logcollector message the message number.
         custom_logcollector_message (str): Custom logcollector message to be sent by the agent.
+        enrollment_timeout (float, optional): Timeout in seconds of every enrollment attempt. Default None (no timeout).
     Attributes:
         id (str): ID of the agent.
         name (str): Agent name.
@@ -112,6 +125,8 @@ class Agent:
         syscollector_batch_size (int): Size of the syscollector type batch events.
         fixed_message_size (int): Fixed size of the agent modules messages in KB.
         registration_address (str): Manager registration IP address.
+        enrollment_timeout (float): Timeout in seconds of every enrollment attempt.
+        number (int): Number of the agent, used in its name and to pick its OS. By default, the global agent count.
     """
     def __init__(self, manager_address, cypher="aes", os=None, rootcheck_sample=None, id=None, name=None, key=None,
                  version="v4.3.0", fim_eps=100, fim_integrity_eps=100, sca_eps=100, syscollector_eps=100, labels=None,
@@ -119,8 +134,9 @@ class Agent:
                  rootcheck_frequency=60.0, rcv_msg_limit=0, keepalive_frequency=10.0, sca_frequency=60,
                  syscollector_frequency=60.0, syscollector_batch_size=10, hostinfo_eps=100, winevt_eps=100,
                  fixed_message_size=None, registration_address=None, retry_enrollment=False,
-                 logcollector_msg_number=None, custom_logcollector_message=''):
+                 logcollector_msg_number=None, custom_logcollector_message='', enrollment_timeout=None, number=None):
         self.id = id
+        self.number = agent_count if number is None else number
         self.name = name
         self.key = key
         if version is None:
@@ -146,6 +162,7 @@ class Agent:
         self.manager_address = manager_address
         self.registration_address = manager_address if registration_address is None else registration_address
         self.encryption_key = ""
+        self._event_context = None
         self.keep_alive_event = ""
         self.keep_alive_raw_msg = ""
         self.merged_checksum = 'd6e3ac3e75ca0319af3e7c262776f331'
@@ -181,6 +198,7 @@ class Agent:
         self.stop_receive = 0
         self.stage_disconnect = None
         self.retry_enrollment = retry_enrollment
+        self.enrollment_timeout = enrollment_timeout
         self.rcv_msg_queue = Queue(rcv_msg_limit)
         self.fixed_message_size = fixed_message_size * 1024 if fixed_message_size is not None else None
         self.logcollector_msg_number = logcollector_msg_number
@@ -210,7 +228,7 @@ class Agent:
     def set_os(self):
         """Pick random OS from a custom os list."""
         if self.os is None:
-            self.os = os_list[agent_count % len(os_list) - 1]
+            self.os = os_list[self.number % len(os_list) - 1]
 
     def set_wpk_variables(self, sha=None, upgrade_exec_result=None, upgrade_notification=False, upgrade_script_result=0,
                           stage_disconnect=None):
@@ -232,14 +250,16 @@ class Agent:
     def set_name(self):
         """Set a random agent name."""
         random_string = ''.join(sample(f"0123456789{ascii_letters}", 16))
-        self.name = f"{agent_count}-{random_string}-{self.os}"
+        self.name = f"{self.number}-{random_string}-{self.os}"
 
     def _register_helper(self):
         """Helper function to enroll an agent."""
         sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.settimeout(self.enrollment_timeout)
         context = ssl.SSLContext(ssl.PROTOCOL_TLSv1_2)
         context.check_hostname = False
         context.verify_mode = ssl.CERT_NONE
+        ssl_socket = sock
         try:
             ssl_socket = context.wrap_socket(sock, server_hostname=self.registration_address)
             ssl_socket.connect((self.registration_address, 1515))
@@ -263,16 +283,19 @@ class Agent:
 
     def register(self):
         """Request to register the agent in the manager.
-        In addition, it sets the agent id and agent key with the response data.
+        In addition, it sets the agent id and agent key with the response data. If `retry_enrollment` is set, the
+        failed attempts are retried with an exponential backoff (with jitter, so concurrent enrollments do not retry
+        at the same time).
         """
         if self.retry_enrollment:
-            retries = 20
-            while retries >= 0:
+            for attempt in range(ENROLLMENT_RETRIES + 1):
                 try:
                     self._register_helper()
-                except Exception:
-                    retries -= 1
-                    sleep(6)
+                except Exception as error:
+                    logging.debug(f"Enrollment attempt {attempt + 1} of {self.name} failed: {error}")
+                    if attempt < ENROLLMENT_RETRIES:
+                        backoff = min(ENROLLMENT_MAX_BACKOFF, ENROLLMENT_BACKOFF * 2 ** attempt)
+                        sleep(uniform(backoff / 2, backoff))
                 else:
                     break
             else:
@@ -324,12 +347,7 @@ class Agent:
             >>> compose_event('test')
             b'6ef859712d8b215d9daf071ff67aaa62555551234567891:5555:test'
         """
-        message = message.encode()
-        random_number = b'55555'
-        global_counter = b'1234567891'
-        split = b':'
-        local_counter = b'5555'
-        msg = random_number + global_counter + split + local_counter + split + message
+        msg = EVENT_PREFIX + message.encode()
         msg_md5 = hashlib.md5(msg).hexdigest()
         event = msg_md5.encode() + msg
         return event
@@ -371,6 +389,20 @@ class Agent:
             header = "!{0}!:".format(agent_id).encode()
         return header + encrypted_event
 
+    def get_event_context(self):
+        """Get the cipher context and the header used to build the events of the agent.
+
+        They are created once and reused while the ID, the encryption key and the cypher of the agent do not change.
+        Returns:
+            tuple: `CipherContext` of the agent and header bytes.
+        """
+        context_key = (self.cypher, self.id, self.encryption_key)
+        if self._event_context is None or self._event_context[0] != context_key:
+            header = self.headers(self.id, b'')
+            self._event_context = (context_key, CipherContext(self.encryption_key, self.cypher), header)
+
+        return self._event_context[1:]
+
     def create_event(self, message):
         """Build an event from a raw string message.
         Args:
@@ -383,18 +415,30 @@ class Agent:
             \\x03\\x06\\x1aN\\x86 \\xc2\\x98\\x93U\\xcc\\xf5\\xe3@%\\xabS!\\xd3\\x9d!\\xea\\xabR\\xf9\\xd3\\x0b\\
             xcc\\xe8Y\\xe31*c\\x17g\\xa6M\\x0b&\\xc0>\\xc64\\x815\\xae\\xb8[bg\\xe3\\x83\\x0e'
         """
-        # Compose event
-        event = self.compose_event(message)
-        # Compress
-        compressed_event = zlib.compress(event)
-        # Padding
-        padded_event = self.wazuh_padding(compressed_event)
-        # Encrypt
-        encrypted_event = self.encrypt(padded_event)
-        # Add headers
-        headers_event = self.headers(self.id, encrypted_event)
-
-        return headers_event
+        return self.create_events([message])[0]
+
+    def create_events(self, messages):
+        """Build several events from raw string messages.
+
+        The output of every event is the same as composing, compressing, padding, encrypting and adding the headers to
+        the message, but the cipher context, the header and the digest of the static part of the event are reused.
+        Args:
+            messages (list(str)): Raw messages.
+        Returns:
+            list(bytes): Built events, in the same order as the messages.
+        """
+        cipher_context, header = self.get_event_context()
+        encrypt = cipher_context.encrypt
+        events = []
+
+        for message in messages:
+            message = message.encode()
+            msg_md5 = _EVENT_PREFIX_MD5.copy()
+            msg_md5.update(message)
+            compressed_event = zlib.compress(msg_md5.hexdigest().encode() + EVENT_PREFIX + message)
+            events.append(header + encrypt(self.wazuh_padding(compressed_event)))
+
+        return events
 
     def receive_message(self, sender):
         """Agent listener to receive messages and process the accepted commands.
@@ -419,29 +463,40 @@ class Agent:
                     return
             else:
                 buffer_array, client_address = sender.socket.recvfrom(65536)
-            index = buffer_array.find(b'!')
-            if index == 0:
-                index = buffer_array[1:].find(b'!')
-                buffer_array = buffer_array[index + 2:]
-            if self.cypher == "aes":
-                msg_remove_header = bytes(buffer_array[5:])
-                msg_decrypted = Cipher(msg_remove_header, self.encryption_key).decrypt_aes()
-            else:
-                msg_remove_header = bytes(buffer_array[1:])
-                msg_decrypted = Cipher(msg_remove_header, self.encryption_key).decrypt_blowfish()
-            try:
-                padding = 0
-                while msg_decrypted:
-                    if msg_decrypted[padding] == 33:
-                        padding += 1
-                    else:
-                        break
-                msg_remove_padding = msg_decrypted[padding:]
-                msg_decompress = zlib.decompress(msg_remove_padding)
-                msg_decoded = msg_decompress.decode('ISO-8859-1')
+            msg_decoded = self.decode_received_message(buffer_array)
+            if msg_decoded is not None:
                 self.process_message(sender, msg_decoded)
-            except zlib.error:
-                logging.error("Corrupted message from the manager. Continuing.")
+
+    def decode_received_message(self, buffer_array):
+        """Decrypt and decompress a message received from the manager.
+        Args:
+            buffer_array (bytes): Received message, without the size header.
+        Returns:
+            str: Decoded message in ISO-8859-1 format or None if the message is corrupted.
+        """
+        index = buffer_array.find(b'!')
+        if index == 0:
+            index = buffer_array[1:].find(b'!')
+            buffer_array = buffer_array[index + 2:]
+        if self.cypher == "aes":
+            msg_remove_header = bytes(buffer_array[5:])
+            msg_decrypted = Cipher(msg_remove_header, self.encryption_key).decrypt_aes()
+        else:
+            msg_remove_header = bytes(buffer_array[1:])
+            msg_decrypted = Cipher(msg_remove_header, self.encryption_key).decrypt_blowfish()
+        try:
+            padding = 0
+            while msg_decrypted:
+                if msg_decrypted[padding] == 33:
+                    padding += 1
+                else:
+                    break
+            msg_remove_padding = msg_decrypted[padding:]
+            msg_decompress = zlib.decompress(msg_remove_padding)
+            return msg_decompress.decode('ISO-8859-1')
+        except zlib.error:
+            logging.error("Corrupted message from the manager. Continuing.")
+            return None
 
     def stop_receiver(self):
         """Stop Agent listener."""
@@ -682,6 +737,55 @@ class Agent:
         if self.winevt is None:
             self.winevt = GeneratorWinevt(self.name, self.id)
 
+    def get_event_generator(self, module):
+        """Get the function that generates the messages of a module, initializing the module if needed.
+        Args:
+            module (str): Module name.
+        Returns:
+            callable: Function without arguments that returns a new message of the module.
+        Raises:
+            ValueError: If the module does not generate events.
+        """
+        if module == 'hostinfo':
+            self.init_hostinfo()
+            return self.hostinfo.generate_event
+        elif module == 'rootcheck':
+            self.init_rootcheck()
+            return self.rootcheck.get_message
+        elif module == 'syscollector':
+            self.init_syscollector()
+            return self.syscollector.generate_event
+        elif module == 'fim_integrity':
+            self.init_fim_integrity()
+            return self.fim_integrity.get_message
+        elif module == 'fim':
+            return self.fim.get_message
+        elif module == 'sca':
+            self.init_sca()
+            return self.sca.get_message
+        elif module == 'winevt':
+            self.init_winevt()
+            return self.winevt.generate_event
+        elif module == 'logcollector':
+            self.init_logcollector()
+            return self.logcollector.generate_event
+        else:
+            raise ValueError('Invalid module selected')
+
+    def fill_message(self, event_msg):
+        """Fill a module message up to the fixed message size, if it is set.
+        Args:
+            event_msg (str): Module message.
+        Returns:
+            str: Filled message.
+        """
+        if self.fixed_message_size is not None:
+            event_msg_size = getsizeof(event_msg)
+            dummy_message_size = self.fixed_message_size - event_msg_size
+            char_size = getsizeof(event_msg[0]) - getsizeof('')
+            event_msg += 'A' * (dummy_message_size//char_size)
+        return event_msg
+
     def get_agent_info(self, field):
         agent_info = wdb.query_wdb(f"global get-agent-info {self.id}")
 
@@ -1444,6 +1548,7 @@ class Sender:
         self.manager_port = manager_port
         self.protocol = protocol.upper()
         self.socket = None
+        self.lock = threading.Lock()
         self.connect()
 
     def connect(self):
@@ -1455,25 +1560,34 @@ class Sender:
 
     def reconnect(self, event):
         if is_tcp(self.protocol):
-            self.socket.shutdown(socket.SHUT_RDWR)
-            self.socket.close()
-            self.connect()
+            with self.lock:
+                self.socket.shutdown(socket.SHUT_RDWR)
+                self.socket.close()
+                self.connect()
             if event:
                 self.send_event(event)
 
     def send_event(self, event):
+        """Send an event to the manager.
+
+        The injector threads of an agent share the sender, so every frame is written with a single `sendall` under
+        a lock to prevent frames of different threads from being interleaved.
+        Args:
+            event (bytes): Event built with `Agent.create_event`.
+        """
         if is_tcp(self.protocol):
             length = pack('<I', len(event))
-            try:
-                self.socket.send(length + event)
-            except BrokenPipeError:
-                logging.warning(f"Broken Pipe error while sending event. Creating new socket...")
-                sleep(5)
-                self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                self.socket.connect((self.manager_address, int(self.manager_port)))
-                self.socket.send(length + event)
-            except ConnectionResetError:
-                logging.warning(f"Connection reset by peer. Continuing...")
+            with self.lock:
+                try:
+                    self.socket.sendall(length + event)
+                except BrokenPipeError:
+                    logging.warning(f"Broken Pipe error while sending event. Creating new socket...")
+                    sleep(5)
+                    self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                    self.socket.connect((self.manager_address, int(self.manager_port)))
+                    self.socket.sendall(length + event)
+                except ConnectionResetError:
+                    logging.warning(f"Connection reset by peer. Continuing...")
         if is_udp(self.protocol):
             self.socket.sendto(event, (self.manager_address, int(self.manager_port)))
 
@@ -1597,43 +1711,15 @@ class InjectorThread(threading.Thread):
         else:
             batch_messages = eps
 
-        if module == 'hostinfo':
-            self.agent.init_hostinfo()
-            module_event_generator = self.agent.hostinfo.generate_event
-        elif module == 'rootcheck':
-            self.agent.init_rootcheck()
-            module_event_generator = self.agent.rootcheck.get_message
+        module_event_generator = self.agent.get_event_generator(module)
+        if module == 'rootcheck':
             batch_messages = len(self.agent.rootcheck.messages_list) * eps
-        elif module == 'syscollector':
-            self.agent.init_syscollector()
-            module_event_generator = self.agent.syscollector.generate_event
-        elif module == 'fim_integrity':
-            self.agent.init_fim_integrity()
-            module_event_generator = self.agent.fim_integrity.get_message
-        elif module == 'fim':
-            module_event_generator = self.agent.fim.get_message
-        elif module == 'sca':
-            self.agent.init_sca()
-            module_event_generator = self.agent.sca.get_message
-        elif module == 'winevt':
-            self.agent.init_winevt()
-            module_event_generator = self.agent.winevt.generate_event
-        elif module == 'logcollector':
-            self.agent.init_logcollector()
-            module_event_generator = self.agent.logcollector.generate_event
-        else:
-            raise ValueError('Invalid module selected')
 
         # Loop events
         while self.stop_thread == 0:
             sent_messages = 0
             while sent_messages < batch_messages:
-                event_msg = module_event_generator()
-                if self.agent.fixed_message_size is not None:
-                    event_msg_size = getsizeof(event_msg)
-                    dummy_message_size = self.agent.fixed_message_size - event_msg_size
-                    char_size = getsizeof(event_msg[0]) - getsizeof('')
-                    event_msg += 'A' * (dummy_message_size//char_size)
+                event_msg = self.agent.fill_message(module_event_generator())
 
                 # Add message limitiation
                 if self.limit_msg:
@@ -1672,8 +1758,166 @@ class InjectorThread(threading.Thread):
             self.stop_thread = 1
 
 
+def write_agents_keys(agents, keys_file, append=False):
+    """Write the identity of the agents to a file in client.keys format (`<id> <name> any <key>`).
+    Args:
+        agents (list(Agent)): Enrolled agents.
+        keys_file (str): Path of the file.
+        append (bool, optional): Append the agents to the file instead of replacing it. Default False.
+    """
+    with open(keys_file, 'a' if append else 'w') as keys:
+        keys.writelines(f"{agent.id} {agent.name} any {agent.key}\n" for agent in agents)
+
+
+class AgentIdentityStore:
+    """On-disk store of the identities (id, name and key) of enrolled agents, in client.keys format.
+
+    It allows running the simulated agents with the identities enrolled in previous runs instead of enrolling new ones
+    every time (see `get_agents`).
+    Args:
+        path (str): Path of the identities file. It is created when the first identities are added.
+    Attributes:
+        path (str): Path of the identities file.
+        identities (list(tuple)): `(id, name, key)` of the stored agents, in the order they were added.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.identities = []
+        self.load()
+
+    def load(self):
+        """Read the identities from the file, skipping empty lines and removed agents (name starting with `!`)."""
+        self.identities = []
+        if not os.path.exists(self.path):
+            return
+
+        with open(self.path) as keys:
+            for line in keys:
+                fields = line.split()
+                if len(fields) == 4 and not fields[1].startswith('!'):
+                    self.identities.append((fields[0], fields[1], fields[3]))
+
+    def take(self, count, offset=0):
+        """Get the identities for `count` agents.
+        Args:
+            count (int): Number of agents.
+            offset (int, optional): Index of the first identity to take, so several processes can share the store.
+                                    Default 0.
+        Returns:
+            list(tuple): Up to `count` identities, fewer if there are not enough stored.
+        """
+        return self.identities[offset:offset + count]
+
+    def add(self, agents):
+        """Add the identities of new enrolled agents to the store.
+
+        The file is locked while writing, so several processes can add identities to the same store.
+        Args:
+            agents (list(Agent)): Enrolled agents.
+        """
+        if agents:
+            with FileLock(self.path):
+                write_agents_keys(agents, self.path, append=True)
+            self.identities.extend((agent.id, agent.name, agent.key) for agent in agents)
+
+    def write_client_keys(self, path, count=None, ip='any'):
+        """Write the stored identities as the client.keys of a manager, like the one read by `RemotedSimulator`.
+        Args:
+            path (str): Path of the client.keys file.
+            count (int, optional): Number of identities to write. Default all of them.
+            ip (str, optional): IP address of the agents. Default `any`.
+        """
+        with open(path, 'w') as keys:
+            keys.writelines(f"{agent_id} {name} {ip} {key}\n" for agent_id, name, key in self.identities[:count])
+
+    def __len__(self):
+        return len(self.identities)
+
+
+def enroll_agents(agents_parameters, concurrency=DEFAULT_ENROLLMENT_CONCURRENCY, enrollment_timeout=None,
+                  keys_file=None):
+    """Create and enroll agents concurrently.
+
+    Every agent is created (and therefore enrolled) in a pool of `concurrency` threads, so the TLS handshakes with
+    authd are overlapped. The failed agents are not retried beyond the `retry_enrollment` setting of each agent.
+    Args:
+        agents_parameters (list(dict)): Keyword arguments of `Agent` for each agent to create.
+        concurrency (int, optional): Maximum number of simultaneous enrollments.
+                                     Default `DEFAULT_ENROLLMENT_CONCURRENCY`
+        enrollment_timeout (float, optional): Timeout in seconds of every enrollment attempt. Default None.
+        keys_file (str, optional): File to write the identities of the enrolled agents in client.keys format.
+    Returns:
+        tuple: List of the enrolled agents, in the same order as their parameters, and enrollment report, a dict with
+               the indexes of the `enrolled` agents, the errors of the `failed` ones by index and the `elapsed` time.
+    """
+    global agent_count
+    start_time = monotonic()
+
+    def enroll(index, parameters):
+        parameters = dict(parameters)
+        parameters.setdefault('enrollment_timeout', enrollment_timeout)
+        # The global count is already advanced for the whole batch, so every agent gets its own number
+        parameters.setdefault('number', first_agent + index)
+        return Agent(**parameters)
+
+    first_agent = agent_count
+    agent_count += len(agents_parameters)
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        futures = [pool.submit(enroll, index, parameters) for index, parameters in enumerate(agents_parameters)]
+
+    agents = []
+    report = {'enrolled': [], 'failed': {}}
+    for index, future in enumerate(futures):
+        try:
+            agents.append(future.result())
+            report['enrolled'].append(index)
+        except Exception as error:
+            report['failed'][index] = str(error) or error.__class__.__name__
+
+    report['elapsed'] = monotonic() - start_time
+    logging.info(f"Enrolled {len(report['enrolled'])} of {len(agents_parameters)} agents in "
+                 f"{report['elapsed']:.2f} seconds ({len(report['failed'])} failed).")
+
+    if keys_file is not None:
+        write_agents_keys(agents, keys_file)
+
+    return agents, report
+
+
+def get_agents(agents_parameters, identity_store, concurrency=DEFAULT_ENROLLMENT_CONCURRENCY,
+               enrollment_timeout=None, first_identity=0):
+    """Create agents reusing the stored identities and enrolling only the ones that are missing.
+
+    The first agents take the identities of the store, so they are not enrolled again. The rest are enrolled
+    concurrently (see `enroll_agents`) and their identities are added to the store for the next runs.
+    Args:
+        agents_parameters (list(dict)): Keyword arguments of `Agent` for each agent to create, without identity.
+        identity_store (AgentIdentityStore): Store of identities.
+        concurrency (int, optional): Maximum number of simultaneous enrollments.
+                                     Default `DEFAULT_ENROLLMENT_CONCURRENCY`
+        enrollment_timeout (float, optional): Timeout in seconds of every enrollment attempt. Default None.
+        first_identity (int, optional): Index of the first stored identity to use. Default 0.
+    Returns:
+        tuple: List of the agents and enrollment report of the missing agents (see `enroll_agents`). The indexes of the
+               report refer to `agents_parameters`.
+    """
+    identities = identity_store.take(len(agents_parameters), first_identity)
+    agents = [Agent(**parameters, id=agent_id, name=name, key=key)
+              for parameters, (agent_id, name, key) in zip(agents_parameters, identities)]
+    logging.info(f"Reused {len(agents)} stored agent identities from {identity_store.path}.")
+
+    enrolled_agents, report = enroll_agents(agents_parameters[len(identities):], concurrency, enrollment_timeout)
+    identity_store.add(enrolled_agents)
+    report['enrolled'] = list(range(len(identities))) + [index + len(identities) for index in report['enrolled']]
+    report['failed'] = {index + len(identities): error for index, error in report['failed'].items()}
+
+    return agents + enrolled_agents, report
+
+
 def create_agents(agents_number, manager_address, cypher='aes', fim_eps=100, authd_password=None, agents_os=None,
-                  agents_version=None, disable_all_modules=False):
+                  agents_version=None, disable_all_modules=False, enrollment_concurrency=None,
+                  enrollment_timeout=None, keys_file=None):
     """Create a list of generic agents
     This will create a list with `agents_number` amount of agents. All of them will be registered in the same manager.
     Args:
@@ -1685,10 +1929,28 @@ def create_agents(agents_number, manager_address, cypher='aes', fim_eps=100, aut
         agents_os (list, optional): list containing different operative systems for the agents.
         agents_version (list, optional): list containing different version of the agent.
         disable_all_modules (boolean): Disable all simulated modules for this agent.
+        enrollment_concurrency (int, optional): Enroll the agents concurrently with this limit (see `enroll_agents`).
+                                                By default, they are enrolled one after another.
+        enrollment_timeout (float, optional): Timeout in seconds of every enrollment attempt.
+        keys_file (str, optional): File to write the identities of the agents in client.keys format.
     Returns:
         list: list of the new virtual agents.
+    Raises:
+        ValueError: If any agent could not be enrolled concurrently.
     """
     global agent_count
+    if enrollment_concurrency is not None:
+        agents_parameters = [{'manager_address': manager_address, 'cypher': cypher, 'fim_eps': fim_eps,
+                              'authd_password': authd_password,
+                              'os': agents_os[agent] if agents_os is not None else None,
+                              'version': agents_version[agent] if agents_version is not None else None,
+                              'disable_all_modules': disable_all_modules} for agent in range(agents_number)]
+        agents, report = enroll_agents(agents_parameters, enrollment_concurrency, enrollment_timeout, keys_file)
+        if report['failed']:
+            raise ValueError(f"{len(report['failed'])} agents were not correctly enrolled: {report['failed']}")
+
+        return agents
+
     # Read client.keys and create virtual agents
     agents = []
     for agent in range(agents_number):
@@ -1696,10 +1958,14 @@ def create_agents(agents_number, manager_address, cypher='aes', fim_eps=100, aut
         agent_version = agents_version[agent] if agents_version is not None else None
 
         agents.append(Agent(manager_address, cypher, fim_eps=fim_eps, authd_password=authd_password,
-                            os=agent_os, version=agent_version, disable_all_modules=disable_all_modules))
+                            os=agent_os, version=agent_version, disable_all_modules=disable_all_modules,
+                            enrollment_timeout=enrollment_timeout))
 
         agent_count = agent_count + 1
 
+    if keys_file is not None:
+        write_agents_keys(agents, keys_file)
+
     return agents
 
 
@@ -0,0 +1,466 @@
+# Copyright (C) 2015-2022, Wazuh Inc.
+# Created by Wazuh, Inc. <info@wazuh.com>.
+# This program is free software; you can redistribute it and/or modify it under the terms of GPLv2
+import asyncio
+import logging
+from collections import defaultdict
+from random import getrandbits
+from struct import pack, unpack
+from time import monotonic
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from wazuh_testing import TCP, is_tcp, is_udp
+
+DEFAULT_STARTUP_DELAY = 10
+DEFAULT_CONNECTION_CONCURRENCY = 256
+# Maximum number of events of a module encoded per call to Agent.create_events
+ENCODING_BATCH_SIZE = 32
+
+
+def raise_open_files_limit():
+    """Raise the soft limit of open files to the hard limit, since every simulated agent keeps its own socket.
+
+    Returns:
+        int: Current soft limit of open files or `None` if it can not be checked in this platform.
+    """
+    if resource is None:
+        return None
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft != hard:
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+            soft = hard
+        except (ValueError, OSError):
+            pass
+
+    return soft
+
+
+class TokenBucket:
+    """Token bucket to pace the events sent by a module.
+
+    Args:
+        rate (float): Tokens added per second. `0` or `None` disables the pacing.
+        capacity (float, optional): Maximum burst size. Default `rate`
+
+    Attributes:
+        rate (float): Tokens added per second.
+        capacity (float): Maximum burst size.
+        tokens (float): Available tokens.
+    """
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate or 0, 1)
+        self.tokens = self.capacity
+        self._timestamp = monotonic()
+
+    async def acquire(self, tokens=1):
+        """Wait until `tokens` tokens are available and consume them.
+
+        Args:
+            tokens (float, optional): Tokens to consume. Default `1`
+        """
+        if not self.rate:
+            return
+
+        while True:
+            now = monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self._timestamp) * self.rate)
+            self._timestamp = now
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return
+            await asyncio.sleep((tokens - self.tokens) / self.rate)
+
+
+class _DatagramReceiver(asyncio.DatagramProtocol):
+    """Protocol that stores the datagrams received from the manager in a queue."""
+    def __init__(self, received):
+        self.received = received
+
+    def datagram_received(self, data, addr):
+        self.received.put_nowait(data)
+
+
+class AsyncSender:
+    """Asyncio version of `agent_simulator.Sender`.
+
+    Every event is written to the transport with a single call, so the frames of the different coroutines of an agent
+    are never interleaved.
+
+    Args:
+        manager_address (str): IP of the manager.
+        manager_port (str, optional): Port used by remoted in the manager. Default `'1514'`
+        protocol (str, optional): Protocol used by remoted. TCP or UDP. Default `TCP`
+
+    Attributes:
+        manager_address (str): IP of the manager.
+        manager_port (str): Port used by remoted in the manager.
+        protocol (str): Protocol used by remoted. TCP or UDP.
+        reader (asyncio.StreamReader): Stream to receive messages (TCP).
+        writer (asyncio.StreamWriter): Stream to send events (TCP).
+        transport (asyncio.DatagramTransport): Transport to send and receive events (UDP).
+    """
+    def __init__(self, manager_address, manager_port='1514', protocol=TCP):
+        self.manager_address = manager_address
+        self.manager_port = manager_port
+        self.protocol = protocol.upper()
+        self.reader = None
+        self.writer = None
+        self.transport = None
+        self._received = None
+        self._reconnection = None
+
+    async def connect(self):
+        """Open the connection with the manager."""
+        if is_tcp(self.protocol):
+            self.reader, self.writer = await asyncio.open_connection(self.manager_address, int(self.manager_port))
+        if is_udp(self.protocol):
+            self._received = asyncio.Queue()
+            self.transport, _ = await asyncio.get_running_loop().create_datagram_endpoint(
+                lambda: _DatagramReceiver(self._received), remote_addr=(self.manager_address, int(self.manager_port)))
+
+    def send_event(self, event):
+        """Write an event to the connection.
+
+        Args:
+            event (bytes): Event built with `Agent.create_event`.
+
+        Raises:
+            ConnectionError: If the connection is closed or being reestablished.
+        """
+        if is_tcp(self.protocol):
+            if self.writer is None or self.writer.is_closing():
+                raise ConnectionError('Connection with the manager is closed')
+            self.writer.write(pack('<I', len(event)) + event)
+        if is_udp(self.protocol):
+            if self.transport is None or self.transport.is_closing():
+                raise ConnectionError('Connection with the manager is closed')
+            self.transport.sendto(event)
+
+    async def drain(self):
+        """Wait until the events written to the connection can be flushed."""
+        if is_tcp(self.protocol) and self.writer is not None:
+            await self.writer.drain()
+
+    async def receive(self):
+        """Receive a message from the manager.
+
+        Returns:
+            bytes: Received message, without the size header.
+        """
+        if is_tcp(self.protocol):
+            size = unpack('<I', await self.reader.readexactly(4))[0]
+            return await self.reader.readexactly(size)
+        return await self._received.get()
+
+    def reconnect(self, event):
+        """Reopen the connection in the background, sending `event` once it is established.
+
+        It has the same interface as `Sender.reconnect` so it can be used by `Agent.process_message`.
+
+        Args:
+            event (bytes): Event to send after the reconnection, or `None`.
+        """
+        if is_tcp(self.protocol) and (self._reconnection is None or self._reconnection.done()):
+            self._reconnection = asyncio.get_running_loop().create_task(self._reconnect(event))
+
+    async def _reconnect(self, event, delay=0):
+        await self.close()
+        if delay:
+            await asyncio.sleep(delay)
+        try:
+            await self.connect()
+            if event:
+                self.send_event(event)
+        except OSError as error:
+            logging.warning(f"Could not reconnect to {self.manager_address}:{self.manager_port}: {error}")
+
+    def reconnect_after_error(self, delay=5):
+        """Reopen a broken connection after `delay` seconds, unless a reconnection is already in progress."""
+        if is_tcp(self.protocol) and (self._reconnection is None or self._reconnection.done()):
+            self._reconnection = asyncio.get_running_loop().create_task(self._reconnect(None, delay))
+
+    async def close(self):
+        """Close the connection with the manager."""
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except OSError:
+                pass
+        if self.transport is not None:
+            self.transport.close()
+
+
+class AsyncInjector:
+    """Asyncio version of `agent_simulator.Injector`.
+
+    Every enabled module of the agent is run as a coroutine instead of a thread. The modules that generate events are
+    paced with a token bucket of `eps` tokens per second.
+
+    Args:
+        sender (AsyncSender): Sender used to communicate with the manager.
+        agent (Agent): Agent owner of the injector and the sender.
+        limit (int, optional): Maximum amount of messages to be sent by every module.
+        startup_delay (float, optional): Seconds to wait before sending the first events. Default `10`
+
+    Attributes:
+        sender (AsyncSender): Sender used to communicate with the manager.
+        agent (Agent): Agent owner of the injector and the sender.
+        limit_msg (int): Maximum amount of messages to be sent by every module.
+        modules (list): Enabled modules.
+        stats (dict): Sent and failed events by module.
+        tasks (list(asyncio.Task)): Tasks of all the modules.
+        event_tasks (list(asyncio.Task)): Tasks of the modules that generate events.
+    """
+    def __init__(self, sender, agent, limit=None, startup_delay=DEFAULT_STARTUP_DELAY):
+        self.sender = sender
+        self.agent = agent
+        self.limit_msg = limit
+        self.startup_delay = startup_delay
+        self.modules = [module for module, config in agent.modules.items() if config['status'] == 'enabled']
+        self.stats = defaultdict(lambda: {'sent': 0, 'failed': 0})
+        self.tasks = []
+        self.event_tasks = []
+        self._stop = False
+
+    def start(self):
+        """Start a task for every enabled module.
+
+        Returns:
+            list(asyncio.Task): Tasks of the modules.
+        """
+        self._stop = False
+        loop = asyncio.get_running_loop()
+        for module in self.modules:
+            if module == 'keepalive':
+                task = loop.create_task(self.keep_alive())
+            elif module == 'receive_messages':
+                task = loop.create_task(self.receive_messages())
+            else:
+                task = loop.create_task(self.run_module(module))
+                self.event_tasks.append(task)
+            self.tasks.append(task)
+
+        return self.tasks
+
+    async def stop(self):
+        """Stop every module and close the connection."""
+        self._stop = True
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        await self.sender.close()
+
+    async def send(self, module, event):
+        """Send an event, accounting it in the module stats.
+
+        Args:
+            module (str): Module that generated the event.
+            event (bytes): Event to send.
+        """
+        try:
+            self.sender.send_event(event)
+            await self.sender.drain()
+            self.stats[module]['sent'] += 1
+        except (ConnectionError, OSError):
+            self.stats[module]['failed'] += 1
+            self.sender.reconnect_after_error()
+
+    async def keep_alive(self):
+        """Send the startup message and then keep alive messages from the agent to the manager."""
+        await asyncio.sleep(self.startup_delay)
+        logging.debug(f"Startup - {self.agent.name}({self.agent.id})")
+        await self.send('keepalive', self.agent.startup_msg)
+        await self.send('keepalive', self.agent.keep_alive_event)
+        module_info = self.agent.modules['keepalive']
+        frequency = 0 if 'eps' in module_info else module_info['frequency']
+        bucket = TokenBucket(module_info.get('eps', 1))
+
+        start_time = monotonic()
+        while not self._stop:
+            logging.debug(f"KeepAlive - {self.agent.name}({self.agent.id})")
+            await self.send('keepalive', self.agent.keep_alive_event)
+            if frequency > 0:
+                await asyncio.sleep(frequency - ((monotonic() - start_time) % frequency))
+            else:
+                logging.debug('Merged checksum modified to force manager overload')
+                self.agent.update_checksum(str(getrandbits(128)))
+                await bucket.acquire()
+
+    async def run_module(self, module):
+        """Send the events of a module from the agent to the manager.
+
+        Args:
+            module (str): Module name.
+        """
+        module_info = self.agent.modules[module]
+        eps = module_info['eps'] if 'eps' in module_info else 1
+        frequency = module_info['frequency'] if 'frequency' in module_info else 1
+        batch_messages = eps * 0.5 * frequency if frequency > 1 else eps
+        module_event_generator = self.agent.get_event_generator(module)
+        if module == 'rootcheck':
+            batch_messages = len(self.agent.rootcheck.messages_list) * eps
+        bucket = TokenBucket(eps)
+
+        await asyncio.sleep(self.startup_delay)
+        start_time = monotonic()
+        total_messages = 0
+        while not self._stop:
+            sent_messages = 0
+            while sent_messages < batch_messages and not self._stop:
+                if self.limit_msg and total_messages >= self.limit_msg:
+                    return
+                events_number = max(1, int(min(ENCODING_BATCH_SIZE, bucket.capacity, batch_messages - sent_messages)))
+                if self.limit_msg:
+                    events_number = min(events_number, self.limit_msg - total_messages)
+                await bucket.acquire(events_number)
+                messages = [self.agent.fill_message(module_event_generator()) for _ in range(events_number)]
+                for event in self.agent.create_events(messages):
+                    await self.send(module, event)
+                total_messages += events_number
+                sent_messages += events_number
+
+            if frequency > 1:
+                await asyncio.sleep(frequency - ((monotonic() - start_time) % frequency))
+            elif not batch_messages:
+                return
+
+    async def receive_messages(self):
+        """Receive the messages from the manager and process the accepted commands."""
+        while not self._stop and self.agent.stop_receive == 0:
+            try:
+                buffer_array = await self.sender.receive()
+            except (asyncio.IncompleteReadError, ConnectionError, OSError, AttributeError):
+                # The connection is being reestablished
+                await asyncio.sleep(1)
+                continue
+
+            message = self.agent.decode_received_message(buffer_array)
+            if message is not None:
+                self.agent.process_message(self.sender, message)
+
+
+class AsyncAgentSimulator:
+    """Run many simulated agents in a single asyncio event loop.
+
+    Each agent is a set of coroutines (one per enabled module) sharing an `AsyncSender`, so thousands of agents can be
+    simulated by a single process without creating a thread per module and agent. The events are built with
+    `Agent.create_event`, so the wire format is the same as the threaded simulator.
+
+    Args:
+        agents (list(Agent)): Agents to simulate.
+        manager_address (str): Manager IP address to connect the agents.
+        manager_port (str, optional): Port used by remoted in the manager. Default `'1514'`
+        protocol (str, optional): TCP or UDP. Default `TCP`
+        limit_msg (int, optional): Maximum amount of messages to be sent by every module.
+        connection_concurrency (int, optional): Maximum number of connections being established at the same time.
+            Default `256`
+        startup_delay (float, optional): Seconds to wait before sending the first events. Default `10`
+
+    Attributes:
+        injectors (list(AsyncInjector)): Injectors of the agents.
+
+    Examples:
+        >>> import wazuh_testing.tools.agent_simulator as ag
+        >>> from wazuh_testing.tools.async_agent_simulator import AsyncAgentSimulator
+        >>> agents = ag.create_agents(1000, '172.17.0.2')
+        >>> stats = AsyncAgentSimulator(agents, '172.17.0.2').start(time_alive=300)
+    """
+    def __init__(self, agents, manager_address, manager_port='1514', protocol=TCP, limit_msg=None,
+                 connection_concurrency=DEFAULT_CONNECTION_CONCURRENCY, startup_delay=DEFAULT_STARTUP_DELAY):
+        self.manager_address = manager_address
+        self.manager_port = manager_port
+        self.protocol = protocol
+        self.limit_msg = limit_msg
+        self.connection_concurrency = connection_concurrency
+        self.injectors = [AsyncInjector(AsyncSender(manager_address, manager_port, protocol), agent, limit_msg,
+                                        startup_delay) for agent in agents]
+        self._loop = None
+        self._stop_event = None
+        self._stop_requested = False
+
+    async def _connect(self, injector, semaphore):
+        async with semaphore:
+            try:
+                await injector.sender.connect()
+            except OSError as error:
+                logging.error(f"Agent {injector.agent.id} could not connect to {self.manager_address}: {error}")
+                return False
+        injector.start()
+        return True
+
+    async def run(self, time_alive=None):
+        """Connect the agents and run their modules.
+
+        Args:
+            time_alive (float, optional): Seconds to keep the agents running. If it is `None`, the agents run until
+                every event module reaches the messages limit.
+
+        Returns:
+            dict: Sent and failed events by module.
+        """
+        self._loop = asyncio.get_running_loop()
+        self._stop_event = asyncio.Event()
+        if self._stop_requested:
+            self._stop_event.set()
+
+        raise_open_files_limit()
+        semaphore = asyncio.Semaphore(self.connection_concurrency)
+        connected = await asyncio.gather(*[self._connect(injector, semaphore) for injector in self.injectors])
+        logging.info(f"{sum(connected)} of {len(self.injectors)} agents connected to {self.manager_address}")
+
+        if time_alive is None:
+            running = asyncio.gather(*[task for injector in self.injectors for task in injector.event_tasks],
+                                     return_exceptions=True)
+        else:
+            running = asyncio.ensure_future(asyncio.sleep(time_alive))
+        stopped = asyncio.ensure_future(self._stop_event.wait())
+
+        try:
+            await asyncio.wait([running, stopped], return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            running.cancel()
+            stopped.cancel()
+            await asyncio.gather(*[injector.stop() for injector in self.injectors])
+
+        return self.stats
+
+    def stop(self):
+        """Stop the simulation. It can be called from any thread."""
+        self._stop_requested = True
+        if self._loop is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._stop_event.set)
+            except RuntimeError:
+                # The simulation has already finished
+                pass
+
+    def start(self, time_alive=None):
+        """Run the simulation in a new event loop until it finishes.
+
+        Args:
+            time_alive (float, optional): Seconds to keep the agents running. If it is `None`, the agents run until
+                every event module reaches the messages limit.
+
+        Returns:
+            dict: Sent and failed events by module.
+        """
+        return asyncio.run(self.run(time_alive))
+
+    @property
+    def stats(self):
+        """dict: Sent and failed events by module, aggregated for all the agents."""
+        stats = defaultdict(lambda: {'sent': 0, 'failed': 0})
+        for injector in self.injectors:
+            for module, counters in injector.stats.items():
+                stats[module]['sent'] += counters['sent']
+                stats[module]['failed'] += counters['failed']
+
+        return dict(stats)
@@ -12,11 +12,16 @@ def add_client_keys_entry(agent_id, agent_name, agent_ip='any', agent_key=None):
         agent_ip (str): Agent ip.
         agent_key (str): Agent key.
     """
-    registered_client_key_entries_dict = {}
+    add_client_keys_entries([(agent_id, agent_name, agent_ip, agent_key)])
+
+
+def add_client_keys_entries(entries):
+    """Add several entries to client keys file, rewriting it once. The entries of existing agent IDs are overwritten.
 
-    # Generate new key if necessary
-    if agent_key is None:
-        agent_key = ''.join(random.choice('0123456789abcdef') for i in range(64))
+    Args:
+        entries (iterable(tuple)): Agent ID, name, IP and key (`None` to generate a new one) of every entry.
+    """
+    registered_client_key_entries_dict = {}
 
     # Read client keys data
     with open(wazuh_testing.CLIENT_KEYS_PATH, 'r') as client_keys:
@@ -27,8 +32,11 @@ def add_client_keys_entry(agent_id, agent_name, agent_ip='any', agent_key=None):
         _agent_id, _agent_name, _agent_ip, _agent_key = client_key_entry.split()
         registered_client_key_entries_dict[_agent_id] = f"{_agent_id} {_agent_name} {_agent_ip} {_agent_key}"
 
-    # Add the new client key entry
-    registered_client_key_entries_dict[agent_id] = f"{agent_id} {agent_name} {agent_ip} {agent_key}"
+    # Add the new client key entries, generating new keys if necessary
+    for agent_id, agent_name, agent_ip, agent_key in entries:
+        if agent_key is None:
+            agent_key = ''.join(random.choice('0123456789abcdef') for i in range(64))
+        registered_client_key_entries_dict[agent_id] = f"{agent_id} {agent_name} {agent_ip} {agent_key}"
 
     # Save new client keys content
     with open(wazuh_testing.CLIENT_KEYS_PATH, 'w') as client_keys:
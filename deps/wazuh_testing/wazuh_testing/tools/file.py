@@ -414,6 +414,24 @@ def recursive_directory_creation(path):
         os.mkdir(path)
 
 
+def create_private_directory(path):
+    """Create a directory only accessible by the current user, checking it can be trusted if it already exists.
+
+    Args:
+        path (str): Path of the directory.
+
+    Raises:
+        OSError: If the directory cannot be created.
+        ValueError: If the path is not a directory owned by the current user and only writable by them, like a
+            directory or symbolic link planted in a shared folder by another user.
+    """
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    # lstat, so a symbolic link is not followed
+    path_stat = os.lstat(path)
+    if not stat.S_ISDIR(path_stat.st_mode) or path_stat.st_uid != os.getuid() or path_stat.st_mode & 0o022:
+        raise ValueError(f"{path} is not a directory owned by the current user and only writable by them")
+
+
 def move_everything_from_one_directory_to_another(source_directory, destination_directory):
     """Move all files and directories from one directory to another.
 
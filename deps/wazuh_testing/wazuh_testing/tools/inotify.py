@@ -0,0 +1,198 @@
+# Copyright (C) 2015-2022, Wazuh Inc.
+# Created by Wazuh, Inc. <info@wazuh.com>.
+# This program is free software; you can redistribute it and/or modify it under the terms of GPLv2
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+
+# Event masks (see inotify(7))
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+
+# Events that may change the content or the identity of a file inside a watched directory
+IN_FILE_CHANGES = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+_EVENT_HEADER = struct.Struct('iIII')
+_READ_SIZE = 64 * 1024
+
+
+def _load_libc():
+    """Load the C library exposing the inotify syscalls wrappers.
+
+    Returns:
+        ctypes.CDLL: libc handler or `None` if inotify is not available in this platform.
+    """
+    if not sys.platform.startswith('linux'):
+        return None
+
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        for function in ('inotify_init1', 'inotify_add_watch', 'inotify_rm_watch'):
+            getattr(libc, function)
+    except (OSError, AttributeError):
+        return None
+
+    libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+
+    return libc
+
+
+_libc = _load_libc()
+
+
+def is_supported():
+    """Check if the inotify API can be used in the current platform.
+
+    Returns:
+        bool: True if inotify is available, False otherwise.
+    """
+    return _libc is not None
+
+
+class InotifyWatcher:
+    """Thin wrapper over the Linux inotify API.
+
+    It allows waiting for file system events with a timeout and being interrupted from another thread, so the threads
+    that use it can be stopped without waiting for the timeout to expire.
+
+    Args:
+        paths (list(str), optional): Paths to watch when the instance is created.
+        mask (int, optional): Events to watch for every path in `paths`. Default `IN_FILE_CHANGES`
+
+    Raises:
+        OSError: If inotify is not supported or the instance could not be created.
+    """
+    def __init__(self, paths=None, mask=IN_FILE_CHANGES):
+        if not is_supported():
+            raise OSError(errno.ENOSYS, 'inotify is not supported in this platform')
+
+        self.fd = _libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, f"Could not create the inotify instance: {os.strerror(error)}")
+
+        self._wake_read, self._wake_write = os.pipe()
+        os.set_blocking(self._wake_read, False)
+        self.watches = {}
+
+        for path in paths or []:
+            self.add_watch(path, mask)
+
+    def add_watch(self, path, mask=IN_FILE_CHANGES):
+        """Start watching the given path.
+
+        Args:
+            path (str): File or directory to watch.
+            mask (int, optional): Events to watch. Default `IN_FILE_CHANGES`
+
+        Returns:
+            int: Watch descriptor.
+
+        Raises:
+            OSError: If the watch could not be added.
+        """
+        wd = _libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, f"Could not watch {path}: {os.strerror(error)}", path)
+        self.watches[wd] = path
+
+        return wd
+
+    def remove_watch(self, wd):
+        """Stop watching the given watch descriptor.
+
+        Args:
+            wd (int): Watch descriptor returned by `add_watch`.
+        """
+        if self.watches.pop(wd, None) is not None:
+            _libc.inotify_rm_watch(self.fd, wd)
+
+    def wait(self, timeout=None):
+        """Wait until an event arrives, the watcher is interrupted or the timeout expires.
+
+        Args:
+            timeout (float, optional): Maximum time to wait in seconds. `None` waits forever.
+
+        Returns:
+            list(tuple): List of `(path, mask, name)` events. `name` is the name of the file that triggered the event
+                when the watched path is a directory, and an empty string otherwise. The list is empty if the wait
+                timed out or was interrupted.
+        """
+        try:
+            ready, _, _ = select.select([self.fd, self._wake_read], [], [], timeout)
+        except (OSError, ValueError):
+            # The watcher was closed while waiting
+            return []
+
+        if self._wake_read in ready:
+            self._drain(self._wake_read)
+
+        return self.read_events() if self.fd in ready else []
+
+    def read_events(self):
+        """Read the pending events without blocking.
+
+        Returns:
+            list(tuple): List of `(path, mask, name)` events.
+        """
+        events = []
+        try:
+            data = os.read(self.fd, _READ_SIZE)
+        except BlockingIOError:
+            return events
+
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b'\x00'))
+            offset += length
+            if mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+            events.append((self.watches.get(wd), mask, name))
+
+        return events
+
+    def interrupt(self):
+        """Wake up any thread blocked in `wait`."""
+        try:
+            os.write(self._wake_write, b'\x00')
+        except OSError:
+            pass
+
+    def close(self):
+        """Release the inotify instance and the wake-up pipe."""
+        for fd in (self.fd, self._wake_read, self._wake_write):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        self.watches.clear()
+
+    @staticmethod
+    def _drain(fd):
+        try:
+            while os.read(fd, 4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -11,9 +11,11 @@ try:
 except ModuleNotFoundError:
     pass
 
+import locale
 import os
 import queue
 import re
+import select
 import socket
 import socketserver
 import ssl
@@ -22,13 +24,15 @@ import threading
 import time
 import yaml
 
-from collections import defaultdict
+from collections import defaultdict, deque
 from copy import copy
 from datetime import datetime
 from multiprocessing import Process, Manager
 from struct import pack, unpack
 from lockfile import FileLock
 from wazuh_testing import logger
+from wazuh_testing.tools import inotify
+from wazuh_testing.tools.pattern_matcher import MultiPatternMatcher, PatternCallback
 from wazuh_testing.tools.file import truncate_file
 from wazuh_testing.tools.system import HostManager
 
@@ -43,6 +47,11 @@ WAZUH_DB_PREFIX = r'.*wazuh-db.*'
 DEFAULT_POLL_FILE_TIME = 1
 DEFAULT_WAIT_FILE_TIMEOUT = 30
 
+TAILER_INOTIFY_BACKEND = 'inotify'
+TAILER_POLLING_BACKEND = 'polling'
+LOG_BUS_CAPACITY = 100000
+MITM_LATENCY_SAMPLES = 100000
+
 
 def wazuh_unpack(data, format_: str = "<I"):
     """Unpack data with a given header. Using Wazuh header by default.
@@ -100,30 +109,51 @@ def _callback_default(line):
 
 
 class FileTailer:
+    """Follow a file and put every new line in a queue.
+
+    Two backends are available to wait for new data: `inotify`, which wakes up as soon as the file is written (Linux
+    only), and `polling`, which checks the file every `time_step` seconds. By default, `inotify` is used whenever it is
+    supported. In both cases, the appended data is read in chunks and truncated or rotated files are followed.
 
-    def __init__(self, file_path, encoding=None, time_step=0.5):
+    Args:
+        file_path (str): Path of the file to follow.
+        encoding (str, optional): Encoding of the file. Default `utf-8` (or the locale encoding on Windows).
+        time_step (float, optional): Maximum time between checks of the file. Default `0.5`
+        backend (str, optional): `inotify`, `polling` or `None` to choose it automatically. Default `None`
+    """
+    chunk_size = 64 * 1024
+
+    def __init__(self, file_path, encoding=None, time_step=0.5, backend=None):
         self.file_path = file_path
         self._position = 0
+        self._file_id = None
+        self._file_start = 0
         self.time_step = time_step
         self._queue = Queue()
         self.event = threading.Event()
         self.thread = None
+        self._watcher = None
         if sys.platform == 'win32':
             self.encoding = None if encoding is None else encoding
-        elif encoding is None:
-            self.encoding = 'utf-8'
+        else:
+            self.encoding = 'utf-8' if encoding is None else encoding
+
+        if backend is None:
+            backend = TAILER_INOTIFY_BACKEND if inotify.is_supported() else TAILER_POLLING_BACKEND
+        elif backend not in (TAILER_INOTIFY_BACKEND, TAILER_POLLING_BACKEND):
+            raise ValueError(f"Invalid tailer backend: {backend}. Valid ones are {TAILER_INOTIFY_BACKEND} or "
+                             f"{TAILER_POLLING_BACKEND}")
+        self.backend = backend
 
     def __copy__(self):
-        new_tailer = FileTailer(self.file_path)
+        new_tailer = FileTailer(self.file_path, backend=self.backend)
         for attr, value in vars(self).items():
-            if attr == 'file_path':
+            if attr in ('file_path', '_watcher'):
                 continue
             elif attr != '_queue':
                 setattr(new_tailer, attr, value)
             else:
-                new_queue = Queue()
-                new_queue.queue = copy(getattr(self, attr).queue)
-                setattr(new_tailer, attr, new_queue)
+                setattr(new_tailer, attr, copy(value))
         return new_tailer
 
     @property
@@ -138,25 +168,155 @@ class FileTailer:
 
     def run(self):
         self.event = threading.Event()
+        self._watcher = self._create_watcher()
         self.thread = threading.Thread(target=self._tail_forever)
         self.thread.start()
 
     def shutdown(self):
         self.event.set()
+        if self._watcher is not None:
+            self._watcher.interrupt()
         self.thread.join()
 
+    def _create_watcher(self):
+        """Create the inotify watcher for the parent directory of the file, if the backend requires it.
+
+        The directory is watched instead of the file itself so that the events keep arriving after the file is
+        rotated or recreated.
+
+        Returns:
+            InotifyWatcher: Watcher instance or `None` if the polling backend must be used.
+        """
+        if self.backend != TAILER_INOTIFY_BACKEND:
+            return None
+
+        try:
+            return inotify.InotifyWatcher([os.path.dirname(os.path.abspath(self.file_path))])
+        except OSError as e:
+            logger.debug(f"Could not watch {self.file_path} with inotify, falling back to polling: {e}")
+            return None
+
+    def _wait_for_changes(self):
+        """Block until the file may have changed, the tailer is stopped or `time_step` seconds have elapsed.
+
+        Returns:
+            bool: True if a change in the file was notified, False otherwise.
+        """
+        if self._watcher is None:
+            self.event.wait(self.time_step)
+            return False
+
+        name = os.path.basename(self.file_path)
+        for _, mask, event_name in self._watcher.wait(self.time_step):
+            if event_name == name or mask & inotify.IN_Q_OVERFLOW:
+                return True
+
+        return False
+
+    def _decode(self, line):
+        return line.decode(self.encoding or locale.getpreferredencoding(False), errors='backslashreplace')
+
+    def _read_lines(self, file, pending):
+        """Read the data appended to the file and queue every complete line.
+
+        Args:
+            file (io.BufferedReader): File opened in binary mode.
+            pending (bytearray): Incomplete line read in previous calls. It is updated in place.
+
+        Returns:
+            bool: True if any data was read, False if the end of the file was reached.
+        """
+        data = file.read(self.chunk_size)
+        if not data:
+            return False
+
+        pending.extend(data)
+        end = pending.rfind(b'\n')
+        if end != -1:
+            for line in pending[:end].split(b'\n'):
+                self.add_item(self._decode(line[:-1] if line.endswith(b'\r') else line) + '\n')
+            self._position += end + 1
+            del pending[:end + 1]
+
+        return True
+
+    def _follow_file(self, file, pending):
+        """Rewind the file if it has been truncated or reopen it if it has been rotated.
+
+        The truncation is checked first so that the data written to the old file before the rotation is not lost.
+
+        Args:
+            file (io.BufferedReader): Current file object, already read until its end.
+            pending (bytearray): Incomplete line read from the current file. It is cleared if the file changes.
+
+        Returns:
+            io.BufferedReader: File object to keep reading from.
+        """
+        if os.fstat(file.fileno()).st_size < self._position + len(pending):
+            pending.clear()
+            self._rewind()
+            file.seek(0)
+            return file
+
+        try:
+            path_stat = os.stat(self.file_path)
+        except FileNotFoundError:
+            # Rotation in progress, keep the current file until the new one is created
+            return file
+
+        file_stat = os.fstat(file.fileno())
+        if (path_stat.st_dev, path_stat.st_ino) != (file_stat.st_dev, file_stat.st_ino):
+            if pending:
+                self.add_item(self._decode(pending))
+                pending.clear()
+            file.close()
+            file = self._open_file()
+
+        return file
+
+    def _rewind(self):
+        """Start reading the file from the beginning. The next queued item is the first line of the file."""
+        self._position = 0
+        self._file_start = self._queue.next_index
+
+    def _open_file(self):
+        """Open the file and restore the reading position.
+
+        The position is kept if the file is the one that was being read before, otherwise it is read from the start.
+
+        Returns:
+            io.BufferedReader: File opened in binary mode.
+        """
+        file = open(self.file_path, 'rb')
+        file_stat = os.fstat(file.fileno())
+        if (file_stat.st_dev, file_stat.st_ino) != self._file_id:
+            if self._file_id is not None:
+                self._rewind()
+            self._file_id = (file_stat.st_dev, file_stat.st_ino)
+        file.seek(self._position)
+
+        return file
+
     def _tail_forever(self):
         """Wait for new lines to be appended to the file."""
-        with open(self.file_path, encoding=self.encoding, errors='backslashreplace') as f:
-            f.seek(self._position)
+        pending = bytearray()
+        file = self._open_file()
+        try:
             while not self.event.is_set():
-                line = f.readline()
-                if not line:
-                    f.seek(self._position)
-                    time.sleep(self.time_step)
-                else:
-                    self.add_item(line)
-                self._position = f.tell()
+                if self._read_lines(file, pending):
+                    continue
+
+                file = self._follow_file(file, pending)
+                if not self._wait_for_changes() and pending and not self.event.is_set():
+                    # Nothing was written after an incomplete line, so deliver it as is
+                    self.add_item(self._decode(pending))
+                    self._position += len(pending)
+                    pending.clear()
+        finally:
+            file.close()
+            if self._watcher is not None:
+                self._watcher.close()
+                self._watcher = None
 
 
 def make_callback(pattern, prefix="wazuh", escape=False):
@@ -168,7 +328,7 @@ def make_callback(pattern, prefix="wazuh", escape=False):
         prefix  (str): String prefix (modulesd, remoted, ...)
         escape (bool): Flag to escape special characters in the pattern
     Returns:
-        lambda function with the callback
+        PatternCallback: callable that returns True if the line matches and False otherwise.
     """
     if escape:
         pattern = re.escape(pattern)
@@ -176,36 +336,160 @@ def make_callback(pattern, prefix="wazuh", escape=False):
         pattern = r'\s+'.join(pattern.split())
 
     full_pattern = pattern if prefix is None else fr'{prefix}{pattern}'
-    regex = re.compile(full_pattern)
 
-    return lambda line: regex.match(line.decode() if isinstance(line, bytes) else line) is not None
+    return PatternCallback(full_pattern, default=False)
+
+
+class LogBus:
+    """Single reader of a file shared by all the monitors of that file.
+
+    Only one `FileTailer` reads and decodes the file, keeping the last `capacity` lines in a ring buffer. Every
+    subscriber gets a lightweight `QueueCursor` over that buffer, so several monitors can scan the same file without
+    duplicating the I/O or the buffered lines. The reader only runs while at least one subscriber is using it.
+
+    Use `LogBus.get` to obtain the bus of a file instead of creating it directly. The bus is only shared while it is
+    reading: when its last subscriber stops, it is removed from the shared buses, so its buffer is freed with the
+    monitors that keep using it, and it is shared again when one of them starts reading.
+
+    Args:
+        file_path (str): Path of the file to read.
+        encoding (str, optional): Encoding of the file. Default `None`
+        time_step (float, optional): Maximum time between checks of the file. Default `0.5`
+        backend (str, optional): Backend of the tailer. Default `None`
+        capacity (int, optional): Maximum number of lines kept in the buffer. Default `LOG_BUS_CAPACITY`
+    """
+    _buses = {}
+    _buses_lock = threading.Lock()
+
+    def __init__(self, file_path, encoding=None, time_step=0.5, backend=None, capacity=LOG_BUS_CAPACITY):
+        self.tailer = FileTailer(file_path, encoding=encoding, time_step=time_step, backend=backend)
+        self.tailer._queue = RingQueue(capacity)
+        self.key = (os.path.realpath(file_path), encoding, time_step, backend)
+        self._users = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def get(cls, file_path, encoding=None, time_step=0.5, backend=None, capacity=LOG_BUS_CAPACITY):
+        """Get the bus of a file, creating it if it does not exist.
+
+        The buses are shared by the monitors with the same encoding, time step and backend. The buffer of a shared bus
+        keeps the largest capacity requested.
+
+        Args:
+            file_path (str): Path of the file to read.
+            encoding (str, optional): Encoding of the file. Default `None`
+            time_step (float, optional): Maximum time between checks of the file. Default `0.5`
+            backend (str, optional): Backend of the tailer. Default `None`
+            capacity (int, optional): Minimum number of lines kept in the buffer. Default `LOG_BUS_CAPACITY`
+
+        Returns:
+            LogBus: Bus of the file.
+        """
+        key = (os.path.realpath(file_path), encoding, time_step, backend)
+        with cls._buses_lock:
+            if key not in cls._buses:
+                cls._buses[key] = cls(file_path, encoding=encoding, time_step=time_step, backend=backend,
+                                      capacity=capacity)
+            bus = cls._buses[key]
+            with bus.queue.mutex:
+                bus.queue.capacity = max(bus.queue.capacity, capacity)
+            return bus
+
+    @property
+    def queue(self):
+        return self.tailer.queue
+
+    def subscribe(self):
+        """Create a cursor positioned at the first line of the current content of the file.
+
+        Returns:
+            QueueCursor: Cursor over the lines of the file.
+        """
+        with self._lock:
+            try:
+                file_stat = os.stat(self.tailer.file_path)
+            except FileNotFoundError:
+                return QueueCursor(self.queue, self.queue.next_index)
+
+            if self.tailer._file_id is not None and ((file_stat.st_dev, file_stat.st_ino) != self.tailer._file_id or
+                                                     file_stat.st_size < self.tailer._position):
+                # The file has been truncated or replaced and the reader has not noticed it yet, so every line read
+                # from now on belongs to the new content
+                return QueueCursor(self.queue, self.queue.next_index)
+
+            return QueueCursor(self.queue, self.tailer._file_start)
+
+    def acquire(self):
+        """Register a subscriber that is reading, starting the reader if needed."""
+        with self._lock:
+            if self._users == 0:
+                with LogBus._buses_lock:
+                    LogBus._buses.setdefault(self.key, self)
+                self.tailer.start()
+            self._users += 1
+
+    def release(self):
+        """Unregister a subscriber that is reading, stopping the reader and unsharing the bus if it was the last one."""
+        with self._lock:
+            self._users -= 1
+            if self._users == 0:
+                self.tailer.shutdown()
+                with LogBus._buses_lock:
+                    if LogBus._buses.get(self.key) is self:
+                        del LogBus._buses[self.key]
 
 
 class FileMonitor:
-    def __init__(self, file_path, time_step=0.5):
-        self.tailer = FileTailer(file_path, time_step=time_step)
+    """Monitor the lines written to a file.
+
+    All the monitors of the same file share the same reader (see `LogBus`), each one keeping its own position in it.
+    A monitor that falls more than `capacity` lines behind the reader skips the oldest ones, logging a warning.
+
+    Args:
+        file_path (str): Path of the file to monitor.
+        time_step (float, optional): Fraction of time to wait in every get. Default `0.5`
+        backend (str, optional): Backend used to follow the file. Default `None`
+        capacity (int, optional): Number of lines the monitor can fall behind. Default `LOG_BUS_CAPACITY`
+    """
+    def __init__(self, file_path, time_step=0.5, backend=None, capacity=LOG_BUS_CAPACITY):
+        self.file_path = file_path
+        self._backend = backend
+        self._capacity = capacity
+        self._buses = {}
+        self._cursors = {}
         self._result = None
         self._time_step = time_step
 
     def start(self, timeout=-1, callback=_callback_default, accum_results=1, update_position=True, timeout_extra=0,
               error_message='', encoding=None):
         """Start the file monitoring until the stop method is called."""
+        # Keep using the same bus, even if it is no longer shared, to keep the position of the monitor in it
+        if encoding not in self._buses:
+            self._buses[encoding] = LogBus.get(self.file_path, encoding=encoding, time_step=self._time_step,
+                                               backend=self._backend, capacity=self._capacity)
+        bus = self._buses[encoding]
+        if bus not in self._cursors:
+            self._cursors[bus] = bus.subscribe()
+        cursor = self._cursors[bus] if update_position else copy(self._cursors[bus])
+
+        bus.acquire()
         try:
-            tailer = self.tailer if update_position else copy(self.tailer)
-
-            if encoding is not None:
-                tailer.encoding = encoding
-            tailer.start()
-
-            monitor = QueueMonitor(tailer.queue, time_step=self._time_step)
+            monitor = QueueMonitor(cursor, time_step=self._time_step)
             self._result = monitor.start(timeout=timeout, callback=callback, accum_results=accum_results,
                                          update_position=True, timeout_extra=timeout_extra,
                                          error_message=error_message).result()
         finally:
-            tailer.shutdown()
+            bus.release()
 
         return self
 
+    @property
+    def tailer(self):
+        """FileTailer: Reader shared by the monitors of the file with the default encoding."""
+        bus = self._buses.get(None) or LogBus.get(self.file_path, time_step=self._time_step, backend=self._backend,
+                                                  capacity=self._capacity)
+        return bus.tailer
+
     def result(self):
         return self._result
 
@@ -398,8 +682,11 @@ class QueueMonitor:
                     timeout_extra=0):
         """Get as many matched results as `accum_results`.
 
+        Several conditions can be waited for in a single pass by passing a list of callbacks (or a
+        `MultiPatternMatcher`) as `callback`. In that case, `accum_results` results are expected for every callback.
+
         Args:
-            callback (callable, optional) : Callback function to filter results.
+            callback (callable or list(callable), optional) : Callback function to filter results.
             accum_results (int, optional) : Number of results to get. Default `1`
             timeout (int, optional): Maximum timeout. Default `-1`
             update_position (bool, optional) : True if we pop items from the queue once they are read. False otherwise.
@@ -409,15 +696,20 @@ class QueueMonitor:
 
         Returns:
             (list of any): It can return either a list of any type or simply any type.
-                If `accum_results > 1`, it will be a list.
+                If `accum_results > 1`, it will be a list. If several callbacks are used, it will be a list with the
+                results of every callback.
         """
-        result_list = []
+        multiple_callbacks = isinstance(callback, (list, tuple, MultiPatternMatcher))
+        if multiple_callbacks and not isinstance(callback, MultiPatternMatcher):
+            callback = MultiPatternMatcher(callback)
+        result_lists = [[] for _ in callback.callbacks] if multiple_callbacks else [[]]
         timer = 0.0
         time_wait = 0.1
+        cursor = None if update_position or not hasattr(self._queue, 'cursor') else self._queue.cursor()
         position = 0
         extra_timer_is_running = False
         extra_timer = 0.0
-        while len(result_list) != accum_results or extra_timer_is_running:
+        while any(len(result_list) < accum_results for result_list in result_lists) or extra_timer_is_running:
             if timer >= timeout and not extra_timer_is_running:
                 self.abort()
                 break
@@ -428,15 +720,23 @@ class QueueMonitor:
             try:
                 if update_position:
                     msg = self._queue.get(block=True, timeout=self._time_step)
+                elif cursor is not None:
+                    msg = cursor.get(block=True, timeout=self._time_step)
                 else:
                     msg = self._queue.peek(position=position, block=True, timeout=self._time_step)
                     position += 1
-                item = callback(msg)
+                if multiple_callbacks:
+                    items = callback(msg).items()
+                else:
+                    item = callback(msg)
+                    items = [(0, item)] if item is not None and item else []
                 logging.debug(msg)
-                if item is not None and item:
-                    result_list.append(item)
-                    if len(result_list) == accum_results and timeout_extra > 0 and not extra_timer_is_running:
-                        extra_timer_is_running = True
+                for index, item in items:
+                    if len(result_lists[index]) < accum_results or extra_timer_is_running:
+                        result_lists[index].append(item)
+                if items and timeout_extra > 0 and not extra_timer_is_running and \
+                        all(len(result_list) >= accum_results for result_list in result_lists):
+                    extra_timer_is_running = True
             except queue.Empty:
                 pass
             finally:
@@ -445,10 +745,9 @@ class QueueMonitor:
                 if extra_timer_is_running:
                     extra_timer += time_count
 
-        if len(result_list) == 1:
-            return result_list[0]
-        else:
-            return result_list
+        results = [result_list[0] if len(result_list) == 1 else result_list for result_list in result_lists]
+
+        return results if multiple_callbacks else results[0]
 
     def start(self, timeout=-1, callback=_callback_default, accum_results=1, update_position=True, timeout_extra=0,
               error_message=''):
@@ -496,22 +795,104 @@ class QueueMonitor:
 
 
 class Queue(queue.Queue):
-    def peek(self, *args, position=0, **kwargs):
+    """FIFO queue that can also be read through independent cursors without consuming its items.
+
+    The items are stored in a list with a moving head, so reading any position is O(1) and popping from the queue
+    is amortized O(1). Every item has an absolute index that does not change when previous items are popped, which
+    is what the cursors use to keep their position.
+    """
+    _compact_threshold = 1024
+
+    def _init(self, maxsize):
+        self.queue = []
+        self._head = 0
+        self._removed = 0
+
+    def _qsize(self):
+        return len(self.queue) - self._head
+
+    def _put(self, item):
+        self.queue.append(item)
+
+    def _get(self):
+        item = self.queue[self._head]
+        self.queue[self._head] = None
+        self._head += 1
+        self._removed += 1
+        if self._head >= self._compact_threshold and self._head * 2 >= len(self.queue):
+            del self.queue[:self._head]
+            self._head = 0
+        return item
+
+    def _wait_for_index(self, index, block=True, timeout=None):
+        """Wait until the item with the given absolute index is available. The `not_empty` lock must be held.
+
+        Args:
+            index (int): Absolute index of the item.
+            block (bool, optional): Wait for the item if it is not available yet. Default `True`
+            timeout (float, optional): Maximum time to wait. `None` waits forever. Default `None`
+
+        Returns:
+            int: Position of the item in the underlying list.
+
+        Raises:
+            queue.Empty: If the item is not available within `timeout` seconds.
+        """
+        end_time = None if timeout is None else time.monotonic() + timeout
+        while index - self._removed >= self._qsize():
+            if not block:
+                raise queue.Empty
+            if end_time is None:
+                self.not_empty.wait()
+            else:
+                remaining = end_time - time.monotonic()
+                if remaining <= 0.0:
+                    raise queue.Empty
+                self.not_empty.wait(remaining)
+        return self._head + index - self._removed
+
+    def peek(self, *args, position=0, block=True, timeout=None, **kwargs):
         """Peek any given position without modifying the queue status.
 
         The difference between `peek` and `get` is `get` pops the item and `peek` does not.
 
         Args:
             position (int, optional) : Element of the queue to return. Default `0`
+            block (bool, optional): Wait for the item if it is not available yet. Default `True`
+            timeout (float, optional): Maximum time to wait. `None` waits forever. Default `None`
 
         Returns:
             (any): Any item in the given position.
+
+        Raises:
+            queue.Empty: If the item is not available within `timeout` seconds.
+        """
+        with self.not_empty:
+            return self.queue[self._wait_for_index(self._removed + position, block=block, timeout=timeout)]
+
+    @property
+    def next_index(self):
+        """int: Absolute index of the next item that will be put in the queue."""
+        with self.mutex:
+            return self._removed + self._qsize()
+
+    def cursor(self, position=0):
+        """Create a new read cursor over the queue.
+
+        Args:
+            position (int, optional): Position of the first item to be read by the cursor. Default `0`
+
+        Returns:
+            QueueCursor: Cursor starting at the given position.
         """
-        aux_queue = queue.Queue()
-        aux_queue.queue = copy(self.queue)
-        for _ in range(position):
-            aux_queue.get(*args, **kwargs)
-        return aux_queue.get(*args, **kwargs)
+        with self.mutex:
+            return QueueCursor(self, self._removed + position)
+
+    def __copy__(self):
+        new_queue = Queue(self.maxsize)
+        with self.mutex:
+            new_queue.queue = self.queue[self._head:]
+        return new_queue
 
     def __repr__(self):
         """Returns the object representation in string format.
@@ -520,7 +901,67 @@ class Queue(queue.Queue):
             be a valid Python expression that can be used to reconstruct the object again. This is used to define how
             an object of this class should be printed.
         """
-        return str(self.queue)
+        with self.mutex:
+            return str(self.queue[self._head:])
+
+
+class RingQueue(Queue):
+    """Queue that drops its oldest items when it holds more than `capacity` of them.
+
+    Args:
+        capacity (int): Maximum number of items kept in the queue.
+    """
+    def __init__(self, capacity):
+        self.capacity = capacity
+        super().__init__()
+
+    def _put(self, item):
+        super()._put(item)
+        if self._qsize() > self.capacity:
+            self._get()
+
+
+class QueueCursor:
+    """Read cursor over a `Queue`.
+
+    A cursor returns the items of the queue in order without removing them, so several cursors can scan the same
+    queue independently. If the items it points to are popped from the queue, it jumps to the oldest available one,
+    logging a warning with the number of skipped items.
+
+    Args:
+        queue_item (Queue): Queue to read from.
+        index (int): Absolute index of the first item to read.
+    """
+    def __init__(self, queue_item, index):
+        self._queue = queue_item
+        self._index = index
+
+    @property
+    def position(self):
+        """int: Position of the next item to read relative to the head of the queue."""
+        return self._index - self._queue._removed
+
+    def get(self, block=True, timeout=None):
+        """Get the next item and advance the cursor.
+
+        Args:
+            block (bool, optional): Wait for the item if it is not available yet. Default `True`
+            timeout (float, optional): Maximum time to wait. `None` waits forever. Default `None`
+
+        Returns:
+            (any): Next item of the queue.
+
+        Raises:
+            queue.Empty: If no item is available within `timeout` seconds.
+        """
+        with self._queue.not_empty:
+            if self._index < self._queue._removed:
+                logger.warning(f"Skipped {self._queue._removed - self._index} items dropped from the queue before "
+                               f"being read")
+                self._index = self._queue._removed
+            item = self._queue.queue[self._queue._wait_for_index(self._index, block=block, timeout=timeout)]
+            self._index += 1
+        return item
 
 
 class StreamServerPort(socketserver.ThreadingTCPServer):
@@ -636,21 +1077,144 @@ if hasattr(socketserver, 'ThreadingUnixStreamServer'):
             pass
 
 
+class ForwardingStats:
+    """Counters of the messages forwarded by a MITM server.
+
+    Args:
+        latency_samples (int): Maximum number of latency samples kept to calculate the percentiles.
+
+    Attributes:
+        requests (int): Number of forwarded requests.
+        sent_bytes (int): Bytes forwarded to the original socket, including the size headers.
+        received_bytes (int): Bytes received from the original socket, including the size headers.
+        connections (int): Number of connections opened to the original socket.
+        latencies (deque): Last round-trip times in seconds of the forwarded requests.
+    """
+    def __init__(self, latency_samples=MITM_LATENCY_SAMPLES):
+        self.requests = 0
+        self.sent_bytes = 0
+        self.received_bytes = 0
+        self.connections = 0
+        self.latencies = deque(maxlen=latency_samples)
+        self._lock = threading.Lock()
+
+    def add_connection(self):
+        with self._lock:
+            self.connections += 1
+
+    def add_request(self, sent_bytes, received_bytes, latency):
+        """Account a forwarded request.
+
+        Args:
+            sent_bytes (int): Bytes of the request.
+            received_bytes (int): Bytes of the response.
+            latency (float): Time in seconds from the request was sent until its response was received. `None` for
+                the requests without response, like the datagrams, which are not used in the latency percentiles.
+        """
+        with self._lock:
+            self.requests += 1
+            self.sent_bytes += sent_bytes
+            self.received_bytes += received_bytes
+            if latency is not None:
+                self.latencies.append(latency)
+
+    def get_percentile(self, percentile):
+        """Get a percentile of the latency samples.
+
+        Args:
+            percentile (float): Percentile, between 0 and 100.
+
+        Returns:
+            float: Latency in seconds or `None` if no request has been forwarded.
+        """
+        with self._lock:
+            latencies = sorted(self.latencies)
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(len(latencies) * percentile / 100))]
+
+    def as_dict(self):
+        """Get the counters and the 50, 90 and 99 latency percentiles.
+
+        Returns:
+            dict: Forwarding counters.
+        """
+        return {'requests': self.requests, 'sent_bytes': self.sent_bytes, 'received_bytes': self.received_bytes,
+                'connections': self.connections, 'latency_p50': self.get_percentile(50),
+                'latency_p90': self.get_percentile(90), 'latency_p99': self.get_percentile(99)}
+
+
 class StreamHandler(socketserver.BaseRequestHandler):
 
+    def setup(self):
+        # Connection to the original socket, shared by all the requests of the client
+        self.forwarded_sock = None
+
+    def finish(self):
+        self.close_forwarded_socket()
+
+    def connect_forwarded_socket(self):
+        """Open the connection to the original socket if it is not open.
+
+        Returns:
+            socket.socket: Connection to the original socket.
+        """
+        if self.forwarded_sock is None:
+            forwarded_sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                forwarded_sock.connect(self.server.mitm.forwarded_socket_path)
+            except OSError:
+                forwarded_sock.close()
+                raise
+            self.forwarded_sock = forwarded_sock
+            self.server.mitm.stats.add_connection()
+
+        return self.forwarded_sock
+
+    def close_forwarded_socket(self):
+        """Close the connection to the original socket."""
+        if self.forwarded_sock is not None:
+            self.forwarded_sock.close()
+            self.forwarded_sock = None
+
     def unix_forward(self, data):
-        """Default TCP unix socket forwarder for MITM servers."""
-        # Create a socket context
-        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as forwarded_sock:
-            # Connect to server and send data
-            forwarded_sock.connect(self.server.mitm.forwarded_socket_path)
-            forwarded_sock.sendall(wazuh_pack(len(data)) + data)
+        """Default TCP unix socket forwarder for MITM servers.
 
-            # Receive data from the server and shut down
-            size = wazuh_unpack(self.recvall_size(forwarded_sock, 4, socket.MSG_WAITALL))
-            response = self.recvall_size(forwarded_sock, size, socket.MSG_WAITALL)
+        The connection to the original socket is kept open for the next requests of the client. If the server closed
+        it while it was idle, the request can't be sent through it, so it is sent through a new connection. A request
+        that was sent is never sent again, even if its response is missing, as it may have been executed.
 
-            return response
+        Raises:
+            ConnectionError: If the server closed the connection without answering the request.
+        """
+        message = wazuh_pack(len(data)) + data
+        reused = self.forwarded_sock is not None
+        forwarded_sock = self.connect_forwarded_socket()
+        start_time = time.perf_counter()
+        try:
+            forwarded_sock.sendall(message)
+        except OSError:
+            self.close_forwarded_socket()
+            if not reused:
+                raise
+            forwarded_sock = self.connect_forwarded_socket()
+            start_time = time.perf_counter()
+            forwarded_sock.sendall(message)
+
+        try:
+            header = self.recvall_size(forwarded_sock, 4, socket.MSG_WAITALL)
+        except OSError:
+            self.close_forwarded_socket()
+            raise
+        if len(header) < 4:
+            self.close_forwarded_socket()
+            raise ConnectionError(f"Connection closed by {self.server.mitm.forwarded_socket_path} without answering "
+                                  'the request')
+
+        response = self.recvall_size(forwarded_sock, wazuh_unpack(header), socket.MSG_WAITALL)
+        self.server.mitm.stats.add_request(len(message), len(response) + 4, time.perf_counter() - start_time)
+
+        return response
 
     def recvall_size(self, sock: socket.socket, size: int, mask: int):
         """Recvall with known size of the message."""
@@ -680,6 +1244,9 @@ class StreamHandler(socketserver.BaseRequestHandler):
     def default_wazuh_handler(self):
         """Default wazuh daemons TCP handler method for MITM server."""
         self.request.settimeout(1)
+        if self.server.mitm.pipelining:
+            return self.pipelined_wazuh_handler()
+
         while not self.server.mitm.event.is_set():
             header = self.recvall_size(self.request, 4, socket.MSG_WAITALL)
             if not header:
@@ -695,6 +1262,57 @@ class StreamHandler(socketserver.BaseRequestHandler):
 
             self.request.sendall(wazuh_pack(len(response)) + response)
 
+    def pipelined_wazuh_handler(self):
+        """Wazuh daemons TCP handler that forwards the requests without waiting for the previous responses.
+
+        The requests are forwarded as they arrive and a second thread sends the responses back to the client in the
+        same order, so the client can have several requests in flight.
+        """
+        forwarded_sock = self.connect_forwarded_socket()
+        forwarded_sock.settimeout(1)
+        pending = deque()
+        requests_done = threading.Event()
+
+        def forward_responses():
+            try:
+                # Run until the client stops sending requests and every response has been sent back
+                while not (requests_done.is_set() and not pending) and not self.server.mitm.event.is_set():
+                    if not select.select([forwarded_sock], [], [], 0.1)[0]:
+                        continue
+                    header = self.recvall_size(forwarded_sock, 4, socket.MSG_WAITALL)
+                    if len(header) < 4 or not pending:
+                        break
+                    response = self.recvall_size(forwarded_sock, wazuh_unpack(header), socket.MSG_WAITALL)
+                    data, size, start_time = pending.popleft()
+                    self.server.mitm.stats.add_request(size, len(response) + 4, time.perf_counter() - start_time)
+                    self.server.mitm.put_queue((data.rstrip(b'\x00'), response.rstrip(b'\x00')))
+                    self.request.sendall(wazuh_pack(len(response)) + response)
+            finally:
+                if not requests_done.is_set():
+                    # Wake up the request loop, which must not forward more requests without this thread
+                    try:
+                        self.request.shutdown(socket.SHUT_RD)
+                    except OSError:
+                        pass
+
+        responses_thread = threading.Thread(target=forward_responses)
+        responses_thread.start()
+
+        try:
+            while not self.server.mitm.event.is_set() and responses_thread.is_alive():
+                header = self.recvall_size(self.request, 4, socket.MSG_WAITALL)
+                if not header:
+                    break
+                data = self.recvall_size(self.request, wazuh_unpack(header), socket.MSG_WAITALL)
+                if not data or not responses_thread.is_alive():
+                    break
+                message = wazuh_pack(len(data)) + data
+                pending.append((data, len(message), time.perf_counter()))
+                forwarded_sock.sendall(message)
+        finally:
+            requests_done.set()
+            responses_thread.join()
+
     def handle(self):
         """Overriden handle method for TCP MITM server."""
         if self.server.mitm.handler_func is None:
@@ -710,9 +1328,10 @@ class StreamHandler(socketserver.BaseRequestHandler):
 class DatagramHandler(socketserver.BaseRequestHandler):
 
     def unix_forward(self, data):
-        """Default UDP unix socket forwarder for MITM servers."""
-        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as forwarded_sock:
-            forwarded_sock.sendto(data, self.server.mitm.forwarded_socket_path)
+        """Default UDP unix socket forwarder for MITM servers, using a socket shared by all the datagrams."""
+        mitm = self.server.mitm
+        mitm.get_datagram_socket().sendto(data, mitm.forwarded_socket_path)
+        mitm.stats.add_request(len(data), 0, None)
 
     def default_wazuh_handler(self):
         """Default wazuh daemons UDP handler method for MITM server."""
@@ -732,7 +1351,8 @@ class DatagramHandler(socketserver.BaseRequestHandler):
 
 class ManInTheMiddle:
 
-    def __init__(self, address, family='AF_UNIX', connection_protocol='TCP', func: callable = None):
+    def __init__(self, address, family='AF_UNIX', connection_protocol='TCP', func: callable = None,
+                 pipelining=False):
         """Create a MITM server for the socket `socket_address`.
 
         Args:
@@ -742,6 +1362,8 @@ class ManInTheMiddle:
                 Default `'AF_UNIX'`
             connection_protocol (str): It can be either 'TCP', 'UDP' or SSL. Default `'TCP'`
             func (callable): Function to be applied to every received data before sending it.
+            pipelining (bool): Forward the TCP requests of a client without waiting for the previous responses.
+                Default `False`
         """
         if isinstance(address, str) or (isinstance(address, tuple) and len(address) == 2
                                         and isinstance(address[0], str) and isinstance(address[1], int)):
@@ -791,10 +1413,14 @@ class ManInTheMiddle:
         self.listener_class = class_tree['listener'][self.mode][self.family]
         self.handler_class = class_tree['handler'][self.mode]
         self.handler_func = func
+        self.pipelining = pipelining
+        self.stats = ForwardingStats()
         self.listener = None
         self.thread = None
         self.event = threading.Event()
         self._queue = Queue()
+        self._datagram_sock = None
+        self._datagram_lock = threading.Lock()
 
     def run(self, *args):
         """Run a MITM server."""
@@ -825,6 +1451,9 @@ class ManInTheMiddle:
         self.listener.shutdown()
         self.listener.socket.close()
         self.event.set()
+        if self._datagram_sock is not None:
+            self._datagram_sock.close()
+            self._datagram_sock = None
         # Remove created unix socket and restore original
         if isinstance(self.listener_socket_address, str):
             os.remove(self.listener_socket_address)
@@ -834,6 +1463,21 @@ class ManInTheMiddle:
     def queue(self):
         return self._queue
 
+    def get_datagram_socket(self):
+        """Get the socket used to forward the datagrams to the original socket, creating it the first time."""
+        with self._datagram_lock:
+            if self._datagram_sock is None:
+                self._datagram_sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            return self._datagram_sock
+
+    def get_stats(self):
+        """Get the forwarding counters and latency percentiles of the MITM server.
+
+        Returns:
+            dict: Forwarding counters (see `ForwardingStats.as_dict`).
+        """
+        return self.stats.as_dict()
+
     def put_queue(self, item):
         self._queue.put(item)
 
@@ -863,14 +1507,12 @@ def generate_monitoring_callback(regex):
     Args:
         regex (str): regex to use to look for a match.
     """
-    def new_callback(line):
-        match = re.match(regex, line)
-        if match:
-            if match.group(1) is not None:
-                return match.group(1)
-            return True
+    def on_match(match):
+        if match.group(1) is not None:
+            return match.group(1)
+        return True
 
-    return new_callback
+    return PatternCallback(regex, on_match=on_match)
 
 
 class HostMonitor:
@@ -1090,11 +1732,9 @@ def generate_monitoring_callback_groups(regex):
     Args:
         regex (str): regex to use to look for a match.
     """
-    def new_callback(line):
-        match = re.match(regex, line)
-        if match:
-            if match.groups() is not None:
-                return match.groups()
-            return True
-
-    return new_callback
+    def on_match(match):
+        if match.groups() is not None:
+            return match.groups()
+        return True
+
+    return PatternCallback(regex, on_match=on_match)
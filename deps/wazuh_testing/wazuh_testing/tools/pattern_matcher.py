@@ -0,0 +1,226 @@
+# Copyright (C) 2015-2022, Wazuh Inc.
+# Created by Wazuh, Inc. <info@wazuh.com>.
+# This program is free software; you can redistribute it and/or modify it under the terms of GPLv2
+import functools
+import re
+
+try:
+    from re import _parser as sre_parse
+    from re import _constants as sre_constants
+except ImportError:
+    import sre_parse
+    import sre_constants
+
+
+def _decode(line):
+    return line.decode() if isinstance(line, bytes) else line
+
+
+def _literal_runs(parsed, runs, current):
+    """Collect the runs of consecutive literal characters that any match of a parsed pattern must contain."""
+    for op, av in parsed:
+        if op is sre_constants.LITERAL:
+            current.append(chr(av))
+        elif op is sre_constants.SUBPATTERN and not av[1] and not av[2]:
+            # Groups do not consume characters, so the literals inside them continue the current run
+            _literal_runs(av[-1], runs, current)
+        else:
+            runs.append(''.join(current))
+            current.clear()
+
+
+def _has_group_references(parsed):
+    """Check if a parsed pattern contains backreferences, which cannot be moved to a combined pattern."""
+    for op, av in parsed:
+        if op in (sre_constants.GROUPREF, sre_constants.GROUPREF_EXISTS):
+            return True
+        for value in av if isinstance(av, (tuple, list)) else []:
+            items = value if isinstance(value, list) else [value]
+            if any(isinstance(item, sre_parse.SubPattern) and _has_group_references(item) for item in items):
+                return True
+    return False
+
+
+def required_literal(pattern):
+    """Get the longest literal string that any line matching the pattern must contain.
+
+    Args:
+        pattern (str): Regular expression.
+
+    Returns:
+        str: Required literal, or an empty string if there is no literal that can be used to discard lines.
+    """
+    try:
+        parsed = sre_parse.parse(pattern)
+    except re.error:
+        return ''
+
+    if parsed.state.flags & (re.IGNORECASE | re.VERBOSE):
+        return ''
+
+    runs = []
+    current = []
+    _literal_runs(parsed, runs, current)
+    runs.append(''.join(current))
+
+    return max(runs, key=len)
+
+
+class PatternCallback:
+    """Monitoring callback that matches a regular expression at the beginning of every line.
+
+    The regular expression is compiled once, and the lines that do not contain its required literal are discarded
+    without running it. Instances are callables with the same interface as the rest of monitoring callbacks, and they
+    can be combined with other callbacks in a `MultiPatternMatcher`.
+
+    Args:
+        pattern (str): Regular expression to match.
+        on_match (callable, optional): Function that receives the match object and returns the callback result.
+            By default, the callback returns `True`.
+        default (any, optional): Value returned if the line does not match. Default `None`
+
+    Attributes:
+        pattern (str): Regular expression to match.
+        regex (re.Pattern): Compiled regular expression.
+        literal (str): Literal string that every matching line contains.
+    """
+    def __init__(self, pattern, on_match=None, default=None):
+        self.pattern = pattern
+        self.regex = re.compile(pattern)
+        self.literal = required_literal(pattern)
+        self.on_match = on_match
+        self.default = default
+
+    def match(self, line):
+        """Match the regular expression against a line.
+
+        Args:
+            line (str or bytes): Line to check.
+
+        Returns:
+            re.Match: Match object or `None` if the line does not match.
+        """
+        line = _decode(line)
+        if self.literal not in line:
+            return None
+        return self.regex.match(line)
+
+    def __call__(self, line):
+        match = self.match(line)
+        if match is None:
+            return self.default
+        return True if self.on_match is None else self.on_match(match)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.pattern!r})"
+
+
+def callback_pattern(pattern):
+    """Decorator to declare that a callback can only return a result for the lines that match a regular expression.
+
+    The decorated function receives the match object of the line instead of the line itself, so it does not have to
+    match the pattern again, and it is only called for the lines that match (the callback returns `None` for the rest).
+    The resulting callback takes the line as any other monitoring callback, and the pattern is exposed in its `pattern`
+    attribute so that `MultiPatternMatcher` can screen the lines for it.
+
+    Args:
+        pattern (str): Regular expression that every line accepted by the callback matches.
+
+    Returns:
+        callable: Decorator.
+    """
+    def decorator(function):
+        screen = PatternCallback(pattern)
+
+        @functools.wraps(function)
+        def wrapper(line):
+            match = screen.match(line)
+            if match is None:
+                return None
+            return function(match)
+
+        wrapper.pattern = pattern
+        return wrapper
+
+    return decorator
+
+
+class MultiPatternMatcher:
+    """Apply several monitoring callbacks to every line in a single pass.
+
+    Callbacks that expose a `pattern` attribute (see `PatternCallback` and `callback_pattern`) are screened first by
+    their required literals and then by one regular expression combining all their patterns, so a line that cannot
+    match any of them is discarded with a few substring searches and a single regex match. The rest of callbacks are
+    called for every line.
+
+    Args:
+        callbacks (list(callable)): Callbacks to apply.
+
+    Attributes:
+        callbacks (list(callable)): Callbacks to apply.
+    """
+    def __init__(self, callbacks):
+        self.callbacks = list(callbacks)
+        self._screened = []
+        self._unscreened = []
+        patterns = []
+
+        for index, callback in enumerate(self.callbacks):
+            pattern = getattr(callback, 'pattern', None)
+            if isinstance(pattern, str):
+                self._screened.append((index, required_literal(pattern)))
+                patterns.append(pattern)
+            else:
+                self._unscreened.append(index)
+
+        self._combined = self._combine(patterns)
+
+    @staticmethod
+    def _combine(patterns):
+        """Build one regular expression that matches if any of the patterns matches.
+
+        Returns:
+            re.Pattern: Combined regular expression or `None` if the patterns cannot be combined.
+        """
+        if not patterns:
+            return None
+        try:
+            if any(_has_group_references(sre_parse.parse(pattern)) for pattern in patterns):
+                return None
+            return re.compile('|'.join(f"(?:{pattern})" for pattern in patterns))
+        except re.error:
+            # Named groups repeated in several patterns or global flags
+            return None
+
+    def match(self, line):
+        """Get the indexes of the callbacks that may return a result for a line.
+
+        Args:
+            line (str or bytes): Line to check.
+
+        Returns:
+            list(int): Indexes of the candidate callbacks.
+        """
+        text = _decode(line)
+        candidates = [index for index, literal in self._screened if literal in text]
+        if candidates and self._combined is not None and self._combined.match(text) is None:
+            candidates = []
+
+        return candidates + self._unscreened if self._unscreened else candidates
+
+    def __call__(self, line):
+        """Apply every callback to a line.
+
+        Args:
+            line (str or bytes): Line to check.
+
+        Returns:
+            dict: Results of the callbacks that matched, by callback index. Empty if no callback matched.
+        """
+        results = {}
+        for index in self.match(line):
+            result = self.callbacks[index](line)
+            if result is not None and result:
+                results[index] = result
+
+        return results
@@ -4,21 +4,28 @@
 
 import csv
 import logging
-from abc import ABC, abstractmethod
+from abc import ABC
 from datetime import datetime
+from multiprocessing import Pool
 from os import makedirs
-from os.path import join, isfile
+from os.path import getsize, join
 from re import compile
+from shutil import copyfileobj, rmtree
 from sys import platform
-from tempfile import gettempdir
-from threading import Thread, Event
-from time import sleep
+from tempfile import gettempdir, mkdtemp
+from threading import Thread, Event, Lock
+from time import sleep, perf_counter, thread_time
 
 import psutil
 
+from wazuh_testing.tools.performance.storage import get_data_writer, FILE_EXTENSIONS
+
 logger = logging.getLogger('wazuh-monitor')
 logger.setLevel(logging.INFO)
 
+OVERHEAD_FILE_NAME = 'monitor_overhead'
+LOG_CHUNK_SIZE = 8 * 1024 * 1024
+
 
 class Monitor:
     """Class to monitor a binary process and extract data referring to the CPU usage, memory consumption, etc.
@@ -30,6 +37,7 @@ class Monitor:
         time_step (int, optional): time between each scan in seconds. Defaults to 1 second.
         version (str, optional): version of the binary. Defaults to None.
         dst_dir (str, optional): directory to store the CSVs. Defaults to temp directory.
+        output_format (str, optional): format of the data file, `csv` or `parquet`. Defaults to csv.
 
     Attributes:
         process_name (str): name of the process to monitor.
@@ -37,12 +45,14 @@ class Monitor:
         time_step (int): time between each scan in seconds. Defaults to 1 second.
         version (str): version of the binary. Defaults to None.
         dst_dir (str): directory to store the CSVs. Defaults to temp directory.
+        output_format (str): format of the data file. Defaults to csv.
         pid (int): PID of the process.
         event (thread.Event): thread Event used to control the scans.
         thread (thread): thread to scan the data.
-        csv_file (str): path to the CSV file.
+        csv_file (str): path to the data file.
     """
-    def __init__(self, process_name, pid, value_unit='KB', time_step=1, version=None, dst_dir=gettempdir()):
+    def __init__(self, process_name, pid, value_unit='KB', time_step=1, version=None, dst_dir=gettempdir(),
+                 output_format='csv'):
         self.process_name = process_name
         self.value_unit = value_unit
         self.time_step = time_step
@@ -57,7 +67,9 @@ class Monitor:
         self.previous_read = None
         self.previous_write = None
         self.set_process()
-        self.csv_file = join(self.dst_dir, f'{self.process_name}.csv')
+        self.output_format = output_format
+        self.csv_file = join(self.dst_dir, f'{self.process_name}{FILE_EXTENSIONS[output_format]}')
+        self._writer = None
 
     @classmethod
     def get_process_pids(cls, process_name, check_children=True) -> list:
@@ -181,18 +193,18 @@ class Monitor:
             return info
 
     def _write_csv(self, data):
-        """Write the collected data in a CSV file.
+        """Write the collected data in the data file, opening it the first time.
 
         Args:
             data (dict): dictionary containing the data collected from the process.
         """
-        header = not isfile(self.csv_file)
-        with open(self.csv_file, 'a', newline='') as f:
-            csv_writer = csv.writer(f)
-            if header:
-                csv_writer.writerow(list(data))
+        if not data:
+            return
+        if self._writer is None:
+            self._writer = get_data_writer(join(self.dst_dir, self.process_name), list(data), self.output_format)
 
-            csv_writer.writerow(list(data.values()))
+        self._writer.write_rows([list(data.values())])
+        self._writer.flush()
         logger.debug(f'Added new entry in {self.csv_file}')
 
     def _monitor_process(self):
@@ -208,6 +220,10 @@ class Monitor:
                 self._write_csv(data)
             sleep(self.time_step)
 
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
     def run(self):
         """Run the event and thread monitoring functions."""
         self.event = Event()
@@ -225,35 +241,524 @@ class Monitor:
         self.thread.join()
 
 
+class MultiProcessMonitor:
+    """Class to monitor several processes from a single sampler thread.
+
+    Every tick reads all the target processes in one pass and writes one row per process with the same columns as
+    `Monitor`. The expensive metrics (USS, PSS and SWAP, which require walking `/proc/<pid>/smaps`) are only read every
+    `full_memory_every` ticks; the rows between them repeat the last values read. The data files are kept open and the
+    rows are written in batches every `flush_every` ticks.
+
+    The sampler measures its own overhead on every tick and writes it in `monitor_overhead`: the wall time spent
+    sampling and writing, the CPU time of the sampler thread and the delay of the tick from its schedule.
+
+    Args:
+        value_unit (str, optional): unit to store the bytes values. Defaults to KB.
+        time_step (float, optional): time between each scan in seconds. Defaults to 1 second.
+        version (str, optional): version of the binaries. Defaults to None.
+        dst_dir (str, optional): directory to store the CSVs. Defaults to temp directory.
+        full_memory_every (int, optional): number of ticks between each read of the expensive metrics. Defaults to 1.
+        flush_every (int, optional): number of ticks between each write of the buffered rows. Defaults to 10.
+        output_format (str, optional): format of the data files, `csv` or `parquet`. Defaults to csv.
+
+    Attributes:
+        value_unit (str): unit to store the bytes values.
+        time_step (float): time between each scan in seconds.
+        version (str): version of the binaries.
+        dst_dir (str): directory to store the CSVs.
+        full_memory_every (int): number of ticks between each read of the expensive metrics.
+        flush_every (int): number of ticks between each write of the buffered rows.
+        output_format (str): format of the data files.
+        targets (dict): state of every monitored process, by process name.
+        lost_processes (set): names of the processes that are no longer running.
+        event (thread.Event): thread Event used to stop the scans.
+        thread (thread): thread to scan the data.
+    """
+    def __init__(self, value_unit='KB', time_step=1, version=None, dst_dir=gettempdir(), full_memory_every=1,
+                 flush_every=10, output_format='csv'):
+        self.value_unit = value_unit
+        self.time_step = time_step
+        self.version = version
+        self.dst_dir = dst_dir
+        self.full_memory_every = max(1, full_memory_every)
+        self.flush_every = max(1, flush_every)
+        self.output_format = output_format
+        self.divisor = 1024 ** {'B': 0, 'KB': 1, 'MB': 2}[value_unit]
+        self.targets = {}
+        self.lost_processes = set()
+        self.event = None
+        self.thread = None
+        self.ticks = 0
+        self.overhead = {'ticks': 0, 'sample_time': 0.0, 'max_sample_time': 0.0, 'write_time': 0.0, 'cpu_time': 0.0,
+                         'max_lag': 0.0}
+        self._writers = {}
+        self._buffers = {}
+        self._lock = Lock()
+        makedirs(self.dst_dir, exist_ok=True)
+
+    def add_process(self, process_name, pid):
+        """Add a process to the monitored ones, replacing the process with the same name if any.
+
+        Args:
+            process_name (str): name of the process, used as name of its CSV file.
+            pid (int): PID of the process.
+
+        Raises:
+            ValueError: if the process is not running.
+        """
+        try:
+            proc = psutil.Process(pid)
+            # The first call always returns 0.0
+            proc.cpu_percent(interval=None)
+        except psutil.NoSuchProcess:
+            raise ValueError(f'The process {process_name} is not running.')
+
+        with self._lock:
+            self.targets[process_name] = {'pid': pid, 'proc': proc, 'previous_io': None, 'memory': (0, 0, 0)}
+            self.lost_processes.discard(process_name)
+        logger.info(f'Started monitoring process {process_name} ({pid})')
+
+    def remove_process(self, process_name):
+        """Stop monitoring a process.
+
+        Args:
+            process_name (str): name of the process.
+        """
+        with self._lock:
+            self.targets.pop(process_name, None)
+            self.lost_processes.discard(process_name)
+
+    def _sample(self, process_name, target, timestamp, full_memory):
+        """Collect the data of a process, with the same columns as `Monitor.get_process_info`.
+
+        Args:
+            process_name (str): name of the process.
+            target (dict): state of the process.
+            timestamp (str): timestamp of the scan.
+            full_memory (bool): read the USS, PSS and SWAP of the process.
+
+        Returns:
+            list: values of the row.
+
+        Raises:
+            psutil.NoSuchProcess: if the process is not running.
+        """
+        proc = target['proc']
+        with proc.oneshot():
+            cpu = proc.cpu_percent(interval=None)
+            if full_memory:
+                memory_data = proc.memory_full_info()
+                target['memory'] = (memory_data.uss, memory_data.pss, memory_data.swap)
+            else:
+                memory_data = proc.memory_info()
+            fds = proc.num_fds()
+            io_counters = proc.io_counters() if platform == 'linux' or platform == 'win32' else None
+
+        uss, pss, swap = target['memory']
+        row = [process_name, self.version, timestamp, target['pid'], cpu, memory_data.vms / self.divisor,
+               memory_data.rss / self.divisor, uss / self.divisor, pss / self.divisor, swap / self.divisor, fds]
+
+        if io_counters is None:
+            row.extend([0.0] * 6)
+        else:
+            read, written = io_counters.read_bytes / self.divisor, io_counters.write_bytes / self.divisor
+            previous_io = target['previous_io']
+            read_speed, write_speed = (0.0, 0.0) if previous_io is None else \
+                ((read - previous_io[0]) / self.time_step, (written - previous_io[1]) / self.time_step)
+            target['previous_io'] = (read, written)
+            row.extend([io_counters.read_count, io_counters.write_count, read, written, read_speed, write_speed])
+
+        return [round(value, 2) if isinstance(value, float) else value for value in row]
+
+    def get_header(self):
+        """Get the columns of the CSV files of the processes.
+
+        Returns:
+            list(str): column names.
+        """
+        unit = self.value_unit
+        return ['Daemon', 'Version', 'Timestamp', 'PID', 'CPU(%)', f'VMS({unit})', f'RSS({unit})', f'USS({unit})',
+                f'PSS({unit})', f'SWAP({unit})', 'FD', 'Read_Ops', 'Write_Ops', f'Disk_Read({unit})',
+                f'Disk_Written({unit})', f'Disk_Read_Speed({unit}/s)', f'Disk_Write_Speed({unit}/s)']
+
+    def _get_writer(self, name, header):
+        """Get the writer of a data file of the destination directory, opening it the first time.
+
+        Args:
+            name (str): name of the file, without extension.
+            header (list(str)): columns of the file.
+
+        Returns:
+            CSVDataWriter or ParquetDataWriter: writer of the file.
+        """
+        if name not in self._writers:
+            self._writers[name] = get_data_writer(join(self.dst_dir, name), header, self.output_format)
+
+        return self._writers[name]
+
+    def flush(self):
+        """Write the buffered rows in their data files.
+
+        The rows of a file that can't be written are dropped, logging an error, so they don't pile up in memory and
+        the rest of files are still written.
+        """
+        for name, rows in self._buffers.items():
+            if rows:
+                try:
+                    writer = self._get_writer(name, self.get_overhead_header() if name == OVERHEAD_FILE_NAME
+                                              else self.get_header())
+                    writer.write_rows(rows)
+                    writer.flush()
+                except Exception as e:
+                    logger.error(f'Could not write {len(rows)} rows of {name} | {e}')
+                rows.clear()
+        logger.debug(f'Flushed monitoring data in {self.dst_dir}')
+
+    def close(self):
+        """Close the data files."""
+        for name, writer in self._writers.items():
+            try:
+                writer.close()
+            except Exception as e:
+                logger.error(f'Could not close the data file of {name} | {e}')
+        self._writers.clear()
+
+    @staticmethod
+    def get_overhead_header():
+        """Get the columns of the overhead CSV file.
+
+        Returns:
+            list(str): column names.
+        """
+        return ['Timestamp', 'Processes', 'Sample_Time(ms)', 'Write_Time(ms)', 'CPU_Time(ms)', 'Lag(ms)']
+
+    def tick(self, lag=0.0):
+        """Sample all the monitored processes once.
+
+        Args:
+            lag (float): delay of the tick from its schedule, in seconds.
+        """
+        start, start_cpu = perf_counter(), thread_time()
+        timestamp = datetime.now().strftime('%Y/%m/%d %H:%M:%S')
+        full_memory = self.ticks % self.full_memory_every == 0
+        self.ticks += 1
+
+        with self._lock:
+            targets = list(self.targets.items())
+
+        for process_name, target in targets:
+            try:
+                row = self._sample(process_name, target, timestamp, full_memory)
+            except (psutil.NoSuchProcess, psutil.ZombieProcess):
+                logger.warning(f'Lost PID for {process_name}')
+                # Keep the row of zeros used by Monitor to easily identify the problem
+                row = [process_name, self.version, timestamp, target['pid']] + [0.0] * 13
+                with self._lock:
+                    if self.targets.get(process_name) is target:
+                        del self.targets[process_name]
+                        self.lost_processes.add(process_name)
+            self._buffers.setdefault(process_name, []).append(row)
+
+        sample_time = perf_counter() - start
+        write_start = perf_counter()
+        if self.ticks % self.flush_every == 0:
+            self.flush()
+        write_time = perf_counter() - write_start
+        cpu_time = thread_time() - start_cpu
+
+        self.overhead['ticks'] += 1
+        self.overhead['sample_time'] += sample_time
+        self.overhead['max_sample_time'] = max(self.overhead['max_sample_time'], sample_time)
+        self.overhead['write_time'] += write_time
+        self.overhead['cpu_time'] += cpu_time
+        self.overhead['max_lag'] = max(self.overhead['max_lag'], lag)
+        self._buffers.setdefault(OVERHEAD_FILE_NAME, []).append(
+            [timestamp, len(targets), round(sample_time * 1000, 3), round(write_time * 1000, 3),
+             round(cpu_time * 1000, 3), round(lag * 1000, 3)])
+
+    def get_overhead(self):
+        """Get a summary of the overhead of the sampler.
+
+        Returns:
+            dict: number of ticks, mean and maximum time per tick in milliseconds, and CPU usage of the sampler in
+                percentage of the sampling period.
+        """
+        ticks = self.overhead['ticks'] or 1
+        return {'ticks': self.overhead['ticks'],
+                'mean_sample_time(ms)': round(self.overhead['sample_time'] / ticks * 1000, 3),
+                'max_sample_time(ms)': round(self.overhead['max_sample_time'] * 1000, 3),
+                'mean_write_time(ms)': round(self.overhead['write_time'] / ticks * 1000, 3),
+                'cpu(%)': round(self.overhead['cpu_time'] / (ticks * self.time_step) * 100, 3),
+                'max_lag(ms)': round(self.overhead['max_lag'] * 1000, 3)}
+
+    def _monitor_processes(self):
+        """Private function that samples the processes at fixed intervals until the monitor is stopped."""
+        next_tick = perf_counter()
+        while not self.event.is_set():
+            lag = perf_counter() - next_tick
+            try:
+                self.tick(lag)
+            except Exception as e:
+                logger.error(f'Exception sampling the processes | {e}')
+
+            next_tick += self.time_step
+            now = perf_counter()
+            if next_tick < now:
+                # Skip the ticks that could not be run in time instead of running them in a burst
+                next_tick += (now - next_tick) // self.time_step * self.time_step + self.time_step
+            self.event.wait(next_tick - now)
+
+        try:
+            self.flush()
+        finally:
+            self.close()
+
+    def start(self):
+        """Start the sampler thread."""
+        self.event = Event()
+        self.thread = Thread(target=self._monitor_processes)
+        self.thread.start()
+        logger.info(f'Started monitoring {len(self.targets)} processes every {self.time_step}s')
+
+    def shutdown(self):
+        """Stop the sampler thread, writing the pending rows."""
+        self.event.set()
+        self.thread.join()
+        logger.info(f'Monitoring overhead: {self.get_overhead()}')
+
+
+def get_csv_name(key):
+    """Get the name of the CSV file of the rows of a log parser with the given key (activity or endpoint).
+
+    Args:
+        key (str): key of the rows.
+
+    Returns:
+        str: file name without extension.
+    """
+    return key.replace(' ', '_').replace('/', '_').lower()
+
+
+def get_log_byte_ranges(log_file, parts):
+    """Split a file in byte ranges of similar size whose limits are at the start of a line.
+
+    Args:
+        log_file (str): file path.
+        parts (int): maximum number of ranges.
+
+    Returns:
+        list(tuple): `(start, end)` offsets of every range, covering the whole file.
+    """
+    size = getsize(log_file)
+    limits = [0]
+    with open(log_file, 'rb') as log:
+        for part in range(1, parts):
+            offset = max(size * part // parts, limits[-1])
+            log.seek(offset)
+            # Move the limit after the end of the current line
+            log.readline()
+            offset = min(log.tell(), size)
+            if offset > limits[-1]:
+                limits.append(offset)
+    if limits[-1] < size:
+        limits.append(size)
+
+    return list(zip(limits[:-1], limits[1:]))
+
+
+def iter_log_chunks(log_file, start=0, end=None, chunk_size=LOG_CHUNK_SIZE):
+    """Read a byte range of a file in chunks that end at a line boundary, without loading it in memory.
+
+    Args:
+        log_file (str): file path.
+        start (int): offset where the range starts.
+        end (int): offset where the range ends. Defaults to the end of the file.
+        chunk_size (int): approximate size of the chunks read.
+
+    Yields:
+        bytes: content of every chunk, made of complete lines.
+    """
+    with open(log_file, 'rb') as log:
+        log.seek(start)
+        remaining = (getsize(log_file) if end is None else end) - start
+        pending = b''
+        while remaining > 0:
+            chunk = log.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            chunk = pending + chunk
+            # Keep the last incomplete line for the next chunk
+            line_end = chunk.rfind(b'\n') + 1 if remaining > 0 else len(chunk)
+            pending = chunk[line_end:]
+            if line_end:
+                yield chunk[:line_end]
+        if pending:
+            yield pending
+
+
+def iter_log_matches(log_file, regex, start=0, end=None, chunk_size=LOG_CHUNK_SIZE):
+    """Iterate the matches of a regular expression in a byte range of a file, without loading it in memory.
+
+    The range is read in chunks that end at a line boundary, so the memory used does not depend on the file size.
+
+    Args:
+        log_file (str): file path.
+        regex (str): regular expression. The matches can't span several lines.
+        start (int): offset where the range starts.
+        end (int): offset where the range ends. Defaults to the end of the file.
+        chunk_size (int): approximate size of the chunks read.
+
+    Yields:
+        tuple(str): groups of every match.
+    """
+    pattern = compile(regex.encode())
+    for chunk in iter_log_chunks(log_file, start, end, chunk_size):
+        for match in pattern.finditer(chunk):
+            yield tuple(group.decode(errors='replace') if group is not None else None for group in match.groups())
+
+
+class LogCSVWriter:
+    """Write the rows of a log parser in one CSV file per key, opening every file the first time it is used.
+
+    Args:
+        dst_dir (str): directory to store the CSVs.
+        columns (list, str): csv headers.
+
+    Attributes:
+        dst_dir (str): directory to store the CSVs.
+        columns (list, str): csv headers.
+        keys (list): keys of the rows written, in order of appearance.
+    """
+    def __init__(self, dst_dir, columns):
+        self.dst_dir = dst_dir
+        self.columns = columns
+        self.keys = []
+        self._files = {}
+
+    def write_row(self, key, row):
+        """Write a row in the CSV of its key.
+
+        Args:
+            key (str): key of the row.
+            row (tuple): values of the row.
+        """
+        if key not in self._files:
+            f = open(join(self.dst_dir, f"{get_csv_name(key)}.csv"), 'w', newline='')
+            writer = csv.writer(f)
+            writer.writerow(self.columns)
+            self._files[key] = (f, writer)
+            self.keys.append(key)
+        self._files[key][1].writerow(row)
+
+    def close(self):
+        """Close all the files."""
+        for f, _ in self._files.values():
+            f.close()
+        self._files.clear()
+
+
+def _parse_log_range(arguments):
+    """Parse a byte range of a log file, writing the rows of every key in a CSV file of a part directory.
+
+    Args:
+        arguments (tuple): log file, regex, columns, index of the group used as key, start and end of the range, and
+            part directory.
+
+    Returns:
+        list: keys found in the range, in order of appearance.
+    """
+    log_file, regex, columns, key_group, start, end, part_dir = arguments
+    makedirs(part_dir, exist_ok=True)
+    writer = LogCSVWriter(part_dir, columns)
+    try:
+        for groups in iter_log_matches(log_file, regex, start, end):
+            writer.write_row(groups[key_group - 1], groups)
+    finally:
+        writer.close()
+
+    return writer.keys
+
+
 class LogParser(ABC):
     """Class to parse a log file and extract specified data based on a regular expression.
 
+    The log is scanned without loading it in memory and the rows are written as they are found, in one CSV per key
+    (the activity of the cluster log or the endpoint of the API log). With several `workers`, the log is split in byte
+    ranges aligned on line boundaries that are parsed in a pool of processes, and their rows are merged in order.
+
     Args:
         log_file (str): log file path.
         regex (regex): regular expression to be applied to the log file content.
         columns (list, str): csv headers.
         dst_dir (str, optional): directory to store the CSVs. Defaults to temp directory.
+        key_group (int, optional): number of the regex group used to split the rows in CSVs. Defaults to 1.
+        workers (int, optional): number of processes used to parse the log. Defaults to 1.
 
     Attributes:
         log_file (str): log file path.
         regex (regex): regular expression to be applied to the log file content.
         columns (list, str): csv headers.
         dst_dir (str): directory to store the CSVs. Defaults to temp directory.
-        data (dict): processed log file.
+        key_group (int): number of the regex group used to split the rows in CSVs.
+        workers (int): number of processes used to parse the log.
+        data (dict): processed log file, only set by `_log_parser`.
     """
+    RANGES_PER_WORKER = 4
 
-    def __init__(self, log_file, regex, columns, dst_dir=gettempdir()):
+    def __init__(self, log_file, regex, columns, dst_dir=gettempdir(), key_group=1, workers=1):
         self.log_file = log_file
         self.dst_dir = dst_dir
         self.regex = compile(regex)
         self.columns = columns
+        self.key_group = key_group
+        self.workers = workers
         self.data = None
         super().__init__()
 
-    @abstractmethod
     def _log_parser(self):
-        """Function to be overloaded by specifying in each child function the necessary logic to parse the log file."""
-        pass
+        """Parse the whole log file, keeping the rows of every key in memory.
+
+        Returns:
+            dict: list of rows of every key.
+        """
+        performance_information = dict()
+        for groups in iter_log_matches(self.log_file, self.regex.pattern):
+            performance_information.setdefault(groups[self.key_group - 1], []).append(groups)
+
+        return performance_information
+
+    def _write_csv_parallel(self):
+        """Parse the byte ranges of the log in a process pool and merge their CSVs in order.
+
+        Returns:
+            int: number of keys found.
+        """
+        ranges = get_log_byte_ranges(self.log_file, self.workers * self.RANGES_PER_WORKER)
+        parts_dir = mkdtemp(prefix='log_parser_', dir=self.dst_dir)
+        tasks = [(self.log_file, self.regex.pattern, self.columns, self.key_group, start, end,
+                  join(parts_dir, str(index))) for index, (start, end) in enumerate(ranges)]
+        files = {}
+
+        try:
+            with Pool(self.workers) as pool:
+                for (*_, part_dir), keys in zip(tasks, pool.imap(_parse_log_range, tasks)):
+                    for key in keys:
+                        csv_name = f"{get_csv_name(key)}.csv"
+                        with open(join(part_dir, csv_name), 'rb') as part:
+                            if key not in files:
+                                files[key] = open(join(self.dst_dir, csv_name), 'wb')
+                            else:
+                                # Skip the header of the part
+                                part.readline()
+                            copyfileobj(part, files[key])
+                    rmtree(part_dir, ignore_errors=True)
+        finally:
+            for f in files.values():
+                f.close()
+            rmtree(parts_dir, ignore_errors=True)
+
+        return len(files)
 
     def write_csv(self):
         """Function in charge of saving the CSV files according to their label."""
@@ -262,12 +767,21 @@ class LogParser(ABC):
         except OSError:
             pass
 
-        for key, value in self.data.items():
-            file_name = key.replace(' ', '_').replace('/', '_').lower()
-            with open(join(self.dst_dir, f"{file_name}.csv"), 'w', newline='') as f:
-                writer = csv.writer(f)
-                writer.writerow(self.columns)
-                writer.writerows(value)
+        if self.data is not None:
+            for key, value in self.data.items():
+                with open(join(self.dst_dir, f"{get_csv_name(key)}.csv"), 'w', newline='') as f:
+                    writer = csv.writer(f)
+                    writer.writerow(self.columns)
+                    writer.writerows(value)
+        elif self.workers > 1 and getsize(self.log_file) > 0:
+            self._write_csv_parallel()
+        else:
+            writer = LogCSVWriter(self.dst_dir, self.columns)
+            try:
+                for groups in iter_log_matches(self.log_file, self.regex.pattern):
+                    writer.write_row(groups[self.key_group - 1], groups)
+            finally:
+                writer.close()
 
 
 class ClusterLogParser(LogParser):
@@ -276,35 +790,19 @@ class ClusterLogParser(LogParser):
     Args:
         log_file (str): log file path.
         dst_dir (str, optional): directory to store the CSVs. Defaults to temp directory.
+        workers (int, optional): number of processes used to parse the log. Defaults to 1.
 
     Attributes:
         log_file (str): log file path.
         dst_dir (str): directory to store the CSVs. Defaults to temp directory.
         data (dict): processed log file.
     """
-    def __init__(self, log_file, dst_dir=gettempdir()):
+    def __init__(self, log_file, dst_dir=gettempdir(), workers=1):
         # group1 Timestamp - group2 node_name - group3 activity - group4 time_spent(s)
         regex = r'(\d{4}/\d{2}/\d{2} \d{2}:\d{2}:\d{2}) .* ' \
                 r'\[Worker .*_(manager_\d+)] \[(.*)] Finished in (\d+.\d+)s.*'
         columns = ['Timestamp', 'node_name', 'activity', 'time_spent(s)']
-        super().__init__(log_file, regex, columns, dst_dir)
-
-    def _log_parser(self):
-        """Function in charge of parsing the information of the cluster.log file."""
-        performance_information = dict()
-        with open(self.log_file) as log:
-            for match in self.regex.finditer(log.read()):
-                try:
-                    performance_information[match.group(3)].append(match.groups())
-                except KeyError:
-                    performance_information[match.group(3)] = list()
-                    performance_information[match.group(3)].append(match.groups())
-
-        return performance_information
-
-    def write_csv(self):
-        self.data = self._log_parser()
-        super().write_csv()
+        super().__init__(log_file, regex, columns, dst_dir, key_group=3, workers=workers)
 
 
 class APILogParser(LogParser):
@@ -313,31 +811,15 @@ class APILogParser(LogParser):
     Args:
         log_file (str): log file path.
         dst_dir (str, optional): directory to store the CSVs. Defaults to temp directory.
+        workers (int, optional): number of processes used to parse the log. Defaults to 1.
 
     Attributes:
         log_file (str): log file path.
         dst_dir (str): directory to store the CSVs. Defaults to temp directory.
         data (dict): processed log file.
     """
-    def __init__(self, log_file, dst_dir=gettempdir()):
+    def __init__(self, log_file, dst_dir=gettempdir(), workers=1):
         # group1 Timestamp - group2 query - group3 time_spent(s)
         regex = r'(\d{4}/\d{2}/\d{2} \d{2}:\d{2}:\d{2}) .* \"(GET .+)\" with parameters .* done in (\d+\.\d+)s: .*'
         columns = ['Timestamp', 'endpoint', 'time_spent(s)']
-        super().__init__(log_file, regex, columns, dst_dir)
-
-    def _log_parser(self):
-        """Function in charge of parsing the information of the cluster.log file."""
-        performance_information = dict()
-        with open(self.log_file) as log:
-            for match in self.regex.finditer(log.read()):
-                try:
-                    performance_information[match.group(2)].append(match.groups())
-                except KeyError:
-                    performance_information[match.group(2)] = list()
-                    performance_information[match.group(2)].append(match.groups())
-
-        return performance_information
-
-    def write_csv(self):
-        self.data = self._log_parser()
-        super().write_csv()
+        super().__init__(log_file, regex, columns, dst_dir, key_group=2, workers=workers)
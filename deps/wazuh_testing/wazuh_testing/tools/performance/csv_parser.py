@@ -2,15 +2,35 @@
 # Created by Wazuh, Inc. <info@wazuh.com>.
 # This program is free software; you can redistribute it and/or modify it under the terms of GPLv2
 
+import logging
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from glob import glob
-from os.path import join
+from hashlib import sha1
+from os import close, cpu_count, getuid, listdir, lstat, makedirs, remove, replace, stat, utime
+from os.path import isfile, join, realpath
 from pathlib import Path
 from re import compile
+from tempfile import gettempdir, mkstemp
+from time import perf_counter, time
 
 import numpy as np
 import pandas as pd
 
+from wazuh_testing.tools.file import create_private_directory
+from wazuh_testing.tools.performance.storage import get_data_file_parts, read_data_file
+
+try:
+    import pyarrow
+    CSV_ENGINE = 'pyarrow'
+except ImportError:
+    pyarrow = None
+    CSV_ENGINE = 'c'
+
+logger = logging.getLogger('wazuh-csv-parser')
+CACHE_PATH = join(gettempdir(), f'wazuh_csv_parser_cache_{getuid()}')
+CACHE_MAX_AGE = 7 * 24 * 3600
+
 aggregation_function = {
     "Daemon": "first",
     "Version": "first",
@@ -34,39 +54,219 @@ aggregation_function = {
 class ClusterCSVParser:
     """Class to load and parse CSVs with data produced by the Wazuh cluster.
 
+    The files are found when the parser is created, but they are only loaded the first time their data is used. Only
+    the selected nodes and columns are loaded, several files at once and with the pyarrow CSV engine if available.
+    If a cache directory is given, like `CACHE_PATH`, every parsed file is cached there as Parquet, so it is not parsed
+    again while it does not change. The directory must belong to the user and not be writable by others, and the
+    entries not used in `CACHE_MAX_AGE` seconds are removed.
+
     Args:
         artifacts_path (str): directory where the cluster CSVs can be found.
         files_to_load (list): CSV filenames (without extension) that should be loaded.
+        columns (list): columns to load from the files. None to load all of them.
+        nodes (str): regular expression of the names of the nodes to load. None to load all of them.
+        workers (int): number of files loaded at the same time. Defaults to the number of CPUs.
+        cache_path (str): directory of the cache of parsed files, created if it does not exist. None to disable the
+            cache, which is the default.
 
     Attributes:
         artifacts_path (str): directory where the cluster CSVs can be found.
         files_to_load (list): CSV filenames (without extension) that should be loaded.
-        dataframes (dict): dictionary with dataframes obtained from the loaded CSV files.
+        load_columns (list): columns to load from the files.
+        workers (int): number of files loaded at the same time.
+        cache_path (str): directory of the cache of parsed files, None if the cache is disabled.
+        files (dict): paths of the files to load: files[type of data][node name][file name].
+        load_time (float): seconds spent loading files.
     """
 
     SETUP_PHASE = 'setup_phase'
     STABLE_PHASE = 'stable_phase'
 
-    def __init__(self, artifacts_path, files_to_load):
+    def __init__(self, artifacts_path, files_to_load, columns=None, nodes=None, workers=None, cache_path=None):
         self.artifacts_path = artifacts_path
         self.files_to_load = files_to_load
-        self.dataframes = defaultdict(lambda: defaultdict(lambda: defaultdict(None)))
+        self.load_columns = columns
+        self.workers = workers if workers else cpu_count()
+        self.cache_path = self._prepare_cache(cache_path) if cache_path else None
+        self.load_time = 0.0
+        self.files = self._find_files(nodes)
+        self._dataframes = defaultdict(lambda: defaultdict(lambda: defaultdict(None)))
+
+    @property
+    def dataframes(self):
+        """dict: dataframes of all the files: self.dataframes[type of data][node name][file name]."""
+        for data_type in list(self.files):
+            self.get_dataframes(data_type)
+
+        return self._dataframes
+
+    def _find_files(self, nodes=None):
+        """Recursively find the CSV and Parquet files inside 'data' folders.
+
+        When a file is found, it is only included if listed in self.files_to_load and its node matches `nodes`.
+
+        Args:
+            nodes (str): regular expression of the names of the nodes. None to include all of them.
+
+        Returns:
+            dict: paths of the files: files[type of data][node name][file name].
+        """
+        node_file_regex = compile(r'.*/(master|worker_[\d]+)/.*/(.*)/(.*)\.(csv|parquet)$')
+        nodes_regex = compile(nodes) if nodes else None
+        files = defaultdict(lambda: defaultdict(dict))
+
+        for data_file in glob(join(self.artifacts_path, '*', '*', '*', '*.*')):
+            names = node_file_regex.search(data_file)
+            if names and names.group(3) in self.files_to_load and \
+                    (nodes_regex is None or nodes_regex.fullmatch(names.group(1))):
+                files[names.group(2)][names.group(1)][names.group(3)] = data_file
+
+        return files
+
+    @staticmethod
+    def _prepare_cache(cache_path):
+        """Create the cache directory if needed, check it can be trusted and remove its old entries.
+
+        Args:
+            cache_path (str): directory of the cache.
+
+        Returns:
+            str: directory of the cache, None if it can't be used.
+        """
+        if pyarrow is None:
+            logger.warning('The cache of parsed files requires the pyarrow package. Disabling it')
+            return None
+
+        try:
+            create_private_directory(cache_path)
+        except (OSError, ValueError) as error:
+            logger.warning(f"Could not use the cache directory {cache_path}: {error}. Disabling the cache")
+            return None
+
+        oldest_time = time() - CACHE_MAX_AGE
+        for name in listdir(cache_path):
+            try:
+                if lstat(join(cache_path, name)).st_mtime < oldest_time:
+                    remove(join(cache_path, name))
+            except OSError as error:
+                logger.warning(f"Could not remove the old cache file {name}: {error}")
+
+        return cache_path
+
+    def _get_cache_file(self, data_file):
+        """Get the cache file of a data file, which depends on the path, modification time and size of its parts and
+        on the loaded columns.
+
+        Args:
+            data_file (str): path of the data file.
+
+        Returns:
+            str: path of the cache file, None if the cache is disabled.
+        """
+        if not self.cache_path:
+            return None
 
-        self._load_dataframes()
+        parts = [(realpath(part), stat(part)) for part in get_data_file_parts(data_file)]
+        key = '|'.join(f"{path}|{part_stat.st_mtime_ns}|{part_stat.st_size}" for path, part_stat in parts)
+        key = f"{key}|{self.load_columns}"
 
-    def _load_dataframes(self):
-        """Recursively iterate CSV files inside 'data' folders and store data as pandas dataframes.
+        return join(self.cache_path, f"{sha1(key.encode()).hexdigest()}.parquet")
 
-        Files will be loaded as pandas dataframes and stored inside a dictionary that
-        looks like this: self.dataframes[type of data][node name][file name].
-        When a file is found, it is only parsed if listed in self.files_to_load.
+    def _read_file(self, data_file):
+        """Load a data file, from the cache if it did not change since it was parsed.
+
+        Args:
+            data_file (str): path of the data file.
+
+        Returns:
+            dataframe: data of the file.
         """
-        node_file_regex = compile(r'.*/(master|worker_[\d]+)/.*/(.*)/(.*).csv')
+        cache_file = self._get_cache_file(data_file)
+        if cache_file and isfile(cache_file):
+            try:
+                dataframe = pd.read_parquet(cache_file)
+                # Keep the entries in use from being removed as old
+                utime(cache_file)
+                return dataframe
+            except Exception as error:
+                logger.warning(f"Could not read the cache of {data_file}: {error}")
+
+        try:
+            dataframe = read_data_file(data_file, columns=self.load_columns, engine=CSV_ENGINE)
+        except ValueError:
+            # pandas versions without the pyarrow engine
+            dataframe = read_data_file(data_file, columns=self.load_columns)
+
+        if cache_file:
+            temporary_file = None
+            try:
+                makedirs(self.cache_path, mode=0o700, exist_ok=True)
+                # Write the cache atomically, so a parser running at the same time never reads half a file
+                file_descriptor, temporary_file = mkstemp(dir=self.cache_path, suffix='.tmp')
+                close(file_descriptor)
+                dataframe.to_parquet(temporary_file)
+                replace(temporary_file, cache_file)
+            except (OSError, TypeError, ValueError) as error:
+                logger.warning(f"Could not cache {data_file}: {error}")
+                if temporary_file and isfile(temporary_file):
+                    remove(temporary_file)
+
+        return dataframe
+
+    def _load_dataframes(self, keys):
+        """Load the files that are not loaded yet, several at the same time.
 
-        for csv in glob(join(self.artifacts_path, '*', '*', '*', '*.csv')):
-            names = node_file_regex.search(csv)
-            if names.group(3) in self.files_to_load:
-                self.dataframes[names.group(2)][names.group(1)].update({names.group(3): pd.read_csv(csv)})
+        Args:
+            keys (list): (type of data, node name, file name) of every file.
+        """
+        pending = [(data_type, node, file_name) for data_type, node, file_name in keys
+                   if file_name not in self._dataframes[data_type][node]]
+        if not pending:
+            return
+
+        tic = perf_counter()
+        data_files = [self.files[data_type][node][file_name] for data_type, node, file_name in pending]
+        workers = min(self.workers, len(data_files))
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                dataframes = list(pool.map(self._read_file, data_files))
+        else:
+            dataframes = [self._read_file(data_file) for data_file in data_files]
+
+        for (data_type, node, file_name), dataframe in zip(pending, dataframes):
+            self._dataframes[data_type][node][file_name] = dataframe
+        elapsed = perf_counter() - tic
+        self.load_time += elapsed
+        logger.debug(f"Loaded {len(data_files)} files in {elapsed:.2f}s")
+
+    def get_dataframes(self, data_type):
+        """Get the dataframes of a type of data, loading them if they were not loaded.
+
+        Args:
+            data_type (str): type of data, the name of the folder of the files (`logs`, `binaries`...).
+
+        Returns:
+            dict: dataframes of the type of data: dataframes[node name][file name].
+        """
+        self._load_dataframes([(data_type, node, file_name) for node, files in self.files[data_type].items()
+                               for file_name in files])
+
+        return self._dataframes[data_type]
+
+    def get_dataframe(self, data_type, node, file_name):
+        """Get the dataframe of a file, loading it if it was not loaded.
+
+        Args:
+            data_type (str): type of data, the name of the folder of the file (`logs`, `binaries`...).
+            node (str): name of the node.
+            file_name (str): name of the file, without extension.
+
+        Returns:
+            dataframe: data of the file.
+        """
+        self._load_dataframes([(data_type, node, file_name)])
+
+        return self._dataframes[data_type][node][file_name]
 
     def get_setup_phase(self, node_name):
         """Determine when the setup phase begins and ends.
@@ -77,7 +277,7 @@ class ClusterCSVParser:
         Returns:
             tuple: start date, end date.
         """
-        sync_df = self.dataframes['logs'][node_name]['integrity_sync']['Timestamp']
+        sync_df = self.get_dataframe('logs', node_name, 'integrity_sync')['Timestamp']
         return sync_df[0], sync_df[len(sync_df) - 1 if len(sync_df) > 1 else 1]
 
     def _trim_dataframe(self, df, phase, setup_datetime):
@@ -144,7 +344,9 @@ class ClusterCSVParser:
             values.
         """
         concat_dfs = pd.concat([file_df for _, file_df in files.items()])
-        concat_dfs = concat_dfs.groupby(concat_dfs["Timestamp"]).aggregate(aggregation_function)
+        # Only the loaded columns are aggregated
+        concat_dfs = concat_dfs.groupby(concat_dfs["Timestamp"]).aggregate(
+            {column: function for column, function in aggregation_function.items() if column in concat_dfs})
         concat_dfs["Daemon"] = concat_dfs["Daemon"].apply(lambda x: "wazuh-clusterd")
         concat_dfs.reset_index(inplace=True)
         return {'wazuh-clusterd': concat_dfs}
@@ -166,13 +368,13 @@ class ClusterCSVParser:
             for file, nodes in files.items():
                 for node, columns in nodes.items():
                     for column, stats in columns.items():
-                        for stat, value in stats.items():
+                        for stat_name, value in stats.items():
                             if node == 'master':
-                                grouped_data[phase][file][column][node][stat] = (node, value)
+                                grouped_data[phase][file][column][node][stat_name] = (node, value)
                             else:
-                                if not grouped_data[phase][file][column]['workers'][stat] or \
-                                        grouped_data[phase][file][column]['workers'][stat][1] < value:
-                                    grouped_data[phase][file][column]['workers'][stat] = (node, value)
+                                if not grouped_data[phase][file][column]['workers'][stat_name] or \
+                                        grouped_data[phase][file][column]['workers'][stat_name][1] < value:
+                                    grouped_data[phase][file][column]['workers'][stat_name] = (node, value)
 
         return grouped_data
 
@@ -198,13 +400,15 @@ class ClusterCSVTasksParser(ClusterCSVParser):
 
     Args:
         artifacts_path (str): directory where the cluster CSVs can be found.
+        kwargs: other arguments of `ClusterCSVParser`, like `nodes`, `workers` or `cache_path`.
 
     Attributes:
         artifacts_path (str): directory where the cluster CSVs can be found.
     """
 
-    def __init__(self, artifacts_path):
-        super().__init__(artifacts_path, files_to_load=['integrity_check', 'integrity_sync', 'agent-info_sync'])
+    def __init__(self, artifacts_path, **kwargs):
+        super().__init__(artifacts_path, files_to_load=['integrity_check', 'integrity_sync', 'agent-info_sync'],
+                         columns=['Timestamp', 'time_spent(s)'], **kwargs)
 
     def _calculate_stats(self, df):
         """Calculate mean of 'time_spent(s)' column from a dataframe.
@@ -224,7 +428,7 @@ class ClusterCSVTasksParser(ClusterCSVParser):
         Returns:
             dict: max stats obtained from cluster tasks.
         """
-        return self.default_to_dict(self._group_stats(self.dataframes['logs']))
+        return self.default_to_dict(self._group_stats(self.get_dataframes('logs')))
 
 
 class ClusterCSVResourcesParser(ClusterCSVParser):
@@ -233,16 +437,18 @@ class ClusterCSVResourcesParser(ClusterCSVParser):
     Args:
         artifacts_path (str): directory where the cluster CSVs can be found.
         columns (list, optional): columns of the CSVs to obtain stats from.
+        kwargs: other arguments of `ClusterCSVParser`, like `nodes`, `workers` or `cache_path`.
 
     Attributes:
         artifacts_path (str): directory where the cluster CSVs can be found.
         columns (list): columns of the CSVs to obtain stats from.
     """
 
-    def __init__(self, artifacts_path, columns=None):
+    def __init__(self, artifacts_path, columns=None, **kwargs):
         self.columns = ['USS(KB)', 'CPU(%)', 'FD'] if columns is None else columns
         super().__init__(artifacts_path, files_to_load=['wazuh-clusterd', 'integrity_sync', 'wazuh-clusterd_child_1',
-                                                        'wazuh-clusterd_child_2'])
+                                                        'wazuh-clusterd_child_2'],
+                         columns=['Timestamp', 'Daemon'] + self.columns, **kwargs)
 
     def _calculate_stats(self, df):
         """Calculate mean and regression coefficient of each column in self.columns from a dataframe.
@@ -267,7 +473,7 @@ class ClusterCSVResourcesParser(ClusterCSVParser):
         Returns:
             dict: max stats obtained from cluster resources.
         """
-        return self.default_to_dict(self._group_stats(self.dataframes['binaries']))
+        return self.default_to_dict(self._group_stats(self.get_dataframes('binaries')))
 
 
 class ClusterEnvInfo:
@@ -2,17 +2,19 @@
 # Created by Wazuh, Inc. <info@wazuh.com>.
 # This program is free software; you can redistribute it and/or modify it under the terms of GPLv2
 
-import csv
 import json
 import logging
+import os
 from datetime import datetime
-from os.path import basename, isfile, join, splitext
+from os.path import basename, dirname, isfile, join, splitext
 from re import sub
 from tempfile import gettempdir
 from threading import Thread, Event
-from time import sleep
+from time import sleep, time
 
 import wazuh_testing.tools as tls
+from wazuh_testing.tools import inotify
+from wazuh_testing.tools.performance.storage import get_data_writer, FILE_EXTENSIONS
 
 logger = logging.getLogger('wazuh-statistics-monitor')
 logger.setLevel(logging.INFO)
@@ -32,23 +34,28 @@ class StatisticMonitor:
         time_step (int): Time between intervals.
         target (str, optional): target file to monitor.
         dst_dir (str, optional): path to store the file.
+        output_format (str, optional): format of the data files, `csv` or `parquet`.
 
     Attributes:
         event (thread.Event): thread Event used to control the scans.
         thread (thread): thread to scan the data.
         time_step (int): time between each scan in seconds. Defaults to 1 second.
         dst_dir (str): directory to store the CSVs. Defaults to temp directory.
-        csv_file (str): path to the CSV file.
+        csv_file (str): path to the data file.
         target (str): target file to monitor.
+        output_format (str): format of the data files.
     """
 
-    def __init__(self, target='agent', time_step=5, dst_dir=gettempdir()):
+    def __init__(self, target='agent', time_step=5, dst_dir=gettempdir(), output_format='csv'):
         self.event = None
         self.thread = None
         self.time_step = time_step
         self.target = target
         self.dst_dir = dst_dir
+        self.output_format = output_format
         self.parse_json = False
+        self._writers = {}
+        self._previous_counters = {}
 
         if self.target == 'agent':
             self.statistics_file = tls.AGENT_STATISTICS_FILE
@@ -63,7 +70,7 @@ class StatisticMonitor:
             raise ValueError(f'The target {self.target} is not a valid one.')
 
         state_file = splitext(basename(self.statistics_file))[0]
-        self.csv_file = join(self.dst_dir, f'{state_file}_stats.csv')
+        self.csv_file = join(self.dst_dir, f'{state_file}_stats{FILE_EXTENSIONS[output_format]}')
 
     def _parse_classic_state_file(self, data):
         """Parse the info from the .state files from Wazuh with shell compatible format.
@@ -77,13 +84,43 @@ class StatisticMonitor:
                     key, value = line.splitlines()[0].split('=')
                     data[key] = value.split("'")[1]
 
-        self._write_csv(data, self.csv_file)
+        self._write_csv(data, splitext(self.csv_file)[0])
 
-    def _parse_logcollector_state_file(self, data):
+    def _get_counter_rates(self, key, sample_time, counters):
+        """Get the increment of cumulative counters since the previous sample with the same key, and its rate.
+
+        If a counter decreases (the daemon was restarted), its current value is used as increment.
+
+        Args:
+            key (tuple): identifier of the counters.
+            sample_time (float): timestamp of the sample.
+            counters (dict): current value of every counter.
+
+        Returns:
+            dict: `<counter>_delta` and `<counter>_per_second` values. The rates are 0 for the first sample.
+        """
+        previous_time, previous_counters = self._previous_counters.get(key, (None, {}))
+        self._previous_counters[key] = (sample_time, counters)
+        elapsed = sample_time - previous_time if previous_time is not None else 0
+
+        deltas = {}
+        for name, value in counters.items():
+            previous_value = previous_counters.get(name, value if previous_time is None else 0)
+            delta = value - previous_value if value >= previous_value else value
+            deltas[f'{name}_delta'] = delta
+            deltas[f'{name}_per_second'] = round(delta / elapsed, 2) if elapsed > 0 else 0
+
+        return deltas
+
+    def _parse_logcollector_state_file(self, data, sample_time):
         """Parse the info from the .state files from Wazuh with shell compatible format.
 
+        Along with the cumulative counters of every location and target, it records their increments since the
+        previous sample and the rates: events, bytes and drops per second.
+
         Args:
             data (dict): dictionary to store the data of the file.
+            sample_time (float): timestamp of the sample, used to calculate the rates.
         """
         with open(self.statistics_file) as state_file:
             state_info = json.load(state_file)
@@ -101,36 +138,41 @@ class StatisticMonitor:
                 file_data['bytes'] = file['bytes']
                 file_data['target'] = target['name']
                 file_data['target_drops'] = target['drops']
-                self._write_csv(file_data, join(self.dst_dir, f'{csv_name}.csv'))
+                file_data.update(self._get_counter_rates((file['location'], target['name']), sample_time,
+                                                         {'events': file['events'], 'bytes': file['bytes'],
+                                                          'drops': target['drops']}))
+                self._write_csv(file_data, join(self.dst_dir, csv_name))
 
-    def _parse_state_file(self):
-        """Read the data from the statistics file generated by Wazuh."""
+    def _parse_state_file(self, sample_time=None):
+        """Read the data from the statistics file generated by Wazuh.
+
+        Args:
+            sample_time (float, optional): timestamp of the sample. Defaults to the current time.
+        """
         try:
             logging.info("Getting statistics data from {}".format(self.statistics_file))
-            data = {'Timestamp': datetime.now().strftime('%Y/%m/%d %H:%M:%S')}
+            sample_time = time() if sample_time is None else sample_time
+            data = {'Timestamp': datetime.fromtimestamp(sample_time).strftime('%Y/%m/%d %H:%M:%S')}
             if not self.parse_json:
                 self._parse_classic_state_file(data)
             else:
-                self._parse_logcollector_state_file(data)
+                self._parse_logcollector_state_file(data, sample_time)
         except Exception as e:
             logger.error(f'Exception with {self.statistics_file} | {str(e)}')
 
-    @staticmethod
-    def _write_csv(data, csv_file):
-        """Write the data collected from the .state into a CSV file.
+    def _write_csv(self, data, data_file):
+        """Write the data collected from the .state into a data file, opening it the first time.
 
         Args:
             data (dict): dictionary containing the info from the .state file.
-            csv_file (string): path to the CSV file.
+            data_file (string): path to the data file, without extension.
         """
-        header = not isfile(csv_file)
-        with open(csv_file, 'a', newline='') as f:
-            csv_writer = csv.writer(f)
-            if header:
-                csv_writer.writerow(list(data))
+        if data_file not in self._writers:
+            self._writers[data_file] = get_data_writer(data_file, list(data), self.output_format)
 
-            csv_writer.writerow(list(data.values()))
-        logger.debug(f'Added new entry in {csv_file}')
+        self._writers[data_file].write_rows([list(data.values())])
+        self._writers[data_file].flush()
+        logger.debug(f'Added new entry in {data_file}')
 
     def _monitor_stats(self):
         """Read the .state files and log the data into a CSV file."""
@@ -138,6 +180,17 @@ class StatisticMonitor:
             self._parse_state_file()
             sleep(self.time_step)
 
+        self.close()
+
+    def close(self):
+        """Close the data files."""
+        for data_file, writer in self._writers.items():
+            try:
+                writer.close()
+            except Exception as e:
+                logger.error(f'Could not close {data_file} | {e}')
+        self._writers.clear()
+
     def run(self):
         """Run the event and thread monitoring functions."""
         self.event = Event()
@@ -153,3 +206,121 @@ class StatisticMonitor:
         """Stop all the monitoring threads."""
         self.event.set()
         self.thread.join()
+
+
+class StatisticWatcher:
+    """Monitor several statistics files from a single thread, parsing every file only when the daemon rewrites it.
+
+    The directories of the files are watched with inotify, and a file is parsed when it is closed after being written
+    or moved into place. The modification time of the file is used as the timestamp of the sample, and a file whose
+    modification time did not change is not parsed again, so no sample is duplicated. The files are also checked
+    every `time_step` seconds, which is the only way to detect the changes where inotify is not available.
+
+    Args:
+        targets (list(str)): targets to monitor (agent, logcollector, remote and analysis).
+        time_step (float, optional): maximum time between each check of the files.
+        dst_dir (str, optional): path to store the files.
+        output_format (str, optional): format of the data files, `csv` or `parquet`.
+
+    Attributes:
+        monitors (dict): `StatisticMonitor` used to parse and store every statistics file, by path.
+        time_step (float): maximum time between each check of the files.
+        event (thread.Event): thread Event used to stop the monitoring.
+        thread (thread): thread to parse the data.
+        watcher (InotifyWatcher): inotify instance, or None if the files are only checked periodically.
+    """
+    WATCH_MASK = inotify.IN_CLOSE_WRITE | inotify.IN_MOVED_TO
+
+    def __init__(self, targets, time_step=5, dst_dir=gettempdir(), output_format='csv'):
+        self.time_step = time_step
+        self.monitors = {}
+        for target in targets:
+            monitor = StatisticMonitor(target=target, time_step=time_step, dst_dir=dst_dir,
+                                       output_format=output_format)
+            self.monitors[monitor.statistics_file] = monitor
+        self.event = None
+        self.thread = None
+        self.watcher = None
+        self._mtimes = {}
+
+    def check_file(self, statistics_file):
+        """Parse a statistics file if it changed since the last time it was parsed.
+
+        Args:
+            statistics_file (str): path of the file.
+
+        Returns:
+            bool: True if the file was parsed, False otherwise.
+        """
+        try:
+            stat = os.stat(statistics_file)
+        except FileNotFoundError:
+            return False
+
+        if self._mtimes.get(statistics_file) == stat.st_mtime_ns:
+            return False
+
+        self._mtimes[statistics_file] = stat.st_mtime_ns
+        self.monitors[statistics_file]._parse_state_file(stat.st_mtime)
+
+        return True
+
+    def _create_watcher(self):
+        """Create the inotify instance watching the directories of the files.
+
+        Returns:
+            InotifyWatcher: watcher, or None if inotify is not available.
+        """
+        if not inotify.is_supported():
+            logger.info('inotify is not available. The statistics files will be checked periodically')
+            return None
+
+        watcher = inotify.InotifyWatcher()
+        for directory in {dirname(statistics_file) for statistics_file in self.monitors}:
+            try:
+                watcher.add_watch(directory, self.WATCH_MASK)
+            except OSError as e:
+                logger.warning(f'Could not watch {directory}, its files will be checked periodically | {e}')
+
+        return watcher
+
+    def _monitor_stats(self):
+        """Parse the statistics files when they change, until the monitoring is stopped."""
+        for statistics_file in self.monitors:
+            self.check_file(statistics_file)
+
+        while not self.event.is_set():
+            if self.watcher is None:
+                self.event.wait(self.time_step)
+                changed_files = self.monitors
+            else:
+                events = self.watcher.wait(self.time_step)
+                # Check every file after a timeout or a queue overflow, in case any event was missed
+                if not events or any(mask & inotify.IN_Q_OVERFLOW for _, mask, _ in events):
+                    changed_files = self.monitors
+                else:
+                    changed_files = {join(path, name) for path, _, name in events if path is not None}
+
+            for statistics_file in self.monitors:
+                if statistics_file in changed_files and not self.event.is_set():
+                    self.check_file(statistics_file)
+
+        for monitor in self.monitors.values():
+            monitor.close()
+
+    def start(self):
+        """Start the monitoring thread."""
+        self.event = Event()
+        self.watcher = self._create_watcher()
+        self.thread = Thread(target=self._monitor_stats)
+        self.thread.start()
+        logger.info(f'Started monitoring statistics from {", ".join(self.monitors)}')
+
+    def shutdown(self):
+        """Stop the monitoring thread."""
+        self.event.set()
+        if self.watcher is not None:
+            self.watcher.interrupt()
+        self.thread.join()
+        if self.watcher is not None:
+            self.watcher.close()
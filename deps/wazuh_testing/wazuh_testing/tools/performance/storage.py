@@ -0,0 +1,367 @@
+# Copyright (C) 2015-2022, Wazuh Inc.
+# Created by Wazuh, Inc. <info@wazuh.com>.
+# This program is free software; you can redistribute it and/or modify it under the terms of GPLv2
+import csv
+import logging
+from datetime import datetime
+from glob import escape, glob
+from os.path import isfile, splitext
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+OUTPUT_FORMATS = ['csv', 'parquet']
+FILE_EXTENSIONS = {'csv': '.csv', 'parquet': '.parquet'}
+PARQUET_ROW_GROUP_SIZE = 10000
+PARQUET_COMPRESSION = 'zstd'
+PARQUET_PART_SEPARATOR = '.part-'
+READ_CHUNK_SIZE = 100000
+
+logger = logging.getLogger('wazuh-performance-storage')
+
+
+class CSVDataWriter:
+    """Append rows to a CSV file, keeping it open.
+
+    Args:
+        path (str): path of the file.
+        columns (list(str)): column names, written as header if the file does not exist.
+
+    Attributes:
+        path (str): path of the file.
+        columns (list(str)): column names.
+    """
+    def __init__(self, path, columns):
+        self.path = path
+        self.columns = list(columns)
+        write_header = not isfile(path)
+        self._file = open(path, 'a', newline='')
+        self._writer = csv.writer(self._file)
+        if write_header:
+            self._writer.writerow(self.columns)
+
+    def write_rows(self, rows):
+        """Write rows in the file.
+
+        Args:
+            rows (list(list)): values of every row, in the order of the columns.
+        """
+        self._writer.writerows(rows)
+
+    def flush(self):
+        """Write the buffered data in the file."""
+        self._file.flush()
+
+    def close(self):
+        """Close the file."""
+        self._file.close()
+
+
+def _to_int(value):
+    if isinstance(value, float) and not value.is_integer():
+        raise ValueError(f'{value} is not an integer')
+    return int(value) if isinstance(value, (int, float)) else int(str(value))
+
+
+def _get_parquet_type(values):
+    """Get the Arrow type and the conversion function of a column from its first values.
+
+    Integer columns are stored as int64, other numeric columns as float64 and the rest as strings. Strings
+    containing numbers, like the values of the .state files, are stored as float64, as the first values of a
+    counter being integers does not mean the next ones will be.
+
+    Args:
+        values (list): values of the column.
+
+    Returns:
+        tuple: Arrow type and function to convert the values to it.
+    """
+    def is_type(function):
+        try:
+            for value in values:
+                function(value)
+            return True
+        except (TypeError, ValueError):
+            return False
+
+    values = [value for value in values if value is not None and value != '']
+    if not values or any(isinstance(value, bool) for value in values):
+        return pa.string(), str
+    if all(isinstance(value, int) for value in values):
+        return pa.int64(), _to_int
+    if is_type(float):
+        return pa.float64(), float
+
+    return pa.string(), str
+
+
+class ParquetDataWriter:
+    """Write rows in a compressed Parquet file, streaming them in row groups.
+
+    The type of every column is inferred from the first row group. The values that can't be converted to it in the
+    next ones are stored as nulls, logging a warning. The file can only be read after closing the writer, because
+    Parquet writes its metadata at the end, so a process killed before closing it leaves an unreadable file. If the
+    file already exists, it is not modified: the rows are written in a new part next to it,
+    `<name>.part-<timestamp>.parquet`, and the readers of this module load all the parts as a single data file.
+
+    Args:
+        path (str): path of the file.
+        columns (list(str)): column names.
+        row_group_size (int): number of rows of every row group.
+        compression (str): compression codec.
+
+    Attributes:
+        path (str): path of the written file, which is a new part if `path` already existed.
+        columns (list(str)): column names.
+        row_group_size (int): number of rows of every row group.
+        compression (str): compression codec.
+    """
+    def __init__(self, path, columns, row_group_size=PARQUET_ROW_GROUP_SIZE, compression=PARQUET_COMPRESSION):
+        if pq is None:
+            raise ValueError('The parquet output format requires the pyarrow package')
+        if isfile(path):
+            path = f"{splitext(path)[0]}{PARQUET_PART_SEPARATOR}{datetime.now():%Y%m%d%H%M%S%f}" \
+                   f"{FILE_EXTENSIONS['parquet']}"
+            logger.info(f'Writing the new rows in {path}')
+        self.path = path
+        self.columns = list(columns)
+        self.row_group_size = row_group_size
+        self.compression = compression
+        self._rows = []
+        self._schema = None
+        self._converters = None
+        self._writer = None
+
+    def _open(self):
+        """Create the file with the schema inferred from the buffered rows."""
+        types = [_get_parquet_type([row[index] for row in self._rows]) for index in range(len(self.columns))]
+        self._schema = pa.schema([(column, arrow_type) for column, (arrow_type, _) in zip(self.columns, types)])
+        self._converters = [converter for _, converter in types]
+        self._writer = pq.ParquetWriter(self.path, self._schema, compression=self.compression)
+
+    def _convert_column(self, index):
+        """Convert the buffered values of a column to its type, warning about the ones stored as nulls.
+
+        Args:
+            index (int): position of the column.
+
+        Returns:
+            pyarrow.Array: values of the column.
+        """
+        field, converter = self._schema.field(index), self._converters[index]
+        values = []
+        dropped = []
+        for row in self._rows:
+            value = row[index]
+            if value is None or value == '':
+                values.append(None)
+                continue
+            try:
+                values.append(converter(value))
+            except (TypeError, ValueError):
+                values.append(None)
+                dropped.append(value)
+        if dropped:
+            logger.warning(f'{len(dropped)} values of the column {field.name} of {self.path} are not {field.type} '
+                           f'and were stored as nulls. First one: {dropped[0]!r}')
+
+        return pa.array(values, type=field.type)
+
+    def _write_row_group(self):
+        """Write the buffered rows as a new row group."""
+        if not self._rows:
+            return
+        if self._writer is None:
+            self._open()
+
+        arrays = [self._convert_column(index) for index in range(len(self._schema))]
+        self._writer.write_table(pa.Table.from_arrays(arrays, schema=self._schema),
+                                 row_group_size=self.row_group_size)
+        self._rows = []
+
+    def write_rows(self, rows):
+        """Buffer rows, writing a row group every `row_group_size` rows.
+
+        Args:
+            rows (list(list)): values of every row, in the order of the columns.
+        """
+        self._rows.extend(rows)
+        if len(self._rows) >= self.row_group_size:
+            self._write_row_group()
+
+    def flush(self):
+        """Do nothing: the rows are only written when a row group is complete, to keep the row groups big."""
+        pass
+
+    def close(self):
+        """Write the pending rows and the metadata of the file."""
+        self._write_row_group()
+        if self._writer is not None:
+            self._writer.close()
+
+
+def get_data_writer(path, columns, output_format='csv'):
+    """Get a writer for a data file of the performance monitors.
+
+    Args:
+        path (str): path of the file without extension.
+        columns (list(str)): column names.
+        output_format (str): format of the file, `csv` or `parquet`.
+
+    Returns:
+        CSVDataWriter or ParquetDataWriter: writer of the file with the extension of its format.
+
+    Raises:
+        ValueError: if the format is not supported.
+    """
+    if output_format == 'csv':
+        return CSVDataWriter(f'{path}{FILE_EXTENSIONS[output_format]}', columns)
+    if output_format == 'parquet':
+        return ParquetDataWriter(f'{path}{FILE_EXTENSIONS[output_format]}', columns)
+
+    raise ValueError(f'The output format {output_format} is not supported. Formats: {", ".join(OUTPUT_FORMATS)}')
+
+
+def find_data_file(path):
+    """Find a data file in any of the supported formats.
+
+    Args:
+        path (str): path of the file, with or without extension.
+
+    Returns:
+        str: path of the existing file, or `path` if there is no file in any format.
+    """
+    if isfile(path):
+        return path
+
+    base_path = splitext(path)[0] if splitext(path)[1] in FILE_EXTENSIONS.values() else path
+    for extension in FILE_EXTENSIONS.values():
+        if isfile(f'{base_path}{extension}'):
+            return f'{base_path}{extension}'
+
+    return path
+
+
+def get_data_file_parts(path):
+    """Get the files of a data file, which are several for the Parquet files written by several runs.
+
+    Args:
+        path (str): path of the file, with or without extension.
+
+    Returns:
+        list(str): path of the file followed by the paths of its parts, in the order they were written.
+    """
+    path = find_data_file(path)
+    base_path, extension = splitext(path)
+    if extension != FILE_EXTENSIONS['parquet']:
+        return [path]
+
+    parts = sorted(glob(f"{escape(base_path)}{PARQUET_PART_SEPARATOR}*{extension}"))
+    return [path] + parts if isfile(path) else parts
+
+
+def _read_parquet_parts(path, read):
+    """Read every part of a Parquet data file, skipping the ones left unreadable by a killed writer.
+
+    Args:
+        path (str): path of the file.
+        read (callable): function that reads a part and returns its result.
+
+    Yields:
+        any: result of every readable part.
+
+    Raises:
+        ValueError: if none of the parts can be read.
+    """
+    readable = False
+    for part in get_data_file_parts(path):
+        try:
+            result = read(part)
+        except (OSError, ValueError) as error:
+            logger.warning(f'Skipping the unreadable data file {part}: {error}')
+            continue
+        readable = True
+        yield result
+
+    if not readable:
+        raise ValueError(f'There is no readable data in {path}')
+
+
+def read_data_file(path, index_col=None, parse_dates=False, columns=None, **kwargs):
+    """Load a CSV or Parquet data file as a dataframe.
+
+    Args:
+        path (str): path of the file. If it does not exist, the same file in another format is loaded. Every part
+            of a Parquet file is loaded.
+        index_col (str): column to use as index.
+        parse_dates (bool): parse the index as dates.
+        columns (list(str)): columns to load. The ones that are not in the file are ignored. None to load all of them.
+        kwargs: other arguments of `pandas.read_csv`, only used for CSV files.
+
+    Returns:
+        pandas.DataFrame: data of the file.
+    """
+    # Imported here so the monitors, which only write data files, don't load pandas
+    import pandas as pd
+
+    path = find_data_file(path)
+    if splitext(path)[1] != FILE_EXTENSIONS['parquet']:
+        if columns is not None:
+            # A list, in the order of the file, is faster than a callable and supported by all the engines
+            with open(path, newline='') as data_file:
+                header = next(csv.reader(data_file), [])
+            kwargs['usecols'] = [column for column in header if column in columns]
+        return pd.read_csv(path, index_col=index_col, parse_dates=parse_dates, **kwargs)
+
+    def read_part(part):
+        part_columns = columns
+        if columns is not None and pq is not None:
+            part_columns = [column for column in pq.ParquetFile(part).schema_arrow.names if column in columns]
+        return pd.read_parquet(part, columns=part_columns)
+
+    dataframes = list(_read_parquet_parts(path, read_part))
+    dataframe = dataframes[0] if len(dataframes) == 1 else pd.concat(dataframes, ignore_index=True)
+    if index_col is not None:
+        dataframe = dataframe.set_index(index_col)
+        if parse_dates:
+            dataframe.index = pd.to_datetime(dataframe.index)
+
+    return dataframe
+
+
+def iter_data_file(path, columns=None, chunk_size=READ_CHUNK_SIZE, dtype=None):
+    """Read a CSV or Parquet data file in chunks, to process files bigger than the memory.
+
+    Args:
+        path (str): path of the file. If it does not exist, the same file in another format is read. Every part
+            of a Parquet file is read.
+        columns (list(str)): columns to read. The ones that are not in the file are ignored. None to read all of them.
+        chunk_size (int): maximum number of rows of every chunk.
+        dtype (dict): type of some columns, so it does not have to be inferred.
+
+    Yields:
+        pandas.DataFrame: rows of the next chunk.
+    """
+    import pandas as pd
+
+    path = find_data_file(path)
+    if splitext(path)[1] != FILE_EXTENSIONS['parquet']:
+        usecols = None if columns is None else lambda column: column in columns
+        with pd.read_csv(path, usecols=usecols, chunksize=chunk_size, dtype=dtype) as reader:
+            yield from reader
+        return
+
+    if pq is None:
+        raise ValueError('Reading parquet files requires the pyarrow package')
+    for parquet_file in _read_parquet_parts(path, pq.ParquetFile):
+        part_columns = columns
+        if columns is not None:
+            part_columns = [column for column in parquet_file.schema_arrow.names if column in columns]
+        for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=part_columns):
+            dataframe = batch.to_pandas()
+            yield dataframe.astype({column: column_type for column, column_type in dtype.items()
+                                    if column in dataframe.columns}) if dtype else dataframe
@@ -1,13 +1,28 @@
+from html import escape
+from multiprocessing import Pool
 from os.path import join
 from re import sub
 from tempfile import gettempdir
 
 import matplotlib.dates as mdates
 import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
 import seaborn as sns
+from pandas.api.types import is_numeric_dtype
+
+from wazuh_testing.tools.performance.storage import read_data_file
+
+try:
+    import plotly.graph_objects as go
+except ImportError:
+    go = None
 
 BINARY_NON_PRINTABLE_HEADERS = ['PID', 'Daemon', 'Version']
+DOWNSAMPLING_METHODS = ['lttb', 'minmax']
+MAX_POINTS = 5000
+MIN_LINE_POINTS = 500
+FIGURE_SIZE = (26, 9)
 
 ANALYSISD_CSV_HEADERS = {
     'decoded_events': {'title': 'Events decoded per queue',
@@ -57,12 +72,170 @@ LOGCOLLECTOR_CSV_HEADERS = {
     'events': {'title': 'Events generated', 'columns': ['events']},
     'bytes_sent': {'title': 'Bytes sent', 'columns': ['bytes']},
     'drops': {'title': 'Events dropped', 'columns': ['target_drops']},
+    'events_per_second': {'title': 'Events generated per second', 'columns': ['events_per_second']},
+    'bytes_per_second': {'title': 'Bytes sent per second', 'columns': ['bytes_per_second']},
+    'drops_per_second': {'title': 'Events dropped per second', 'columns': ['drops_per_second']},
 }
 
 
+def _set_plot_style():
+    """Set the style and the size of the figures, also in the processes rendering them."""
+    sns.set(rc={'figure.figsize': FIGURE_SIZE})
+
+
+def _get_x_values(index):
+    """Get the position of every value of an index as a number, to measure the distance between points.
+
+    Args:
+        index (pandas.Index): index of a series.
+
+    Returns:
+        numpy.ndarray: dates as nanoseconds, numbers as they are and any other value as its position in the index.
+    """
+    if isinstance(index, pd.DatetimeIndex):
+        return index.asi8.astype(np.float64)
+    if is_numeric_dtype(index):
+        return index.to_numpy(dtype=np.float64)
+
+    return np.arange(len(index), dtype=np.float64)
+
+
+def lttb(x, y, threshold):
+    """Select the points that keep the shape of a line with the Largest-Triangle-Three-Buckets algorithm.
+
+    The first and the last points are always selected. The rest are split in `threshold - 2` buckets and, from every
+    one, the point that forms the largest triangle with the point selected in the previous bucket and the average of
+    the next bucket is selected.
+
+    Args:
+        x (numpy.ndarray): x coordinates of the points, sorted.
+        y (numpy.ndarray): y coordinates of the points.
+        threshold (int): number of points to select.
+
+    Returns:
+        numpy.ndarray: positions of the selected points.
+    """
+    length = len(y)
+    if threshold >= length or threshold < 3:
+        return np.arange(length)
+
+    edges = np.arange(threshold - 1) * (length - 2) // (threshold - 2) + 1
+    starts, sizes = edges[:-1], np.diff(edges)
+    # The average of the next bucket of every one, the last point for the last bucket
+    average_x = np.append(np.add.reduceat(x[:length - 1], starts)[1:] / sizes[1:], x[-1])
+    average_y = np.append(np.add.reduceat(y[:length - 1], starts)[1:] / sizes[1:], y[-1])
+    # The points of every bucket in a row, repeating its last point in the shorter buckets, so they are never selected
+    positions = starts[:, np.newaxis] + np.minimum(np.arange(sizes.max()), sizes[:, np.newaxis] - 1)
+    bucket_x, bucket_y = x[positions], y[positions]
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, length - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        previous_x, previous_y = x[previous], y[previous]
+        areas = np.abs((previous_x - average_x[bucket]) * (bucket_y[bucket] - previous_y) -
+                       (previous_x - bucket_x[bucket]) * (average_y[bucket] - previous_y))
+        previous = starts[bucket] + areas.argmax()
+        selected[bucket + 1] = previous
+
+    return selected
+
+
+def minmax(y, threshold):
+    """Select the minimum and the maximum of every bucket of a line, to keep all its peaks.
+
+    Args:
+        y (numpy.ndarray): y coordinates of the points.
+        threshold (int): maximum number of points to select.
+
+    Returns:
+        numpy.ndarray: positions of the selected points, sorted.
+    """
+    length = len(y)
+    if threshold >= length or threshold < 2:
+        return np.arange(length)
+
+    edges = np.arange(threshold // 2 + 1) * length // (threshold // 2)
+    starts, sizes = edges[:-1], np.diff(edges)
+    # The points of every bucket in a row, repeating its last point in the shorter buckets
+    positions = starts[:, np.newaxis] + np.minimum(np.arange(sizes.max()), sizes[:, np.newaxis] - 1)
+    values = y[positions]
+    rows = np.arange(len(starts))
+
+    return np.unique(np.concatenate((positions[rows, values.argmin(axis=1)], positions[rows, values.argmax(axis=1)])))
+
+
+def downsample(series, max_points, method='lttb'):
+    """Reduce the number of points of a series, keeping its shape.
+
+    Args:
+        series (pandas.Series): values to downsample, sorted by their index.
+        max_points (int): maximum number of points. None or 0 to keep all of them.
+        method (str): downsampling algorithm, `lttb` or `minmax`.
+
+    Returns:
+        pandas.Series: selected values, with their index. The series is returned as it is if it does not have more
+        points than `max_points` or it is not numeric.
+
+    Raises:
+        ValueError: if the method is not supported.
+    """
+    if method not in DOWNSAMPLING_METHODS:
+        raise ValueError(f"The downsampling method {method} is not supported. "
+                         f"Methods: {', '.join(DOWNSAMPLING_METHODS)}")
+    if not max_points or len(series) <= max_points or not is_numeric_dtype(series):
+        return series
+
+    # The missing values are not drawn, so they can't be selected
+    series = series.dropna()
+    values = series.to_numpy(dtype=np.float64)
+    if method == 'lttb':
+        positions = lttb(_get_x_values(series.index), values, max_points)
+    else:
+        positions = minmax(values, max_points)
+
+    return series.iloc[positions]
+
+
+def _render_figure(figure):
+    """Draw a figure and save it as an SVG image.
+
+    Args:
+        figure (dict): lines, labels and path of the figure, as built by `DataVisualizer`.
+
+    Returns:
+        str: path of the image.
+    """
+    fig, ax = plt.subplots(figsize=FIGURE_SIZE)
+    for label, color, series in figure['lines']:
+        ax.plot(series, label=label, color=color)
+
+    if figure['statistics']:
+        ax.text(0.9, 0.9, figure['statistics'], fontsize=14, transform=fig.transFigure)
+    ax.legend(loc='center left', bbox_to_anchor=(1.0, 0.5))
+    ax.set_ylabel(figure['y_label'])
+    ax.set_title(figure['title'])
+
+    if figure['x_ticks_granularity'] == 'seconds':
+        ax.xaxis.set_major_locator(mdates.SecondLocator(interval=figure['x_ticks_interval']))
+    elif figure['x_ticks_granularity'] == 'minutes':
+        ax.xaxis.set_major_locator(mdates.MinuteLocator(interval=figure['x_ticks_interval']))
+    if figure['x_ticks_granularity'] is not None:
+        ax.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M:%S'))
+        ax.tick_params(axis='x', labelrotation=figure['rotation'])
+
+    fig.savefig(figure['path'], dpi=1200, format='svg')
+    plt.close(fig)
+
+    return figure['path']
+
+
 class DataVisualizer:
     """Class that allows to visualize the data collected using the wazuh_metrics tool.
 
+    The lines are downsampled to `max_points` points per figure before drawing them, keeping their shape, and the
+    figures are rendered in parallel.
+
     Args:
         dataframes (list): list containing the paths.
         target (str): string to set the visualization type.
@@ -71,6 +244,10 @@ class DataVisualizer:
         x_ticks_granularity (string): granularity of the Timestamp. It is set by default to minutes.
         x_ticks_interval (int): interval of the x-label.
         base_name (str, optional): base name used to store the images.
+        max_points (int, optional): maximum number of points of every figure. None or 0 to draw all of them.
+        downsampling (str, optional): downsampling algorithm, `lttb` or `minmax`.
+        workers (int, optional): number of processes rendering the figures. Defaults to the number of CPUs.
+        html (bool, optional): also store the figures in an interactive HTML file. Requires the plotly package.
     Attributes:
         dataframes_paths (list): paths of the CSVs.
         dataframe (pandas.Dataframe): dataframe containing the info from all the CSVs.
@@ -80,9 +257,22 @@ class DataVisualizer:
         x_ticks_granularity (string): granularity of the Timestamp. It is set by default to minutes.
         x_ticks_interval (int): interval of the x-label.
         base_name (str, optional): base name used to store the images.
+        max_points (int): maximum number of points of every figure.
+        downsampling (str): downsampling algorithm.
+        workers (int): number of processes rendering the figures.
+        html (bool): also store the figures in an interactive HTML file.
+
+    Raises:
+        ValueError: if the downsampling method is not supported or the HTML output is requested without plotly.
     """
     def __init__(self, dataframes, target, compare=False, store_path=gettempdir(), x_ticks_granularity='minutes',
-                 x_ticks_interval=1, base_name=None):
+                 x_ticks_interval=1, base_name=None, max_points=MAX_POINTS, downsampling='lttb', workers=None,
+                 html=False):
+        if downsampling not in DOWNSAMPLING_METHODS:
+            raise ValueError(f"The downsampling method {downsampling} is not supported. "
+                             f"Methods: {', '.join(DOWNSAMPLING_METHODS)}")
+        if html and go is None:
+            raise ValueError('The HTML output requires the plotly package')
         self.dataframes_paths = dataframes
         self.dataframe = None
         self.compare = compare
@@ -92,7 +282,12 @@ class DataVisualizer:
         self.x_ticks_granularity = x_ticks_granularity
         self.x_ticks_interval = x_ticks_interval
         self.base_name = base_name
-        sns.set(rc={'figure.figsize': (26, 9)})
+        self.max_points = max_points
+        self.downsampling = downsampling
+        self.workers = workers
+        self.html = html
+        self._figures = []
+        _set_plot_style()
 
     @staticmethod
     def _color_palette(size):
@@ -110,23 +305,11 @@ class DataVisualizer:
         """Load the dataframes from dataframes_paths."""
         for df_path in self.dataframes_paths:
             if self.dataframe is None and self.target != 'cluster':
-                self.dataframe = pd.read_csv(df_path, index_col="Timestamp", parse_dates=True)
+                self.dataframe = read_data_file(df_path, index_col="Timestamp", parse_dates=True)
             else:
-                new_csv = pd.read_csv(df_path, index_col="Timestamp", parse_dates=True)
+                new_csv = read_data_file(df_path, index_col="Timestamp", parse_dates=True)
                 self.dataframe = pd.concat([self.dataframe, new_csv])
 
-    def _set_x_ticks_interval(self, ax):
-        """Set the number of labels that will appear in the X axis and their format.
-
-        Args:
-            ax (axes.SubplotBase): subplot base where the data will be printed.
-        """
-        if self.x_ticks_granularity == 'seconds':
-            ax.xaxis.set_major_locator(mdates.SecondLocator(interval=self.x_ticks_interval))
-        elif self.x_ticks_granularity == 'minutes':
-            ax.xaxis.set_major_locator(mdates.MinuteLocator(interval=self.x_ticks_interval))
-        ax.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M:%S'))
-
     @staticmethod
     def _get_statistics(df, calculate_mean=True, calculate_median=False):
         """Function for calculating statistics.
@@ -144,49 +327,48 @@ class DataVisualizer:
 
         return statistics
 
-    @staticmethod
-    def _basic_plot(ax, dataframe, label=None, color=None):
-        """Basic function to visualize a dataframe.
+    def _add_figure(self, lines, y_label, title, rotation=90, cluster_log=False, statistics=None):
+        """Downsample the lines of a figure and add it to the ones to render.
 
         Args:
-            ax (axes.SubplotBase): subplot base where the data will be printed.
-            dataframe (pandas.Dataframe): dataframe containing the data from the CSVs.
-            label (str, optional): optional label to add to the plot.
-            color (tuple, optional): tuple defining the color (float, float).
-        """
-        ax.plot(dataframe, label=label, color=color)
-
-    def _save_custom_plot(self, ax, y_label, title, rotation=90, cluster_log=False, statistics=None):
-        """Function to add info to the plot, the legend and save the SVG image.
-
-        Args:
-            ax (axes.SubplotBase): subplot base where the data will be printed.
+            lines (list(tuple)): label, color and series of every line.
             y_label (str): label for the Y axis.
             title (str): title of the plot.
             rotation (int, optional): optional int to set the rotation of the X-axis labels.
             cluster_log (bool, optional): optional flag used to plot specific graphics for the cluster.
             statistics (str, optional): optional statistics measures.
         """
-        if statistics:
-            ax.text(0.9, 0.9, statistics, fontsize=14, transform=plt.gcf().transFigure)
+        svg_name = sub(pattern=r'\(.*\)', string=title if cluster_log else y_label, repl='')
+        if self.base_name is not None:
+            svg_name = f"{self.base_name}_{svg_name}"
 
-        ax.legend(loc='center left', bbox_to_anchor=(1.0, 0.5))
-        ax.set_ylabel(y_label)
-        ax.set_title(title)
+        # The points of the figure are shared by its lines, without drawing less than MIN_LINE_POINTS per line
+        line_points = max(self.max_points // max(len(lines), 1), MIN_LINE_POINTS) if self.max_points else None
+        self._figures.append({
+            'lines': [(label, color, downsample(series, line_points, self.downsampling))
+                      for label, color, series in lines],
+            'y_label': y_label,
+            'title': title,
+            'statistics': statistics,
+            'rotation': rotation,
+            'x_ticks_granularity': None if cluster_log else self.x_ticks_granularity,
+            'x_ticks_interval': self.x_ticks_interval,
+            'path': join(self.store_path, f"{svg_name}.svg")
+        })
+
+    def _get_groups(self, column):
+        """Split the dataframe by the values of a column, in order of appearance.
 
-        if not cluster_log:
-            self._set_x_ticks_interval(ax)
-            plt.xticks(rotation=rotation)
-            svg_name = sub(pattern=r'\(.*\)', string=y_label, repl='')
-        else:
-            svg_name = sub(pattern=r'\(.*\)', string=title, repl='')
+        Args:
+            column (str): column to group by.
 
-        if self.base_name is not None:
-            svg_name = f"{self.base_name}_{svg_name}"
-        plt.savefig(join(self.store_path, f"{svg_name}.svg"), dpi=1200, format='svg')
+        Returns:
+            dict: dataframe of every value of the column.
+        """
+        return dict(tuple(self.dataframe.groupby(column, sort=False)))
 
     def _plot_data(self, elements, title=None, generic_label=None):
-        """Function to plot the different types of dataframes.
+        """Function to add the figures of the different types of dataframes.
 
         Args:
             elements (list, pandas.columns): columns to plot.
@@ -194,54 +376,44 @@ class DataVisualizer:
             generic_label (str, optional): set a generic label to plot all the columns.
         """
         if self.target == 'binary':
+            daemons = self._get_groups('Daemon')
+            colors = self._color_palette(len(daemons))
             for element in elements:
-                fig, ax = plt.subplots()
-                daemons = self._get_daemons()
-                colors = self._color_palette(len(daemons))
-                for daemon, color in zip(daemons, colors):
-                    self._basic_plot(ax, self.dataframe[self.dataframe.Daemon == daemon][element],
-                                     label=daemon, color=color)
-                self._save_custom_plot(ax, element, f"{element} {title}")
+                self._add_figure([(daemon, color, dataframe[element])
+                                  for (daemon, dataframe), color in zip(daemons.items(), colors)],
+                                 element, f"{element} {title}")
 
         elif self.target == 'logcollector':
+            targets = self._get_groups('target')
+            colors = self._color_palette(len(targets))
             for element in elements:
-                fig, ax = plt.subplots()
-                targets = self._get_logcollector_targets()
-                colors = self._color_palette(len(targets))
-                for target, color in zip(targets, colors):
-                    self._basic_plot(ax, self.dataframe[self.dataframe.target == target][element],
-                                     label=target, color=color)
-                self._save_custom_plot(ax, element, title)
+                self._add_figure([(target, color, dataframe[element])
+                                  for (target, dataframe), color in zip(targets.items(), colors)],
+                                 element, title)
 
         elif self.target == 'cluster':
             for element in elements:
-                fig, ax = plt.subplots()
                 nodes = self.dataframe[self.dataframe.activity == element]['node_name'].unique()
                 current_df = self.dataframe[self.dataframe.activity == element]
                 current_df.reset_index(drop=True, inplace=True)
-                for node, color in zip(nodes, self._color_palette(len(nodes))):
-                    self._basic_plot(ax=ax, dataframe=current_df[current_df.node_name == node]['time_spent(s)'],
-                                     label=node, color=color)
-                self._save_custom_plot(ax, 'time_spent(s)', element.replace(' ', '_').lower(), cluster_log=True,
-                                       statistics=DataVisualizer._get_statistics(
-                                           current_df['time_spent(s)'], calculate_mean=True, calculate_median=True))
+                self._add_figure([(node, color, current_df[current_df.node_name == node]['time_spent(s)'])
+                                  for node, color in zip(nodes, self._color_palette(len(nodes)))],
+                                 'time_spent(s)', element.replace(' ', '_').lower(), cluster_log=True,
+                                 statistics=DataVisualizer._get_statistics(
+                                     current_df['time_spent(s)'], calculate_mean=True, calculate_median=True))
 
         elif self.target == 'api':
+            queries = self._get_groups('endpoint')
+            colors = self._color_palette(len(queries))
             for element in elements:
-                fig, ax = plt.subplots()
-                queries = self.dataframe.endpoint.unique()
-                colors = self._color_palette(len(queries))
-                for endpoint, color in zip(queries, colors):
-                    self._basic_plot(ax, self.dataframe[self.dataframe.endpoint == endpoint]['time_spent(s)'],
-                                     label=endpoint, color=color)
-                self._save_custom_plot(ax, element, 'API Response time')
+                self._add_figure([(endpoint, color, dataframe['time_spent(s)'])
+                                  for (endpoint, dataframe), color in zip(queries.items(), colors)],
+                                 element, 'API Response time')
 
         else:
-            fig, ax = plt.subplots()
             colors = self._color_palette(len(elements))
-            for element, color in zip(elements, colors):
-                self._basic_plot(ax, self.dataframe[element], label=element, color=color)
-            self._save_custom_plot(ax, generic_label, title)
+            self._add_figure([(element, color, self.dataframe[element]) for element, color in zip(elements, colors)],
+                             generic_label, title)
 
     def _plot_binaries_dataset(self):
         """Function to plot the hardware data of the binary."""
@@ -279,6 +451,9 @@ class DataVisualizer:
         for element in LOGCOLLECTOR_CSV_HEADERS:
             columns = LOGCOLLECTOR_CSV_HEADERS[element]['columns']
             title = LOGCOLLECTOR_CSV_HEADERS[element]['title']
+            # The rates are not available in the files of older versions
+            if not set(columns).issubset(self.dataframe.columns):
+                continue
             self._plot_data(elements=columns, title=title, generic_label=element)
 
     def _plot_cluster_dataset(self):
@@ -289,8 +464,51 @@ class DataVisualizer:
         """Function to plot the information from the api.log file."""
         self._plot_data(elements=['endpoint'], generic_label='Queries')
 
+    def _render_figures(self):
+        """Render the figures, in parallel if there are several workers.
+
+        Returns:
+            list(str): paths of the images.
+        """
+        if self.workers == 1 or len(self._figures) < 2:
+            return [_render_figure(figure) for figure in self._figures]
+
+        with Pool(self.workers, initializer=_set_plot_style) as pool:
+            return pool.map(_render_figure, self._figures)
+
+    def _write_html(self):
+        """Store the downsampled figures in a self-contained interactive HTML file.
+
+        Returns:
+            str: path of the file.
+        """
+        name = self.target if self.base_name is None else f"{self.base_name}_{self.target}"
+        sections = []
+        for index, figure in enumerate(self._figures):
+            plotly_figure = go.Figure([go.Scatter(x=series.index, y=series.to_numpy(), name=str(label), mode='lines',
+                                                  line={'color': f"rgb{tuple(round(value * 255) for value in color)}"})
+                                       for label, color, series in figure['lines']])
+            plotly_figure.update_layout(title=figure['title'], yaxis_title=figure['y_label'])
+            if figure['statistics']:
+                plotly_figure.add_annotation(text=figure['statistics'].strip().replace('\n', '<br>'), xref='paper',
+                                             yref='paper', x=1, y=1, showarrow=False, align='left')
+            # The plotly library is embedded once, with the first figure
+            sections.append(plotly_figure.to_html(full_html=False, include_plotlyjs=index == 0))
+
+        path = join(self.store_path, f"{name}.html")
+        with open(path, 'w') as html_file:
+            html_file.write(f"<!DOCTYPE html>\n<html>\n<head>\n<meta charset=\"utf-8\">\n"
+                            f"<title>{escape(name)}</title>\n</head>\n<body>\n{''.join(sections)}\n</body>\n</html>\n")
+
+        return path
+
     def plot(self):
-        """Public function to plot the dataset."""
+        """Public function to plot the dataset.
+
+        Returns:
+            list(str): paths of the images and, if requested, the HTML file.
+        """
+        self._figures = []
         if self.target == 'binary':
             self._plot_binaries_dataset()
         elif self.target == 'analysis':
@@ -308,6 +526,12 @@ class DataVisualizer:
         else:
             raise AttributeError(f"Invalid target {self.target}")
 
+        paths = self._render_figures()
+        if self.html:
+            paths.append(self._write_html())
+
+        return paths
+
     def _get_daemons(self):
         """Get the list of Wazuh Daemons in the dataset."""
         return self.dataframe.Daemon.unique()
@@ -6,6 +6,8 @@ import base64
 import hashlib
 import json
 import os
+import queue
+import selectors
 import socket
 import struct
 import threading
@@ -17,7 +19,9 @@ from wazuh_testing import logger
 from Crypto.Cipher import AES, Blowfish
 from Crypto.Util.Padding import pad
 from wazuh_testing.tools import WAZUH_PATH
-from wazuh_testing.tools.monitoring import Queue
+from wazuh_testing.tools.monitoring import Queue, RingQueue
+
+CONNECTION_COUNTERS = ['connections', 'received_messages', 'received_bytes', 'sent_messages', 'sent_bytes']
 
 
 class Cipher:
@@ -52,6 +56,69 @@ class Cipher:
         return cipher.decrypt(self.data)
 
 
+class CipherContext:
+    """Reusable encryption context with the same output as `Cipher`.
+
+    `Cipher` creates a new cipher, with its key schedule, for every message. This class creates it once per key and
+    restarts the CBC chain of every message from the fixed IV by encrypting first a block that leaves the cipher in
+    the initial state (D(iv) xor previous ciphertext block), which is dropped from the output.
+
+    The context is thread-safe, so the same agent can encrypt events from several threads.
+
+    Args:
+        key (bytes): Encryption key of the agent.
+        cypher (str): Encryption algorithm, `aes` or `blowfish`.
+
+    Raises:
+        ValueError: If the algorithm is not supported.
+    """
+    AES_IV = b'FEDCBA0987654321'
+    BLOWFISH_IV = b'\xfe\xdc\xba\x98\x76\x54\x32\x10'
+
+    def __init__(self, key, cypher='aes'):
+        if cypher == 'aes':
+            self.block_size = AES.block_size
+            self._iv = self.AES_IV
+            self._padding = True
+            self._cipher = AES.new(key[:32], AES.MODE_CBC, self._iv)
+            decrypted_iv = AES.new(key[:32], AES.MODE_ECB).decrypt(self._iv)
+        elif cypher == 'blowfish':
+            self.block_size = Blowfish.block_size
+            self._iv = self.BLOWFISH_IV
+            self._padding = False
+            self._cipher = Blowfish.new(key, Blowfish.MODE_CBC, self._iv)
+            decrypted_iv = Blowfish.new(key, Blowfish.MODE_ECB).decrypt(self._iv)
+        else:
+            raise ValueError(f"Unsupported cypher: {cypher}")
+
+        self._decrypted_iv = int.from_bytes(decrypted_iv, 'big')
+        self._last_block = self._iv
+        self._lock = threading.Lock()
+
+    def encrypt(self, data):
+        """Encrypt data as `Cipher.encrypt_aes` or `Cipher.encrypt_blowfish` would do.
+
+        Args:
+            data (bytes): Data to encrypt. Its length must be a multiple of the block size when using Blowfish.
+
+        Returns:
+            bytes: Encrypted data.
+        """
+        if self._padding:
+            data = pad(data, self.block_size)
+
+        with self._lock:
+            if self._last_block is self._iv:
+                encrypted = self._cipher.encrypt(data)
+            else:
+                reset_value = self._decrypted_iv ^ int.from_bytes(self._last_block, 'big')
+                reset_block = reset_value.to_bytes(self.block_size, 'big')
+                encrypted = self._cipher.encrypt(reset_block + data)[self.block_size:]
+            self._last_block = encrypted[-self.block_size:]
+
+        return encrypted
+
+
 class RemotedSimulator:
     """Create an AF_INET server socket for simulating remoted connection.
 
@@ -74,6 +141,9 @@ class RemotedSimulator:
         self.request_confirmed = False
         self.request_answer = None
         self.keys = ({}, {})
+        self._keys_file_stat = None
+        self._encryption_keys = {}
+        self._cipher_contexts = {}
         self.encryption_key = ""
         self.mode = mode
         self.server_address = server_address
@@ -154,10 +224,15 @@ class RemotedSimulator:
             name (str): Agent name.
             key (str): Encryption key.
         """
-        sum1 = (hashlib.md5((hashlib.md5(name.encode()).hexdigest().encode() + hashlib.md5(
-            agent_id.encode()).hexdigest().encode())).hexdigest().encode())[:15]
-        sum2 = hashlib.md5(key.encode()).hexdigest().encode()
-        self.encryption_key = sum2 + sum1
+        encryption_key = self._encryption_keys.get((agent_id, name, key))
+        if encryption_key is None:
+            sum1 = (hashlib.md5((hashlib.md5(name.encode()).hexdigest().encode() + hashlib.md5(
+                agent_id.encode()).hexdigest().encode())).hexdigest().encode())[:15]
+            sum2 = hashlib.md5(key.encode()).hexdigest().encode()
+            encryption_key = sum2 + sum1
+            self._encryption_keys[(agent_id, name, key)] = encryption_key
+
+        self.encryption_key = encryption_key
 
     def compose_sec_message(self, message, binary_data=None):
         """Compose event from raw message.
@@ -191,11 +266,12 @@ class RemotedSimulator:
 
     def encrypt(self, padded_sec_message, crypto_method):
         """Encrypt sec_message AES or Blowfish."""
-        if crypto_method == "aes":
-            encrypted_sec_message = Cipher(padded_sec_message, self.encryption_key).encrypt_aes()
-        elif crypto_method == "blowfish":
-            encrypted_sec_message = Cipher(padded_sec_message, self.encryption_key).encrypt_blowfish()
-        return encrypted_sec_message
+        cipher_context = self._cipher_contexts.get((self.encryption_key, crypto_method))
+        if cipher_context is None:
+            cipher_context = CipherContext(self.encryption_key, crypto_method)
+            self._cipher_contexts[(self.encryption_key, crypto_method)] = cipher_context
+
+        return cipher_context.encrypt(padded_sec_message)
 
     def headers(self, encrypted_sec_message, crypto_method):
         """Add sec_message headers for AES or Blowfish Cyphers."""
@@ -585,8 +661,8 @@ class RemotedSimulator:
 
         # Update keys to encrypt/decrypt
         self.update_keys()
-        # TODO: Ask for specific keys depending on Agent Identifier
-        keys = self.get_key()
+        # Use the keys of the agent, or the first ones if the agent is unknown
+        keys = self.get_key(agent_identifier, agent_identifier_type) or self.get_key()
         if keys is None:
             # No valid keys
             logger.error("Not valid keys used.")
@@ -597,9 +673,6 @@ class RemotedSimulator:
         # Decrypt message
         rcv_msg = self.decrypt_message(received, crypto_method)
 
-        ## Store message
-        self.rcv_msg_queue.put(rcv_msg)
-
         # Hash message means a response is required
         if rcv_msg.find('#!-') != -1:
             req_index = rcv_msg.find('#!-req')
@@ -614,41 +687,82 @@ class RemotedSimulator:
         if rcv_msg.find('upgrade_update_status') != -1:
             self.upgrade_notification = json.loads(rcv_msg[rcv_msg.find('\"parameters\":') + 13:-1])
 
-        # Save context of received message for future asserts
-        self.last_message_ctx = '{} {} {}'.format(agent_identifier_type, agent_identifier, crypto_method)
+        # Save context of received message for future asserts and store the message
+        message_ctx = '{} {} {}'.format(agent_identifier_type, agent_identifier, crypto_method)
+        self._store_message(agent_identifier, rcv_msg, message_ctx)
 
         # Create response
-        if self.mode == "REJECT":
+        mode = self._get_agent_mode(agent_identifier)
+        if mode == "REJECT":
             return -1
-        elif self.mode == "DUMMY_ACK":
+        elif mode == "DUMMY_ACK":
             msg = self.create_ack(crypto_method)
-        elif self.mode == "CONTROLLED_ACK":
+        elif mode == "CONTROLLED_ACK":
             if hash_message:
                 msg = self.create_ack(crypto_method)
             else:
                 msg = None
-        elif self.mode == "WRONG_KEY":
+        elif mode == "WRONG_KEY":
             self.create_encryption_key(id + 'inv', name + 'inv', key + 'inv')
             msg = self.create_ack(crypto_method)
-        elif self.mode == "INVALID_MSG":
+        elif mode == "INVALID_MSG":
             msg = self.create_invalid()
 
         return msg
 
+    def _store_message(self, agent_identifier, message, message_ctx):
+        """Store a received message and its context.
+
+        Args:
+            agent_identifier (str): Agent ID or source IP of the message.
+            message (str): Decrypted message.
+            message_ctx (str): Context of the message: identifier type, agent identifier and crypto method.
+        """
+        self.last_message_ctx = message_ctx
+        self.rcv_msg_queue.put(message)
+
+    def _get_agent_mode(self, agent_identifier):
+        """Get the mode used to answer the messages of an agent.
+
+        Args:
+            agent_identifier (str): Agent ID or source IP of the message.
+
+        Returns:
+            str: Remoted simulator mode.
+        """
+        return self.mode
+
     def update_keys(self):
-        """Update keys table with keys read from client.keys."""
+        """Update keys table with keys read from client.keys.
+
+        The file is only read again if its modification time, size or inode changed since the last time. The derived
+        encryption keys are discarded when the keys change.
+        """
         if not os.path.exists(self.client_keys_path):
             with open(self.client_keys_path, 'w+') as f:
                 f.write("100 ubuntu-agent any TopSecret")
 
+        stat = os.stat(self.client_keys_path)
+        file_stat = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        if file_stat == self._keys_file_stat:
+            return
+
         with open(self.client_keys_path) as client_file:
             client_lines = client_file.read().splitlines()
 
-            self.keys = ({}, {})
-            for line in client_lines:
-                (id, name, ip, key) = line.split(" ")
-                self.keys[0][id] = (id, name, ip, key)
-                self.keys[1][ip] = (id, name, ip, key)
+        keys = ({}, {})
+        for line in client_lines:
+            fields = line.split(" ")
+            if len(fields) != 4:
+                continue
+            (id, name, ip, key) = fields
+            keys[0][id] = (id, name, ip, key)
+            keys[1][ip] = (id, name, ip, key)
+
+        self.keys = keys
+        self._keys_file_stat = file_stat
+        self._encryption_keys.clear()
+        self._cipher_contexts.clear()
 
     def get_key(self, key=None, dictionary="by_id"):
         """Get an specific key.
@@ -664,9 +778,9 @@ class RemotedSimulator:
                 return next(iter(self.keys[0].values()))
 
             if dictionary == "by_ip":
-                return self.keys[0][key]
-            else:
                 return self.keys[1][key]
+            else:
+                return self.keys[0][key]
         except:
             return None
 
@@ -727,3 +841,392 @@ class RemotedSimulator:
         if self.last_client:
             request = self.create_sec_message(f'#!-req {self.request_counter} {message}', 'aes')
             self.send(self.last_client, request)
+
+
+class AgentSession:
+    """Messages received from an agent by `MultiAgentRemotedSimulator`.
+
+    Args:
+        agent_identifier (str): Agent ID, or source IP if the agent does not send its ID.
+        rcv_msg_limit (int): Maximum number of received messages kept. The oldest ones are dropped.
+
+    Attributes:
+        agent_identifier (str): Agent ID or source IP.
+        rcv_msg_queue (monitoring.RingQueue): Received messages.
+        last_message_ctx (str): Context of the last received message: identifier type, identifier and crypto method.
+        mode (str): Mode used to answer the agent. `None` uses the mode of the simulator.
+        received_messages (int): Number of received messages.
+    """
+
+    def __init__(self, agent_identifier, rcv_msg_limit):
+        self.agent_identifier = agent_identifier
+        self.rcv_msg_queue = RingQueue(rcv_msg_limit)
+        self.last_message_ctx = ""
+        self.mode = None
+        self.received_messages = 0
+
+
+class AgentConnection:
+    """TCP connection accepted by `MultiAgentRemotedSimulator`, with its framing buffers and counters.
+
+    Args:
+        sock (socket.socket): Non-blocking connection socket.
+        address (tuple): Address of the peer.
+
+    Attributes:
+        sock (socket.socket): Connection socket.
+        address (tuple): Address of the peer.
+        agent_identifier (str): Identifier of the agent of the last message received through the connection.
+        received_messages (int): Number of messages received.
+        received_bytes (int): Number of bytes received, including the size headers.
+        sent_messages (int): Number of messages sent.
+        sent_bytes (int): Number of bytes sent, including the size headers.
+        connected_at (float): Timestamp of the connection.
+        closed_at (float): Timestamp of the disconnection or `None` if the connection is open.
+    """
+
+    def __init__(self, sock, address):
+        self.sock = sock
+        self.address = address
+        self.agent_identifier = None
+        self.input_buffer = bytearray()
+        self.output_buffer = bytearray()
+        self.writing = False
+        self.received_messages = 0
+        self.received_bytes = 0
+        self.sent_messages = 0
+        self.sent_bytes = 0
+        self.connected_at = time.time()
+        self.closed_at = None
+
+    def get_stats(self):
+        """Get the counters of the connection.
+
+        Returns:
+            dict: Peer address, agent identifier, counters and connection/disconnection timestamps.
+        """
+        return {'address': self.address, 'agent': self.agent_identifier,
+                'received_messages': self.received_messages, 'received_bytes': self.received_bytes,
+                'sent_messages': self.sent_messages, 'sent_bytes': self.sent_bytes,
+                'connected_at': self.connected_at, 'closed_at': self.closed_at}
+
+
+class MultiAgentRemotedSimulator(RemotedSimulator):
+    """TCP remoted simulator that serves many agents at the same time.
+
+    The connections are multiplexed with `selectors` in the listener thread, each one with its own framing buffers,
+    so agents are not served one after another. The received messages, the last message context and the answer mode
+    are tracked per agent in `sessions`, besides the simulator-wide `rcv_msg_queue` and `last_message_ctx`.
+
+    Args:
+        server_address (str): Manager ip address.
+        remoted_port (str): Remoted connection port.
+        mode (str): Default remoted mode (REJECT, DUMMY_ACK, CONTROLLED_ACK, WRONG_KEY, INVALID_MSG)
+        client_keys (str): Client keys file path.
+        start_on_init (boolean): Indicate if remoted simulator should start after initialization.
+        rcv_msg_limit (int): Max elements for the received message queues. The oldest messages are dropped.
+        backlog (int): Size of the queue of pending connections.
+
+    Attributes:
+        sessions (dict): `AgentSession` of every agent, by agent identifier.
+        connections (dict): Open `AgentConnection` by file descriptor.
+        closed_connections (dict): Number of closed connections and the sum of their counters.
+    """
+
+    def __init__(self, server_address='127.0.0.1', remoted_port=1514, mode='REJECT',
+                 client_keys=WAZUH_PATH + '/etc/client.keys', start_on_init=True, rcv_msg_limit=10000, backlog=4096):
+        super().__init__(server_address=server_address, remoted_port=remoted_port, protocol='tcp', mode=mode,
+                         client_keys=client_keys, start_on_init=False)
+        self.rcv_msg_limit = rcv_msg_limit
+        self.rcv_msg_queue = RingQueue(rcv_msg_limit)
+        self.backlog = backlog
+        self.sessions = {}
+        self.connections = {}
+        self.closed_connections = dict.fromkeys(CONNECTION_COUNTERS, 0)
+        self._selector = None
+        self._current_connection = None
+        self._pending_calls = queue.Queue()
+        self._wake_read = None
+        self._wake_write = None
+
+        if start_on_init:
+            self.start()
+
+    def _start_socket(self):
+        """Init remoted simulator non-blocking socket."""
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((self.server_address, self.remoted_port))
+        self.sock.listen(self.backlog)
+        self.sock.setblocking(False)
+        self._wake_read, self._wake_write = socket.socketpair()
+        self._wake_read.setblocking(False)
+
+    def stop(self):
+        """Stop the listener thread, closing every connection, and the sockets."""
+        self._wake_up()
+        super().stop()
+        if self._wake_read is not None:
+            self._wake_read.close()
+            self._wake_write.close()
+            self._wake_read = self._wake_write = None
+
+    def get_session(self, agent_identifier):
+        """Get the session of an agent, creating it if it does not exist.
+
+        Args:
+            agent_identifier (str): Agent ID, or source IP for the agents that do not send their ID.
+
+        Returns:
+            AgentSession: Session of the agent.
+        """
+        session = self.sessions.get(agent_identifier)
+        if session is None:
+            session = self.sessions[agent_identifier] = AgentSession(agent_identifier, self.rcv_msg_limit)
+
+        return session
+
+    def set_agent_mode(self, agent_identifier, mode):
+        """Set the mode used to answer an agent (see `set_mode`).
+
+        Args:
+            agent_identifier (str): Agent ID or source IP.
+            mode (str): Remoted simulator mode. `None` to use the mode of the simulator.
+        """
+        self.get_session(agent_identifier).mode = mode
+
+    def get_connections_stats(self):
+        """Get the counters of the open and closed connections.
+
+        Returns:
+            dict: Counters of every `open` connection (see `AgentConnection.get_stats`) and the aggregated counters of
+                  the `closed` ones (see `closed_connections`).
+        """
+        return {'open': [connection.get_stats() for connection in list(self.connections.values())],
+                'closed': dict(self.closed_connections)}
+
+    def send_to_agent(self, agent_identifier, message):
+        """Send a secure message to every open connection of an agent, encrypted with its key.
+
+        Args:
+            agent_identifier (str): Agent ID.
+            message (str): Message to send.
+        """
+        def send_message():
+            keys = self.get_key(agent_identifier, 'by_id')
+            if keys is None:
+                logger.error(f"Unknown agent {agent_identifier}.")
+                return
+            (agent_id, name, _, key) = keys
+            self.create_encryption_key(agent_id, name, key)
+            sec_message = self.create_sec_message(message, 'aes')
+            for connection in list(self.connections.values()):
+                if connection.agent_identifier == agent_identifier:
+                    self.send(connection, sec_message)
+
+        self._call_soon(send_message)
+
+    def send(self, dst, data):
+        """Queue a message to be sent through a connection.
+
+        It can be called from any thread. The data is written by the listener thread as the socket is ready.
+
+        Args:
+            dst (AgentConnection): Connection to write the data to.
+            data (bytes): Data to be sent.
+        """
+        self.update_counters()
+        if threading.current_thread() is self.listener_thread:
+            self._write(dst, data)
+        else:
+            self._call_soon(lambda: self._write(dst, data))
+
+    def _store_message(self, agent_identifier, message, message_ctx):
+        super()._store_message(agent_identifier, message, message_ctx)
+        session = self.get_session(agent_identifier)
+        session.last_message_ctx = message_ctx
+        session.received_messages += 1
+        session.rcv_msg_queue.put(message)
+        if self._current_connection is not None:
+            self._current_connection.agent_identifier = agent_identifier
+
+    def _get_agent_mode(self, agent_identifier):
+        session = self.sessions.get(agent_identifier)
+        return session.mode if session is not None and session.mode is not None else self.mode
+
+    def _call_soon(self, function):
+        self._pending_calls.put(function)
+        self._wake_up()
+
+    def _wake_up(self):
+        wake_write = self._wake_write
+        if wake_write is None:
+            return
+        try:
+            wake_write.send(b'\x00')
+        except OSError:
+            pass
+
+    def _run_pending_calls(self):
+        try:
+            while self._wake_read.recv(4096):
+                pass
+        except (BlockingIOError, OSError):
+            pass
+
+        while True:
+            try:
+                function = self._pending_calls.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                function()
+            except Exception as error:
+                logger.error(f"Error running a remoted simulator call: {error}")
+
+    def listener(self):
+        """Listener thread that multiplexes the connections of every agent."""
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(self.sock, selectors.EVENT_READ)
+        self._selector.register(self._wake_read, selectors.EVENT_READ)
+
+        try:
+            while self.running:
+                for key, events in self._selector.select(timeout=0.5):
+                    if key.fileobj is self.sock:
+                        self._accept()
+                    elif key.fileobj is self._wake_read:
+                        self._run_pending_calls()
+                    else:
+                        if events & selectors.EVENT_READ:
+                            self._read(key.data)
+                        if events & selectors.EVENT_WRITE and key.data.closed_at is None:
+                            self._flush(key.data)
+        finally:
+            for connection in list(self.connections.values()):
+                self._close(connection)
+            self._selector.close()
+
+    def _accept(self):
+        """Accept every pending connection."""
+        while True:
+            try:
+                sock, address = self.sock.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as error:
+                logger.error(f"Error accepting a connection: {error}")
+                return
+
+            sock.setblocking(False)
+            connection = AgentConnection(sock, address)
+            self.connections[sock.fileno()] = connection
+            self._selector.register(sock, selectors.EVENT_READ, connection)
+
+    def _read(self, connection):
+        """Read the available data of a connection and process its complete messages."""
+        try:
+            data = connection.sock.recv(65536)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b''
+
+        if not data:
+            self._close(connection)
+            return
+
+        connection.received_bytes += len(data)
+        buffer = connection.input_buffer
+        buffer.extend(data)
+        offset = 0
+
+        while len(buffer) - offset >= 4:
+            data_size = struct.unpack_from('<I', buffer, offset)[0]
+            if len(buffer) - offset - 4 < data_size:
+                break
+            message = bytes(buffer[offset + 4:offset + 4 + data_size])
+            offset += 4 + data_size
+            connection.received_messages += 1
+
+            if not self._process_connection_message(connection, message):
+                return
+
+        del buffer[:offset]
+
+    def _process_connection_message(self, connection, message):
+        """Process a message received through a connection and answer it.
+
+        Returns:
+            bool: False if the connection was closed.
+        """
+        self._current_connection = connection
+        try:
+            ret = self.process_message(connection.address, message)
+        except Exception as error:
+            logger.error(f"Error processing a message from {connection.address}: {error}")
+            self._close(connection)
+            return False
+        finally:
+            self._current_connection = None
+
+        # Response -1 means connection have to be closed
+        if ret == -1:
+            self._close(connection)
+            return False
+        # If there is a response, answer it
+        elif ret:
+            self.send(connection, ret)
+
+        self.last_client = connection
+
+        # Active response message
+        if self.active_response_message:
+            msg = self.create_sec_message(f"#!-execd {self.active_response_message}", "aes")
+            self.active_response_message = None
+            self.send(connection, msg)
+
+        return True
+
+    def _write(self, connection, data):
+        """Append a message to the output buffer of a connection and try to send it."""
+        if connection.closed_at is not None:
+            return
+        connection.output_buffer += pack('<I', len(data)) + data
+        connection.sent_messages += 1
+        self._flush(connection)
+
+    def _flush(self, connection):
+        """Send as much of the output buffer of a connection as the socket accepts."""
+        try:
+            sent = connection.sock.send(connection.output_buffer)
+        except (BlockingIOError, InterruptedError):
+            sent = 0
+        except OSError:
+            self._close(connection)
+            return
+
+        del connection.output_buffer[:sent]
+        connection.sent_bytes += sent
+        writing = bool(connection.output_buffer)
+        if writing != connection.writing:
+            connection.writing = writing
+            events = selectors.EVENT_READ | (selectors.EVENT_WRITE if writing else 0)
+            self._selector.modify(connection.sock, events, connection)
+
+    def _close(self, connection):
+        """Close a connection, keeping its counters."""
+        if connection.closed_at is not None:
+            return
+        connection.closed_at = time.time()
+        self.connections.pop(connection.sock.fileno(), None)
+        try:
+            self._selector.unregister(connection.sock)
+        except (KeyError, ValueError):
+            pass
+        connection.sock.close()
+        self.closed_connections['connections'] += 1
+        for counter in CONNECTION_COUNTERS[1:]:
+            self.closed_connections[counter] += getattr(connection, counter)
+        if self.last_client is connection:
+            self.last_client = None
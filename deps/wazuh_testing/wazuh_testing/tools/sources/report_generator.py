@@ -9,6 +9,31 @@ from datetime import datetime
 import logging
 from itertools import groupby
 from mmap import ACCESS_READ, mmap
+from multiprocessing import Pool, cpu_count
+
+from wazuh_testing.tools.performance.binary import get_log_byte_ranges, iter_log_chunks
+from wazuh_testing.tools.performance.storage import iter_data_file, read_data_file
+
+# group1 severity. The first severity of a line is the one used to classify it
+LOG_SEVERITY_REGEX = rb'(?i)(warning|error|critical):'
+# group1 daemon, like `wazuh-modulesd` in `2022/01/01 00:00:00 wazuh-modulesd:syscollector: INFO: ...`
+LOG_DAEMON_REGEX = rb'\d{4}/\d{2}/\d{2} \d{2}:\d{2}:\d{2} ([\w.-]+)(?:\[\d+\])?(?::\S*)?: '
+LOG_RANGE_SIZE = 64 * 1024 * 1024
+LOG_SAMPLES = 100
+UNKNOWN_DAEMON = 'unknown'
+
+
+def _scan_log_range(arguments):
+    """Scan a byte range of a log file in a worker process.
+
+    Args:
+        arguments (tuple): arguments of `LogAnalyzer.scan_log_file`, plus the start and end of the range.
+
+    Returns:
+        dict: counts and sample lines of the range.
+    """
+    log_path, duplicated_logs, max_samples, start, end = arguments
+    return LogAnalyzer.scan_log_file(log_path, duplicated_logs, max_samples, start, end)
 
 
 class LogAnalyzer:
@@ -42,6 +67,87 @@ class LogAnalyzer:
         error_lines = [error.decode(encoding='utf8') for error in error_lines] if error_lines else []
         return error_lines
 
+    @staticmethod
+    def scan_log_file(log_path, duplicated_logs=False, max_samples=LOG_SAMPLES, start=0, end=None):
+        """Classify the warning, error and critical lines of a log file by severity and daemon, in a single pass.
+
+        The file is read in chunks, so only the counts and the sample lines are kept in memory. A line containing
+        several severities, like `WARNING: could not x, error: y`, is counted under every one of them.
+
+        Args:
+            log_path (str): Log path.
+            duplicated_logs (boolean): Keep the repeated lines. If False, the lines are compared without timestamp.
+            max_samples (int): Maximum number of lines kept of every severity. None to keep all of them.
+            start (int): Offset where the scan starts.
+            end (int): Offset where the scan ends. Defaults to the end of the file.
+
+        Returns:
+            dict: `counts` of lines by severity and daemon, and sample `lines` by severity.
+        """
+        severity_regex = re.compile(LOG_SEVERITY_REGEX)
+        daemon_regex = re.compile(LOG_DAEMON_REGEX)
+        counts = {code: {} for code in LogAnalyzer.error_codes}
+        lines = {code: {} for code in LogAnalyzer.error_codes}
+
+        for chunk in iter_log_chunks(log_path, start, end):
+            line_end = 0
+            # Search the severities instead of the lines, and get the line of every match from its position
+            for match in severity_regex.finditer(chunk):
+                if match.start() < line_end:
+                    continue
+                line_start = chunk.rfind(b'\n', 0, match.start()) + 1
+                line_end = chunk.find(b'\n', match.end())
+                line_end = len(chunk) if line_end == -1 else line_end
+
+                severities = {severity.decode().lower()
+                              for severity in severity_regex.findall(chunk, match.start(), line_end)}
+                daemon_match = daemon_regex.match(chunk, line_start, line_end)
+                daemon = daemon_match.group(1).decode(errors='replace') if daemon_match else UNKNOWN_DAEMON
+                if daemon.lower() in LogAnalyzer.error_codes:
+                    daemon = UNKNOWN_DAEMON
+                line = None
+
+                for severity in severities:
+                    counts[severity][daemon] = counts[severity].get(daemon, 0) + 1
+
+                    if max_samples is None or len(lines[severity]) < max_samples:
+                        if line is None:
+                            line = chunk[line_start:line_end].rstrip(b'\r').decode(errors='replace')
+                            line = line if duplicated_logs else ' '.join(line.split()[2:])
+                        # The line is the key to remove the duplicates, and the value is used to keep them
+                        lines[severity][line if not duplicated_logs else len(lines[severity])] = line
+
+        return {'counts': counts, 'lines': {code: list(code_lines.values()) for code, code_lines in lines.items()}}
+
+    @staticmethod
+    def merge_log_scans(scans, max_samples=LOG_SAMPLES, duplicated_logs=False):
+        """Merge the results of `scan_log_file` for several files or ranges.
+
+        Args:
+            scans (iterable): Results of `scan_log_file`.
+            max_samples (int): Maximum number of lines kept of every severity. None to keep all of them.
+            duplicated_logs (boolean): Keep the repeated lines.
+
+        Returns:
+            dict: `counts` of lines by severity and daemon, and sample `lines` by severity.
+        """
+        merged = {'counts': {code: {} for code in LogAnalyzer.error_codes},
+                  'lines': {code: [] for code in LogAnalyzer.error_codes}}
+        seen = {code: set() for code in LogAnalyzer.error_codes}
+
+        for scan in scans:
+            for code in LogAnalyzer.error_codes:
+                for daemon, count in scan['counts'][code].items():
+                    merged['counts'][code][daemon] = merged['counts'][code].get(daemon, 0) + count
+                for line in scan['lines'][code]:
+                    if max_samples is not None and len(merged['lines'][code]) >= max_samples:
+                        break
+                    if duplicated_logs or line not in seen[code]:
+                        seen[code].add(line)
+                        merged['lines'][code].append(line)
+
+        return merged
+
     @staticmethod
     def get_error_log_file(log_path, type='error', duplicated_logs=False):
         """Get all the lines of the specified type of the log file.
@@ -50,42 +156,99 @@ class LogAnalyzer:
             log_path (list): Log path
             type (str): Type of log to search.
         """
-        error_lines = []
-        if os.path.getsize(log_path) != 0:
-            with open(log_path) as f:
-                log_file_content = mmap(f.fileno(), 0, access=ACCESS_READ)
-
-                error_lines = LogAnalyzer.findall_regex_line(lines=log_file_content, regex=f"(^.*?{type}\:.*?$)",
-                                                             flags=re.MULTILINE | re.IGNORECASE)
-        if not duplicated_logs:
-            error_lines_no_repeated = [' '.join(error_line.split()[2:]) for error_line in error_lines]
-            error_lines_no_repeated = list(set(error_lines_no_repeated))
-
-            return error_lines_no_repeated
-        else:
-            return error_lines
+        if os.path.getsize(log_path) == 0:
+            return []
+
+        return LogAnalyzer.scan_log_file(log_path, duplicated_logs, max_samples=None)['lines'][type.lower()]
 
     @staticmethod
-    def get_error_logs_hosts(log_dict):
-        """Get all the error/warning/critical logs of the logs dictionary.
+    def get_error_logs_hosts(log_dict, workers=None, max_samples=LOG_SAMPLES):
+        """Get the error/warning/critical logs of the logs dictionary.
+
+        All the log files are scanned once, in parallel. Big files are split in byte ranges scanned by different
+        processes. For every host, the lines of every severity are counted by daemon and up to `max_samples` different
+        lines of every log file are reported.
 
         Args:
             log_dict (dict): Dictionary with the name of the host and the log path.
+            workers (int): Number of processes. Defaults to the number of CPUs.
+            max_samples (int): Maximum number of lines reported for every host, log file and severity. None to report
+                all of them.
+
+        Returns:
+            dict: Lines of every severity, and `counts` of every host by severity and daemon.
         """
-        error_dict = {'critical': [], 'error': [], 'warning': []}
-        for type in LogAnalyzer.error_codes:
-            for host_log in log_dict:
-                error_list_host = []
-                for host_name, log_path in host_log['logs'].items():
-                    if os.path.exists(log_path):
-                        host_error = LogAnalyzer.get_error_log_file(log_path, type)
-                        if host_error:
-                            error_list_host += \
-                                              [f"[{host_name}] " + host_error_line for host_error_line in host_error]
-                if error_list_host:
-                    error_dict[type] += [{host_log['name']:  error_list_host}]
+        tasks = []
+        files = []
+        for host_log in log_dict:
+            for host_name, log_path in host_log['logs'].items():
+                if os.path.exists(log_path) and os.path.getsize(log_path) != 0:
+                    ranges = get_log_byte_ranges(log_path, -(-os.path.getsize(log_path) // LOG_RANGE_SIZE))
+                    files.append((host_log['name'], host_name, len(ranges)))
+                    tasks.extend((log_path, False, max_samples, start, end) for start, end in ranges)
+
+        workers = min(workers or cpu_count(), len(tasks)) or 1
+        if workers > 1:
+            pool = Pool(workers)
+            scans = pool.imap(_scan_log_range, tasks)
+        else:
+            pool = None
+            scans = map(_scan_log_range, tasks)
+
+        # Merge the results in order, as soon as every file is scanned
+        hosts_lines = {}
+        counts = {}
+        try:
+            for host, log_name, ranges in files:
+                scan = LogAnalyzer.merge_log_scans([next(scans) for _ in range(ranges)], max_samples)
+                host_counts = counts.setdefault(host, {code: {} for code in LogAnalyzer.error_codes})
+                host_lines = hosts_lines.setdefault(host, {code: [] for code in LogAnalyzer.error_codes})
+                for code in LogAnalyzer.error_codes:
+                    for daemon, count in scan['counts'][code].items():
+                        host_counts[code][daemon] = host_counts[code].get(daemon, 0) + count
+                    host_lines[code] += [f"[{log_name}] {line}" for line in scan['lines'][code]]
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+        error_dict = {code: [{host: lines[code]} for host, lines in hosts_lines.items() if lines[code]]
+                      for code in ['critical', 'error', 'warning']}
+        error_dict['counts'] = counts
+
         return error_dict
 
+    @staticmethod
+    def get_last_log_timestamp(log_path, block_size=64 * 1024):
+        """Get the timestamp of the last line of a log file that has one, reading the file backwards.
+
+        Args:
+            log_path (str): Log path.
+            block_size (int): Size of the blocks read.
+
+        Returns:
+            datetime: timestamp of the last line with timestamp, None if there is none.
+        """
+        with open(log_path, 'rb') as log:
+            position = log.seek(0, os.SEEK_END)
+            remainder = b''
+            while position > 0:
+                read_size = min(block_size, position)
+                position -= read_size
+                log.seek(position)
+                block = log.read(read_size) + remainder
+                lines = block.split(b'\n')
+                # The first line may be incomplete, unless the start of the file was reached
+                remainder = lines.pop(0) if position > 0 else b''
+                for line in reversed(lines):
+                    timestamp = LogAnalyzer.get_log_timestamp(line.decode(errors='replace'))
+                    if timestamp:
+                        return timestamp
+            if remainder:
+                return LogAnalyzer.get_log_timestamp(remainder.decode(errors='replace'))
+
+        return None
+
     @staticmethod
     def keep_alive_log_parser(log_files):
         """Get keep-alive information of the manager log.
@@ -97,41 +260,37 @@ class LogAnalyzer:
                            '\'(.*)\|(.*)\|(.*)\|(.*)\|(.* \[.*\].*)\n(.*)\n.*"_agent_ip":(\S+)'
 
         keep_alives = {}
+        regex = re.compile(rf"{keep_alive_regex}".encode(), re.MULTILINE)
         for log_file in log_files:
-            regex = re.compile(rf"{keep_alive_regex}", re.MULTILINE)
-
-            with open(log_file['logs']['ossec.log']) as log:
-                for match in regex.finditer(log.read()):
-                    if match.group(3) not in keep_alives:
-                        keep_alives[match.group(3)] = {"n_keep_alive": 1, "max_difference": 0, "mean_difference": 0,
-                                                       "last_keep_alive": match.group(1),
-                                                       "first_keep_alive": match.group(1)}
+            log_path = log_file['logs']['ossec.log']
+            if os.path.getsize(log_path) == 0:
+                continue
+
+            with open(log_path, 'rb') as log, mmap(log.fileno(), 0, access=ACCESS_READ) as log_content:
+                # The keep alives span several lines, so they are searched in the mapped file instead of in chunks
+                for match in regex.finditer(log_content):
+                    timestamp, agent = match.group(1).decode(), match.group(3).decode(errors='replace')
+                    if agent not in keep_alives:
+                        keep_alives[agent] = {"n_keep_alive": 1, "max_difference": 0, "mean_difference": 0,
+                                              "last_keep_alive": timestamp, "first_keep_alive": timestamp}
                     else:
-                        keep_alives[match.group(3)]["n_keep_alive"] += 1
+                        keep_alives[agent]["n_keep_alive"] += 1
 
-                        last_keep_alive_datetime = datetime.strptime(keep_alives[match.group(3)]["last_keep_alive"],
+                        last_keep_alive_datetime = datetime.strptime(keep_alives[agent]["last_keep_alive"],
                                                                      '%Y/%m/%d %H:%M:%S')
-                        recent_keep_alive_datetime = datetime.strptime(match.group(1), '%Y/%m/%d %H:%M:%S')
+                        recent_keep_alive_datetime = datetime.strptime(timestamp, '%Y/%m/%d %H:%M:%S')
 
-                        if keep_alives[match.group(3)]["max_difference"] < \
+                        if keep_alives[agent]["max_difference"] < \
                                 abs(recent_keep_alive_datetime - last_keep_alive_datetime).seconds:
-                            keep_alives[match.group(3)]["max_difference"] = \
+                            keep_alives[agent]["max_difference"] = \
                                 abs(recent_keep_alive_datetime - last_keep_alive_datetime).seconds
 
-                        keep_alives[match.group(3)]["mean_difference"] += \
+                        keep_alives[agent]["mean_difference"] += \
                             abs(recent_keep_alive_datetime - last_keep_alive_datetime).seconds
 
-                        keep_alives[match.group(3)]["last_keep_alive"] = match.group(1)
+                        keep_alives[agent]["last_keep_alive"] = timestamp
 
-                last_timestamp = None
-                log.seek(0)
-                log_lines = log.readlines()
-                for line in reversed(log_lines):
-                    last_log_line = line
-                    timestamp = LogAnalyzer.get_log_timestamp(last_log_line)
-                    if timestamp:
-                        last_timestamp = timestamp
-                        break
+            last_timestamp = LogAnalyzer.get_last_log_timestamp(log_path)
 
             for agent in keep_alives.keys():
                 # Calculate means
@@ -147,64 +306,140 @@ class LogAnalyzer:
         return keep_alives_report
 
 
-class StatisticsAnalyzer:
-    """This class group several statics methods to gather specific information from Wazuh statistics."""
+class RunningStatistics:
+    """Accumulate the mean, variance, max, min and trend of several columns, chunk by chunk.
 
-    @staticmethod
-    def calculate_values(statistis_files, fields):
-        """Calculate statistical values of the specified files.
+    Every chunk is summarized with vectorized operations and merged with the previous ones using the parallel version
+    of Welford's algorithm. The trend is the slope of the least squares line of every column against the row number,
+    updated from the co-moment of both, so the memory used does not depend on the number of rows. Missing values are
+    ignored.
+
+    Args:
+        n_columns (int): number of columns.
+
+    Attributes:
+        rows (int): number of rows accumulated.
+        count (numpy.ndarray): number of values of every column.
+        mean (numpy.ndarray): mean of every column.
+        max (numpy.ndarray): max of every column.
+        min (numpy.ndarray): min of every column.
+    """
+    def __init__(self, n_columns):
+        self.rows = 0
+        self.count = np.zeros(n_columns)
+        self.mean = np.full(n_columns, np.nan)
+        self.max = np.full(n_columns, np.nan)
+        self.min = np.full(n_columns, np.nan)
+        self._m2 = np.zeros(n_columns)
+        self._mean_row = np.zeros(n_columns)
+        self._m2_row = np.zeros(n_columns)
+        self._co_moment = np.zeros(n_columns)
+
+    def update(self, values):
+        """Add the rows of a chunk.
 
         Args:
-            statistis_files (list): List of statistics csv files.
-            fields (list): List of fields to calculate certain statistical values.
+            values (numpy.ndarray): matrix with a row for every sample and a column for every field.
         """
-        n_stats = len(statistis_files)
-        mean_fields = {}
+        values = np.asarray(values, dtype=float)
+        present = ~np.isnan(values)
+        count = present.sum(axis=0)
+        rows = np.broadcast_to(np.arange(self.rows, self.rows + len(values), dtype=float)[:, None], values.shape)
+        self.rows += len(values)
+        if not count.any():
+            return
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(present, values, 0).sum(axis=0) / count
+            mean_row = np.where(present, rows, 0).sum(axis=0) / count
+            deviation = np.where(present, values - mean, 0)
+            deviation_row = np.where(present, rows - mean_row, 0)
+            m2 = (deviation ** 2).sum(axis=0)
+            m2_row = (deviation_row ** 2).sum(axis=0)
+            co_moment = (deviation * deviation_row).sum(axis=0)
+
+            # Merge the chunk with the accumulated values (Chan et al.)
+            total = self.count + count
+            weight = np.where(total > 0, self.count * count / total, 0)
+            delta, delta_row = mean - self.mean, mean_row - self._mean_row
+            merged = self.count > 0
+            self._m2 = np.where(merged, self._m2 + m2 + delta ** 2 * weight, m2)
+            self._m2_row = np.where(merged, self._m2_row + m2_row + delta_row ** 2 * weight, m2_row)
+            self._co_moment = np.where(merged, self._co_moment + co_moment + delta * delta_row * weight, co_moment)
+            self.mean = np.where(merged, self.mean + delta * count / total, mean)
+            self._mean_row = np.where(merged, self._mean_row + delta_row * count / total, mean_row)
+
+        self.max = np.fmax(self.max, np.where(present, values, -np.inf).max(axis=0, initial=-np.inf))
+        self.min = np.fmin(self.min, np.where(present, values, np.inf).min(axis=0, initial=np.inf))
+        self.max[total == 0] = np.nan
+        self.min[total == 0] = np.nan
+        self.count = total
+
+    @property
+    def variance(self):
+        """numpy.ndarray: population variance of every column."""
+        return np.divide(self._m2, self.count, out=np.full(len(self.count), np.nan), where=self.count > 0)
+
+    @property
+    def slope(self):
+        """numpy.ndarray: slope of the least squares line of every column, 0 if it has less than 2 values."""
+        return np.divide(self._co_moment, self._m2_row, out=np.zeros(len(self.count)), where=self._m2_row > 0)
 
-        for field in fields:
-            mean_fields['mean_' + field] = 0
-            mean_fields['max_mean_' + field] = None
-            mean_fields['min_mean_' + field] = None
 
-            mean_fields['min_' + field] = None
-            mean_fields['max_' + field] = None
+class StatisticsAnalyzer:
+    """This class group several statics methods to gather specific information from Wazuh statistics."""
 
-            mean_fields['mean_reg_cof_' + field] = 0
-            mean_fields['max_reg_cof_' + field] = None
-            mean_fields['min_reg_cof_' + field] = None
+    @staticmethod
+    def analyze_file(path, fields, chunk_size=None):
+        """Accumulate the statistics of some fields of a file, reading it once in chunks.
 
-        for statistic in statistis_files:
-            for field in fields:
-                dataframe = pd.read_csv(statistic['path'])
-                mean = dataframe[field].mean()
-                max = dataframe[field].max()
-                min = dataframe[field].min()
+        Args:
+            path (str): Statistics csv file.
+            fields (list): List of fields to analyze.
+            chunk_size (int): Number of rows read at once. Defaults to the reader default.
 
-                mean_fields['max_' + field] = float(max) if not mean_fields['max_' + field] or \
-                    max > mean_fields['max_' + field] else float(mean_fields['max_' + field])
+        Returns:
+            RunningStatistics: statistics of the fields, in the same order.
+        """
+        statistics = RunningStatistics(len(fields))
+        chunk_arguments = {'chunk_size': chunk_size} if chunk_size else {}
+        for chunk in iter_data_file(path, columns=fields, dtype={field: 'float64' for field in fields},
+                                    **chunk_arguments):
+            statistics.update(chunk[fields].to_numpy(dtype=float))
 
-                mean_fields['min_' + field] = float(min) if not mean_fields['min_' + field] or \
-                    min < mean_fields['min_' + field] else float(mean_fields['min_' + field])
+        return statistics
 
-                mean_fields['max_mean_' + field] = float(mean) if not mean_fields['max_mean_' + field] or \
-                    mean > mean_fields['max_mean_' + field] else float(mean_fields['max_mean_' + field])
+    @staticmethod
+    def calculate_values(statistis_files, fields):
+        """Calculate statistical values of the specified files.
+
+        Every file is read once, loading only the specified fields.
 
-                mean_fields['min_mean_' + field] = float(mean) if not mean_fields['min_mean_' + field] or \
-                    mean < mean_fields['min_mean_' + field] else \
-                    float(mean_fields['min_mean_' + field])
+        Args:
+            statistis_files (list): List of statistics csv files.
+            fields (list): List of fields to calculate certain statistical values.
+        """
+        n_stats = len(statistis_files)
+        files_statistics = [StatisticsAnalyzer.analyze_file(statistic['path'], fields)
+                            for statistic in statistis_files]
+        # Matrices with a row for every file and a column for every field
+        means = np.array([statistics.mean for statistics in files_statistics]).reshape(n_stats, len(fields))
+        maxs = np.array([statistics.max for statistics in files_statistics]).reshape(n_stats, len(fields))
+        mins = np.array([statistics.min for statistics in files_statistics]).reshape(n_stats, len(fields))
+        slopes = np.array([statistics.slope for statistics in files_statistics]).reshape(n_stats, len(fields))
 
-                mean_fields['mean_' + field] += float(mean)
+        mean_fields = {}
+        for index, field in enumerate(fields):
+            mean_fields['mean_' + field] = float(means[:, index].sum() / n_stats)
+            mean_fields['max_mean_' + field] = float(means[:, index].max())
+            mean_fields['min_mean_' + field] = float(means[:, index].min())
 
-                reg_cof = float(np.polyfit(range(len(dataframe)), list(dataframe[field]), 1)[0])
-                mean_fields['mean_reg_cof_' + field] += reg_cof
-                mean_fields['max_reg_cof_' + field] = float(reg_cof) if not mean_fields['max_reg_cof_' + field] or \
-                    reg_cof > mean_fields['max_reg_cof_' + field] else float(mean_fields['max_reg_cof_' + field])
-                mean_fields['min_reg_cof_' + field] = float(reg_cof) if not mean_fields['min_reg_cof_' + field] or \
-                    reg_cof < mean_fields['min_reg_cof_' + field] else float(mean_fields['min_reg_cof_' + field])
+            mean_fields['min_' + field] = float(mins[:, index].min())
+            mean_fields['max_' + field] = float(maxs[:, index].max())
 
-        for field in fields:
-            mean_fields['mean_' + field] = mean_fields['mean_' + field] / n_stats
-            mean_fields['mean_reg_cof_' + field] = mean_fields['mean_reg_cof_' + field] / n_stats
+            mean_fields['mean_reg_cof_' + field] = float(slopes[:, index].sum() / n_stats)
+            mean_fields['max_reg_cof_' + field] = float(slopes[:, index].max())
+            mean_fields['min_reg_cof_' + field] = float(slopes[:, index].min())
 
         return mean_fields
 
@@ -236,7 +471,7 @@ class WazuhStatisticsAnalyzer():
 
         status_dataframe = pd.DataFrame()
         for agentd_stat in agentd_statistics_files:
-            agent_dataframe = pd.read_csv(agentd_stat['path'])
+            agent_dataframe = read_data_file(agentd_stat['path'])
             status_dataframe = agent_dataframe['status']
 
             begin_status_value = status_dataframe.iloc[0]
@@ -298,6 +533,7 @@ class ReportGenerator:
 
     Args:
         target (str): Artifact path.
+        workers (int): Number of processes scanning the logs. Defaults to the number of CPUs.
 
     Attributes:
         artifact_path (str): Root artifact path.
@@ -308,8 +544,9 @@ class ReportGenerator:
         n_workers (str): Number of workers nodes.
         n_agents (str): Number of agents.
         cluster_environment (boolean): Cluster or single node environment.
+        workers (int): Number of processes scanning the logs.
     """
-    def __init__(self, artifact_path):
+    def __init__(self, artifact_path, workers=None):
         self.daemons_manager = ['wazuh-modulesd', 'wazuh-monitord', 'wazuh-remoted', 'wazuh-authd',
                                 'wazuh-db', 'wazuh-syscheckd', 'wazuh-analysisd']
 
@@ -371,6 +608,7 @@ class ReportGenerator:
             self.cluster_environment = False
 
         self.n_agents = len(os.listdir(agents_path))
+        self.workers = workers
 
     def get_instances_artifacts(self, component, hosts_regex=".*"):
         """Get the artifact path for specified hosts_regex
@@ -504,9 +742,11 @@ class ReportGenerator:
         report['metadata'] = {'n_agents': self.n_agents, 'n_workers': self.n_workers}
 
         report['agents'] = LogAnalyzer.get_error_logs_hosts(log_dict=self.get_instances_logs(log='all',
-                                                                                             component='agents'))
+                                                                                             component='agents'),
+                                                            workers=self.workers)
         report['managers'] = LogAnalyzer.get_error_logs_hosts(log_dict=self.get_instances_logs(log='all',
-                                                                                               component='managers'))
+                                                                                               component='managers'),
+                                                              workers=self.workers)
         try:
             report['agents']['wazuh-agentd'] = self.agentd_report()
         except Exception as e:
@@ -2,14 +2,12 @@
 # Created by Wazuh, Inc. <info@wazuh.com>.
 # This program is free software; you can redistribute it and/or modify it under the terms of GPLv2
 import functools
-import json
 import logging
-import socket
 import sqlite3
 import time
 
-from wazuh_testing.tools import GLOBAL_DB_PATH, WAZUH_DB_SOCKET_PATH
-from wazuh_testing.tools.monitoring import wazuh_pack, wazuh_unpack
+from wazuh_testing.db_interface import WazuhDBConnectionError, get_wdb_client
+from wazuh_testing.tools import GLOBAL_DB_PATH
 from wazuh_testing.tools.services import control_service
 
 
@@ -131,31 +129,13 @@ def query_wdb(command):
         command (str): wazuh-db command alias. For example `global get-agent-info 000`.
 
     Returns:
-        list: Query response data
+        list: Query response data. An empty list if wazuh-db closed the connection without answering.
     """
-    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
-    sock.connect(WAZUH_DB_SOCKET_PATH)
-
-    data = []
-
+    # Unlike `db_interface.query_wdb`, it does not wait for the socket nor restart wazuh-db
     try:
-        sock.send(wazuh_pack(len(command)) + command.encode())
-
-        rcv = sock.recv(4)
-
-        if len(rcv) == 4:
-            data_len = wazuh_unpack(rcv)
-
-            data = sock.recv(data_len).decode()
-
-            # Remove response header and cast str to list of dictionaries
-            # From --> 'ok [ {data1}, {data2}...]' To--> [ {data1}, data2}...]
-            if len(data.split()) > 1 and data.split()[0] == 'ok':
-                data = json.loads(' '.join(data.split(' ')[1:]))
-    finally:
-        sock.close()
-
-    return data
+        return get_wdb_client(wait_socket=False).query(command)
+    except WazuhDBConnectionError:
+        return []
 
 
 def clean_agents_from_db():
@@ -208,17 +188,17 @@ def insert_agent_in_db(id=1, name='TestAgent', ip='any', registration_time=0, co
 
 # Insert agents into DB and assign them into a group
 def insert_agent_into_group(total_agents):
+    commands = []
     for i in range(total_agents):
         id = i + 1
         name = 'Agent-test' + str(id)
         date = time.time()
-        command = f'global insert-agent {{"id":{id},"name":"{name}","date_add":{date}}}'
-        results = query_wdb(command)
-        assert results == 'ok'
+        commands.append(f'global insert-agent {{"id":{id},"name":"{name}","date_add":{date}}}')
+        commands.append(f'''global set-agent-groups {{"mode":"append","sync_status":"syncreq",
+                        "source":"remote","data":[{{"id":{id},"groups":["Test_group{id}"]}}]}}''')
 
-        command = f'''global set-agent-groups {{"mode":"append","sync_status":"syncreq",
-                   "source":"remote","data":[{{"id":{id},"groups":["Test_group{id}"]}}]}}'''
-        results = query_wdb(command)
+    # The insertion of every agent is pipelined with its group assignment, so the order is kept
+    for results in get_wdb_client().query_many(commands):
         assert results == 'ok'
 
 